@@ -1,32 +1,90 @@
+import argparse
 import time
-from src.scrapers.free_scraper import scrape_all_free_sources
+from src.scrapers.source_registry import scrape_registered_sources
+from src.scrapers.http_cache import HttpCache
+from src.scrapers.dedup_index import JobDedupIndex
 from src.ai_service import AIRouter
-from src.utils.proposal_submitter import submit_proposal
+from src.ai_service.llm_dispatcher import ProviderError
+from src.integrations.job_ingest import IngestClient
+from src.utils.budget_ledger import BudgetExceeded
+from src.utils.proposal_submitter import drain_submissions, queue_proposal
 from src.utils.budget_tracker import update_budget_tracker
 
+# Bleibt über alle Zyklen identisch: der Prompt-Prefix daraus ist beim Provider cachebar
+FREELANCER_PROFILE = {
+  "name": "AI Freelancer Pro",
+  "skills": ["Python", "AI", "Web Development"]
+}
+
 def main_cycle():
   # 1. Job-Akquisition (Kostenlos)
-  jobs = scrape_all_free_sources()
+  # Unveränderte Listing-Seiten (304 / gleicher Hash) werden nicht erneut geparst
+  jobs = scrape_registered_sources(cache=HttpCache())
+
+  # Bereits in früheren Zyklen verarbeitete Jobs nicht erneut analysieren
+  seen_index = JobDedupIndex()
+  jobs = seen_index.filter_new(jobs)
+
+  # Neue Jobs gesammelt per /jobs/bulk nach Supabase (nur mit AUTOMONET_API_URL/-TOKEN)
+  ingest_client = IngestClient.from_env()
+  if ingest_client is not None and jobs:
+    try:
+      result = ingest_client.ingest(jobs)
+      print(f"Ingest: {result['upserted']} upserted, {result['failed']} failed, {result['invalid']} invalid")
+    except Exception as e:
+      print(f"Ingest fehlgeschlagen: {e}")
+    finally:
+      ingest_client.close()
   
   # 2. AI-basierte Filterung
   router = AIRouter("config.json")
-  filtered_jobs = [
-    job for job in jobs 
-    if router.analyze_job(job).get("roi", 0) > 7
-  ]
+  filtered_jobs, rejected_jobs = [], []
+  for job in jobs:
+    (filtered_jobs if router.analyze_job(job).get("roi", 0) > 7 else rejected_jobs).append(job)
+  # Nur endgültig entschiedene Jobs als gesehen markieren; nicht bearbeitete
+  # (über dem Limit oder nach BudgetExceeded) kommen im nächsten Zyklus wieder
+  seen_index.mark_seen(rejected_jobs)
   
   # 3. Proposal-Generierung (Gezielte Investition)
+  # Jedes Proposal landet erst in der dauerhaften Queue, dann wird abgeschickt;
+  # fehlgeschlagene Submits früherer Zyklen werden dabei mit erledigt
+  proposed_jobs = []
   for job in filtered_jobs[:5]:  # Maximal 5 pro Zyklus
-    proposal = router.generate_proposal(job, {
-      "name": "AI Freelancer Pro",
-      "skills": ["Python", "AI", "Web Development"]
-    })
-    submit_proposal(job, proposal)
+    try:
+      proposal, model = router.generate_proposal_with_model(job, FREELANCER_PROFILE)
+    except BudgetExceeded as e:
+      # Budget reicht nicht für den nächsten Call: Rest im nächsten Zyklus
+      print(f"Budget erschöpft: {e}")
+      break
+    except ProviderError as e:
+      # Provider down/Timeout: Job bleibt ungesehen und kommt im nächsten Zyklus wieder
+      print(f"Proposal für '{job.get('title', 'N/A')}' fehlgeschlagen: {e}")
+      continue
+    # Tatsächlich genutztes Modell mitsichern: spätere Annahme/Ablehnung fließt in dessen Akzeptanz-Stats
+    queue_proposal(job, proposal, model=model)
+    proposed_jobs.append(job)
+  seen_index.mark_seen(proposed_jobs)
+  seen_index.close()
+  drain_submissions()
   
   # 4. Aktualisierung des Budget-Trackers
   update_budget_tracker()
 
+def run_daemon():
+  # Dauerbetrieb: Jobs laufen Sekunden nach dem Scrapen durch die Pipeline
+  from src.system.pipeline_daemon import run_daemon as run_pipeline
+  run_pipeline(AIRouter("config.json"), FREELANCER_PROFILE)
+
 if __name__ == "__main__":
-  while True:
+  parser = argparse.ArgumentParser(description="AutoMonet")
+  parser.add_argument("--action", choices=["run", "loop", "daemon"], default="loop",
+                      help="run: ein Zyklus, loop: Zyklus alle 6 Stunden, daemon: kontinuierliche Pipeline")
+  args = parser.parse_args()
+  if args.action == "run":
     main_cycle()
-    time.sleep(3600 * 6)  # Wiederholung alle 6 Stunden
+  elif args.action == "daemon":
+    run_daemon()
+  else:
+    while True:
+      main_cycle()
+      time.sleep(3600 * 6)  # Wiederholung alle 6 Stunden
@@ -2,6 +2,7 @@
 
 # AutoMonet - Continuous operation with 5-10 minute intervals
 # This script runs AutoMonet in an infinite loop with randomized intervals
+# Prefer `python3 automonet.py --action daemon`: one warm process, jobs processed within seconds
 
 LOG_FILE="/root/AutoMonet/data/logs/daemon.log"
 CYCLE_COUNT=1
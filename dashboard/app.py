@@ -1,30 +1,338 @@
-# [Vorheriger Code bleibt bestehen...]
+"""
+Datenhaltung fürs Dashboard mit:
+- Jobs und Proposals im Speicher (Job/Proposal-Dataclasses)
+- Inkrementell gepflegten Status-Zählern und Top-k-Heap der neuesten Jobs (Snapshot in O(1))
+- Push von Deltas (neue Jobs, Proposal-Statuswechsel, Earnings) in ein DashboardEventLog
+- SSE-Endpunkt /api/events mit Resume über Last-Event-ID statt Polling
+- Flask-App (create_app) für index.html und die /api/*-Endpunkte, Start per `python3 app.py`
+"""
+import hashlib
+import heapq
+import json
+import logging
+import os
+import threading
+from collections import Counter
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .events import DashboardEventLog, parse_last_event_id, sse_stream
+except ImportError:  # start_dashboard.sh startet app.py als Skript aus dashboard/
+    from events import DashboardEventLog, parse_last_event_id, sse_stream
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(ROOT_DIR, 'data')
+PORT = 5174
+
+logger = logging.getLogger('dashboard')
+
+@dataclass
+class Job:
+    id: str
+    title: str
+    platform: str
+    budget: float
+    currency: str
+    description: str
+    posted_at: str
+    relevance: float
+    status: str          # 'new' | 'analyzed' | 'applied' | 'rejected'
+
+@dataclass
+class Proposal:
+    id: str
+    job_id: str
+    content: str
+    submitted_at: str
+    status: str          # 'submitted' | 'accepted' | 'rejected'
+    earnings: Optional[float] = None
 
 class EnhancedDataManager:
-    # [Existierende Methoden...]
+    """
+    Status-Zähler, Earnings und die neuesten Jobs werden bei jeder Änderung
+    nachgeführt statt beim Lesen gescannt. Änderungen deshalb nur über
+    add_*/update_*_status, nicht direkt an den Dataclasses.
+
+    Geschrieben wird aus dem Watcher-Thread, gelesen aus den Flask-Threads:
+    Änderungen und Snapshots laufen unter self.lock, Leser außerhalb der
+    Klasse kopieren unter dem Lock, was sie brauchen.
+    """
+
+    def __init__(self, event_log: Optional[DashboardEventLog] = None, recent_limit: int = 5):
+        self.jobs: Dict[str, Job] = {}
+        self.proposals: Dict[str, Proposal] = {}
+        self.analytics = {'earnings': {'total': 0.0, 'accepted': 0}}
+        self.events = event_log or DashboardEventLog()
+        self.recent_limit = recent_limit
+        self.job_status: Counter = Counter()
+        self.proposal_status: Counter = Counter()
+        # Min-Heap der recent_limit neuesten Jobs: (posted_at, -Einfügereihenfolge, id)
+        self._recent: List[Tuple[str, int, str]] = []
+        self._recent_ids = set()
+        self._job_seq: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def add_job(self, data: Dict) -> Job:
+        with self.lock:
+            job = Job(**data)
+            previous = self.jobs.get(job.id)
+            if previous is None:
+                self._job_seq[job.id] = len(self._job_seq)
+                self.jobs[job.id] = job
+                self.job_status[job.status] += 1
+                self._offer_recent(job)
+                self.events.append('job.new', {'job': asdict(job), 'total': len(self.jobs)})
+                return job
+            self.job_status[previous.status] -= 1
+            self.jobs[job.id] = job
+            self.job_status[job.status] += 1
+            if job.id in self._recent_ids:
+                if job.posted_at != previous.posted_at:
+                    self._rebuild_recent()
+            else:
+                self._offer_recent(job)
+            if job.status != previous.status:
+                self._emit_job_status(job, previous.status)
+            return job
+
+    def update_job_status(self, job_id: str, status: str) -> Job:
+        with self.lock:
+            job = self.jobs[job_id]
+            previous = job.status
+            self.job_status[previous] -= 1
+            job.status = status
+            self.job_status[status] += 1
+            if status != previous:
+                self._emit_job_status(job, previous)
+            return job
+
+    def _emit_job_status(self, job: Job, previous: str) -> None:
+        self.events.append('job.status', {'id': job.id, 'status': job.status, 'previous': previous,
+                                          'new': self.job_status['new'], 'applied': self.job_status['applied']})
+
+    def _offer_recent(self, job: Job) -> None:
+        # Reason: -seq hält bei gleichem posted_at den früher eingefügten Job vorne wie sorted()
+        entry = (job.posted_at, -self._job_seq[job.id], job.id)
+        if len(self._recent) < self.recent_limit:
+            heapq.heappush(self._recent, entry)
+        elif entry > self._recent[0]:
+            self._recent_ids.discard(heapq.heapreplace(self._recent, entry)[2])
+        else:
+            return
+        self._recent_ids.add(job.id)
+
+    def _rebuild_recent(self) -> None:
+        """Nur nötig, wenn sich posted_at eines Jobs im Heap ändert"""
+        self._recent = heapq.nlargest(self.recent_limit, ((job.posted_at, -self._job_seq[job.id], job.id)
+                                                          for job in self.jobs.values()))
+        heapq.heapify(self._recent)
+        self._recent_ids = {entry[2] for entry in self._recent}
+
+    def add_proposal(self, data: Dict) -> Proposal:
+        with self.lock:
+            proposal = Proposal(**data)
+            previous = self.proposals.get(proposal.id)
+            if previous is not None:
+                self._book_earnings(previous, -1)
+                self.proposal_status[previous.status] -= 1
+            self.proposals[proposal.id] = proposal
+            self.proposal_status[proposal.status] += 1
+            self._book_earnings(proposal, 1)
+            self._emit_status(proposal, previous.status if previous else None)
+            return proposal
+
+    def update_proposal_status(self, proposal_id: str, status: str,
+                               earnings: Optional[float] = None) -> Proposal:
+        with self.lock:
+            proposal = self.proposals[proposal_id]
+            previous = proposal.status
+            self._book_earnings(proposal, -1)
+            self.proposal_status[previous] -= 1
+            proposal.status = status
+            self.proposal_status[status] += 1
+            if earnings is not None:
+                proposal.earnings = earnings
+            self._book_earnings(proposal, 1)
+            if previous != status:
+                self._emit_status(proposal, previous)
+            return proposal
+
+    def _book_earnings(self, proposal: Proposal, sign: int) -> None:
+        if proposal.status != 'accepted' or not proposal.earnings:
+            return
+        earnings = self.analytics['earnings']
+        earnings['total'] += sign * float(proposal.earnings)
+        earnings['accepted'] += sign
+        # Reason: Ticks tragen neben dem Delta die Summen, damit doppelt zugestellte Events harmlos sind
+        self.events.append('earnings.tick', {'proposal_id': proposal.id, 'delta': sign * float(proposal.earnings),
+                                             **earnings})
+
+    def _emit_status(self, proposal: Proposal, previous: Optional[str]) -> None:
+        self.events.append('proposal.status', {'id': proposal.id, 'job_id': proposal.job_id,
+                                               'status': proposal.status, 'previous': previous})
 
     def get_dashboard_data(self) -> Dict:
-        jobs = list(self.jobs.values())
-        recent_jobs = sorted(
-            jobs, 
-            key=lambda x: x.posted_at, 
-            reverse=True
-        )[:5]
-        
-        return {
-            'jobs': {
-                'total': len(self.jobs),
-                'new': sum(1 for j in jobs if j.status == 'new'),
-                'applied': sum(1 for j in jobs if j.status == 'applied')
-            },
-            'proposals': {
-                'total': len(self.proposals),
-                'submitted': sum(1 for p in self.proposals.values() 
-                               if p.status == 'submitted'),
-                'accepted': sum(1 for p in self.proposals.values() 
-                               if p.status == 'accepted')
-            },
-            'earnings': self.analytics['earnings'],
-            'recentJobs': [asdict(j) for j in recent_jobs],
-            'updated_at': datetime.now().isoformat()
-        }
+        with self.lock:
+            recent_jobs = [self.jobs[job_id] for _, _, job_id in sorted(self._recent, reverse=True)]
+
+            return {
+                'jobs': {
+                    'total': len(self.jobs),
+                    'new': self.job_status['new'],
+                    'applied': self.job_status['applied']
+                },
+                'proposals': {
+                    'total': len(self.proposals),
+                    'submitted': self.proposal_status['submitted'],
+                    'accepted': self.proposal_status['accepted']
+                },
+                'earnings': dict(self.analytics['earnings']),
+                'recentJobs': [asdict(j) for j in recent_jobs],
+                'updated_at': datetime.now().isoformat()
+            }
+
+def register_event_stream(app, manager: EnhancedDataManager, heartbeat: float = 15.0):
+    """
+    Hängt GET /api/events an eine Flask-App. Neue Clients bekommen einen Snapshot,
+    wiederverbundene (Last-Event-ID bzw. ?after=) nur die verpassten Deltas.
+    """
+    from flask import Response, request, stream_with_context
+
+    def events():
+        last_event_id = parse_last_event_id(request.headers.get('Last-Event-ID') or request.args.get('after'))
+        body = sse_stream(manager.events, last_event_id, manager.get_dashboard_data, heartbeat)
+        return Response(stream_with_context(body), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    app.add_url_rule('/api/events', 'events', events)
+    return app
+
+def create_event_log(data_dir: str = os.path.join(DATA_DIR, 'dashboard')) -> DashboardEventLog:
+    """Persistentes Event-Log, damit Offsets der Clients einen Neustart überleben"""
+    return DashboardEventLog(path=os.path.join(data_dir, 'events.ndjson'))
+
+def job_from_scraped(item: Dict) -> Dict:
+    """Eintrag aus data/scraped_jobs.json -> Felder von Job (stabile id aus URL bzw. Titel)"""
+    key = item.get('id') or item.get('url') or item.get('title') or ''
+    return {
+        'id': str(item.get('id') or hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]),
+        'title': item.get('title', ''),
+        'platform': item.get('platform') or item.get('source') or 'unknown',
+        'budget': float(item.get('budget') or 0),
+        'currency': item.get('currency', 'USD'),
+        'description': item.get('description', ''),
+        'posted_at': item.get('posted_at') or datetime.now().isoformat(),
+        'relevance': float(item.get('relevance') or 0.0),
+        'status': item.get('status', 'new'),
+    }
+
+def sync_scraped_jobs(manager: EnhancedDataManager, path: str) -> int:
+    """Neue Jobs aus der Scraper-Ausgabe übernehmen; liefert die Anzahl neuer Jobs"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            items = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read {path}: {e}")
+        return 0
+    added = 0
+    for item in items:
+        data = job_from_scraped(item)
+        with manager.lock:
+            known = data['id'] in manager.jobs
+        if not known:
+            # Reason: posted_at bekannter Jobs nicht bei jedem Sync auf "jetzt" verschieben
+            manager.add_job(data)
+            added += 1
+    return added
+
+def watch_scraped_jobs(manager: EnhancedDataManager, path: str, interval: float = 30.0,
+                       stop: Optional[threading.Event] = None) -> threading.Thread:
+    """Hintergrund-Thread: synchronisiert, sobald sich die Datei ändert"""
+    stop = stop or threading.Event()
+
+    def run():
+        last_mtime = None
+        while not stop.is_set():
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                mtime = None
+            if mtime is not None and mtime != last_mtime:
+                last_mtime = mtime
+                sync_scraped_jobs(manager, path)
+            stop.wait(interval)
+
+    thread = threading.Thread(target=run, name='scraped-jobs-watcher', daemon=True)
+    thread.start()
+    return thread
+
+def proposals_for_table(manager: EnhancedDataManager) -> List[Dict]:
+    """Zeilen für die Proposal-Tabelle in index.html"""
+    rows = []
+    with manager.lock:
+        for proposal in manager.proposals.values():
+            job = manager.jobs.get(proposal.job_id)
+            rows.append({
+                'id': proposal.id,
+                'job_title': job.title if job else proposal.job_id,
+                'platform': job.platform if job else '',
+                'status': proposal.status,
+                'created_at': proposal.submitted_at,
+            })
+    return rows
+
+def read_json(path: str) -> Dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        return {'error': str(e)}
+
+def tail_lines(path: str, count: int = 100) -> List[str]:
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return [line.rstrip('\n') for line in f.readlines()[-count:]]
+    except OSError:
+        return []
+
+def create_app(manager: EnhancedDataManager, data_dir: str = DATA_DIR):
+    """Flask-App des Dashboards: index.html, JSON-Endpunkte und der SSE-Kanal"""
+    from flask import Flask, jsonify, render_template
+
+    app = Flask(__name__)
+
+    @app.route('/')
+    def index():
+        return render_template('index.html')
+
+    @app.route('/api/dashboard')
+    def dashboard():
+        return jsonify(manager.get_dashboard_data())
+
+    @app.route('/api/proposals')
+    def proposals():
+        return jsonify(proposals_for_table(manager))
+
+    @app.route('/api/health')
+    def health():
+        return jsonify(read_json(os.path.join(data_dir, 'health', 'latest.json')))
+
+    @app.route('/api/logs')
+    def logs():
+        return jsonify(tail_lines(os.path.join(data_dir, 'logs', 'daemon.log')))
+
+    return register_event_stream(app, manager)
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    manager = EnhancedDataManager(create_event_log())
+    scraped_path = os.path.join(DATA_DIR, 'scraped_jobs.json')
+    sync_scraped_jobs(manager, scraped_path)
+    watch_scraped_jobs(manager, scraped_path)
+    # Reason: threaded, damit offene SSE-Verbindungen die übrigen Requests nicht blockieren
+    create_app(manager).run(host='0.0.0.0', port=PORT, threaded=True)
+
+if __name__ == '__main__':
+    main()
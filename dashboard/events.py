@@ -0,0 +1,165 @@
+"""
+Event-Log für Push-Updates ans Dashboard (Server-Sent Events) mit:
+- Fortlaufenden Offsets pro Event (SSE id:), Resume über Last-Event-ID
+- Begrenztem Ringpuffer; wer weiter zurückliegt, bekommt einen frischen Snapshot
+- Optionaler Persistenz als NDJSON, damit Offsets einen Neustart überleben;
+  die Datei wird auf das gepufferte Fenster kompaktiert statt endlos zu wachsen
+- Blockierendem Warten (Condition) für Thread-basierte Server wie Flask
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+@dataclass
+class DashboardEvent:
+    offset: int
+    type: str            # 'job.new' | 'proposal.status' | 'earnings.tick' | 'snapshot'
+    data: Dict[str, Any]
+    timestamp: float
+
+class DashboardEventLog:
+    # Datei wird neu geschrieben, sobald sie compact_factor * capacity Zeilen hat
+    compact_factor = 2
+
+    def __init__(self, capacity: int = 10_000, path: Optional[str] = None):
+        self.capacity = capacity
+        self.path = path
+        self._events: Deque[DashboardEvent] = deque(maxlen=capacity)
+        self._next_offset = 1
+        self._condition = threading.Condition()
+        self._file = None
+        self._file_lines = 0
+        if path:
+            self._load(path)
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if self._file_lines > len(self._events):
+                # Mehr auf Platte als im Ringpuffer (oder kaputte Zeilen): auf das Fenster kürzen
+                self._compact()
+            else:
+                self._file = open(path, "a", encoding="utf-8")
+                if self._file.tell() and not self._ends_with_newline(path):
+                    self._file.write("\n")   # nicht an eine abgeschnittene Zeile anhängen
+
+    def _load(self, path: str) -> None:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self._file_lines += 1
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue   # abgeschnittene letzte Zeile nach Absturz
+                    self._events.append(DashboardEvent(entry["offset"], entry["type"], entry["data"], entry["ts"]))
+        except OSError:
+            return
+        if self._events:
+            self._next_offset = self._events[-1].offset + 1
+
+    def _compact(self) -> None:
+        """Datei atomar durch die gepufferten Events ersetzen (Aufrufer hält ggf. _condition)"""
+        if self._file is not None:
+            self._file.close()
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for event in self._events:
+                f.write(self._serialize(event))
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._file_lines = len(self._events)
+
+    @staticmethod
+    def _serialize(event: DashboardEvent) -> str:
+        return json.dumps({"offset": event.offset, "type": event.type, "data": event.data,
+                           "ts": event.timestamp}, default=str) + "\n"
+
+    @staticmethod
+    def _ends_with_newline(path: str) -> bool:
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def last_offset(self) -> int:
+        return self._next_offset - 1
+
+    def append(self, type: str, data: Dict[str, Any]) -> DashboardEvent:
+        with self._condition:
+            event = DashboardEvent(self._next_offset, type, data, time.time())
+            self._next_offset += 1
+            self._events.append(event)
+            if self._file is not None:
+                self._file.write(self._serialize(event))
+                self._file.flush()
+                self._file_lines += 1
+                if self._file_lines > self.compact_factor * self.capacity:
+                    self._compact()
+            self._condition.notify_all()
+        return event
+
+    def since(self, offset: int) -> Tuple[List[DashboardEvent], bool]:
+        """
+        (Events nach offset, vollständig?). False heißt: Events zwischen offset
+        und dem ältesten gepufferten Event fehlen -> Client braucht einen Snapshot.
+        """
+        with self._condition:
+            if not self._events or offset >= self._events[-1].offset:
+                return [], offset <= self.last_offset
+            first = self._events[0].offset
+            complete = offset >= first - 1
+            start = max(0, offset - first + 1)
+            return [self._events[i] for i in range(start, len(self._events))], complete
+
+    def wait(self, offset: int, timeout: float) -> bool:
+        """Blockiert, bis es Events nach offset gibt (True) oder timeout abläuft"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self.last_offset > offset, timeout)
+
+def format_sse(event: DashboardEvent) -> str:
+    return f"id: {event.offset}\nevent: {event.type}\ndata: {json.dumps(event.data, default=str)}\n\n"
+
+def parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value not in (None, "") else None
+    except ValueError:
+        return None
+
+def sse_stream(log: DashboardEventLog, last_event_id: Optional[int], snapshot: Callable[[], Dict],
+               heartbeat: float = 15.0, stop: Optional[threading.Event] = None) -> Iterator[str]:
+    """
+    SSE-Body für einen Client: ohne (bzw. mit zu alter) Last-Event-ID zuerst ein
+    Snapshot mit dem aktuellen Offset, danach nur noch Deltas. Heartbeat-Kommentare
+    halten Proxies offen und erkennen getrennte Verbindungen.
+    """
+    offset = last_event_id
+    if offset is not None:
+        events, complete = log.since(offset)
+        if not complete:
+            offset = None
+    if offset is None:
+        offset = log.last_offset
+        yield format_sse(DashboardEvent(offset, "snapshot", snapshot(), time.time()))
+        events = []
+    yield "retry: 3000\n\n"
+    while stop is None or not stop.is_set():
+        for event in events:
+            yield format_sse(event)
+            offset = event.offset
+        if not log.wait(offset, heartbeat):
+            yield ": keep-alive\n\n"
+        events, complete = log.since(offset)
+        if not complete:
+            # Client war zu langsam und ist aus dem Ringpuffer gefallen
+            offset = log.last_offset
+            yield format_sse(DashboardEvent(offset, "snapshot", snapshot(), time.time()))
+            events = []
@@ -1,6 +1,8 @@
+from dataclasses import asdict
 from datetime import datetime, timedelta
 import random
-from typing import List
+import time
+from typing import Dict, List, Sequence
 from .app import Job, Proposal, EnhancedDataManager
 
 PLATFORMS = ['Upwork', 'Freelancer', 'Toptal', 'Fiverr', 'PeoplePerHour']
@@ -24,7 +26,8 @@ def generate_proposal(job_id: str) -> Proposal:
     days_ago = random.randint(0, 14)
     status = random.choice(['submitted', 'accepted', 'rejected'])
     return Proposal(
-        id=f'prop_{random.randint(1000, 9999)}',
+        # Reason: eindeutig pro Job, sonst überschreiben sich bei großen Datenmengen die Proposals
+        id=f'prop_{job_id}',
         job_id=job_id,
         content=f'Dear Hiring Manager,\n\nI am excited to apply for this position...',
         submitted_at=(datetime.now() - timedelta(days=days_ago)).isoformat(),
@@ -32,9 +35,60 @@ def generate_proposal(job_id: str) -> Proposal:
         earnings=random.randint(500, 5000) if status == 'accepted' else None
     )
 
-def load_test_data(manager: EnhancedDataManager):
-    jobs = [generate_job(i) for i in range(1, 50)]
+def load_test_data(manager: EnhancedDataManager, count: int = 49):
+    jobs = [generate_job(i) for i in range(1, count + 1)]
     for job in jobs:
         manager.add_job(asdict(job))
         if job.status in ['applied', 'accepted', 'rejected']:
             manager.add_proposal(asdict(generate_proposal(job.id)))
+
+def full_scan_dashboard_data(manager: EnhancedDataManager) -> Dict:
+    """Bisherige Berechnung per Scan über alle Jobs/Proposals; Referenz für Tests und Benchmark"""
+    jobs = list(manager.jobs.values())
+    recent_jobs = sorted(jobs, key=lambda x: x.posted_at, reverse=True)[:manager.recent_limit]
+    return {
+        'jobs': {
+            'total': len(manager.jobs),
+            'new': sum(1 for j in jobs if j.status == 'new'),
+            'applied': sum(1 for j in jobs if j.status == 'applied')
+        },
+        'proposals': {
+            'total': len(manager.proposals),
+            'submitted': sum(1 for p in manager.proposals.values() if p.status == 'submitted'),
+            'accepted': sum(1 for p in manager.proposals.values() if p.status == 'accepted')
+        },
+        'earnings': {
+            'total': float(sum(p.earnings or 0 for p in manager.proposals.values() if p.status == 'accepted')),
+            'accepted': sum(1 for p in manager.proposals.values() if p.status == 'accepted' and p.earnings)
+        },
+        'recentJobs': [asdict(j) for j in recent_jobs],
+        'updated_at': datetime.now().isoformat()
+    }
+
+def benchmark_dashboard(sizes: Sequence[int] = (1_000, 10_000, 100_000, 1_000_000), reads: int = 200,
+                        scan_reads: int = 3, seed: int = 42) -> List[Dict]:
+    """Lesekosten von get_dashboard_data gegen den Full-Scan bei wachsender Historie"""
+    results = []
+    for size in sizes:
+        random.seed(seed)
+        manager = EnhancedDataManager()
+        started = time.perf_counter()
+        load_test_data(manager, size)
+        load_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for _ in range(reads):
+            manager.get_dashboard_data()
+        snapshot_us = (time.perf_counter() - started) / reads * 1e6
+
+        started = time.perf_counter()
+        for _ in range(scan_reads):
+            full_scan_dashboard_data(manager)
+        scan_us = (time.perf_counter() - started) / scan_reads * 1e6
+        results.append({'jobs': size, 'load_s': load_s, 'snapshot_us': snapshot_us, 'full_scan_us': scan_us})
+    return results
+
+if __name__ == '__main__':
+    for row in benchmark_dashboard():
+        print(f"{row['jobs']:>9} jobs: load {row['load_s']:.1f}s, snapshot {row['snapshot_us']:.1f}us, "
+              f"full scan {row['full_scan_us']:.0f}us")
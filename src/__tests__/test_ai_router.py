@@ -19,3 +19,29 @@ def test_generate_proposal(router):
     proposal = router.generate_proposal(job, user)
     assert isinstance(proposal, str)
     assert "Test" in proposal or "Tester" in proposal
+
+def test_generate_proposal_uses_cache_for_near_duplicates(router, monkeypatch):
+    calls = []
+    def fake_llm(job, user_profile):
+        calls.append(job["title"])
+        return f"Proposal for {job['title']}: I build Python APIs."
+    monkeypatch.setattr(router, "call_costefficient_llm", fake_llm)
+    monkeypatch.setattr(router, "call_highend_llm", fake_llm)
+    user = {"name": "Tester"}
+    description = "<p>We need a Python developer to build a REST API with FastAPI and Postgres.</p>"
+    job = {"title": "Python API Dev", "description": description}
+    repost = {"title": "Python API Developer", "description": description + " Remote."}
+
+    first = router.generate_proposal(job, user)
+    assert router.generate_proposal(dict(job), user) == first
+    adapted = router.generate_proposal(repost, user)
+    assert calls == ["Python API Dev"]
+    assert adapted.startswith("Proposal for Python API Developer")
+    metrics = router.cache_metrics()
+    assert metrics["exact_hits"] == 1 and metrics["similar_hits"] == 1 and metrics["misses"] == 1
+
+def test_cache_can_be_disabled(tmp_path):
+    config = tmp_path / "config.json"
+    config.write_text('{"proposal_cache": {"enabled": false}}')
+    router = AIRouter(str(config))
+    assert router.proposal_cache is None and router.cache_metrics() == {}
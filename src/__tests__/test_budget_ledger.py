@@ -0,0 +1,113 @@
+import multiprocessing
+from datetime import datetime, timezone
+import pytest
+from src.utils.budget_ledger import BudgetExceeded, BudgetLedger
+from src.utils.budget_tracker import BudgetTracker
+
+def ts(*args):
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+def test_reserve_commit_release(tmp_path):
+    ledger = BudgetLedger(str(tmp_path / "ledger.sqlite3"), daily_limit=1.0, monthly_limit=10.0)
+    first = ledger.reserve(0.6)
+    assert ledger.status()["daily"]["reserved"] == pytest.approx(0.6)
+    with pytest.raises(BudgetExceeded):
+        ledger.reserve(0.5)
+    ledger.commit(first, 0.2, model="gpt-4o-mini", input_tokens=100, output_tokens=50)
+    status = ledger.status()
+    assert status["daily"]["used"] == pytest.approx(0.2)
+    assert status["daily"]["reserved"] == 0
+    assert status["monthly"]["remaining"] == pytest.approx(9.8)
+    second = ledger.reserve(0.8)
+    ledger.release(second)
+    assert ledger.status()["daily"]["remaining"] == pytest.approx(0.8)
+
+def test_reservation_context_releases_without_commit(tmp_path):
+    ledger = BudgetLedger(str(tmp_path / "ledger.sqlite3"), daily_limit=1.0, monthly_limit=10.0)
+    with pytest.raises(RuntimeError):
+        with ledger.reservation(0.9):
+            raise RuntimeError("llm call failed")
+    assert ledger.status()["daily"]["remaining"] == pytest.approx(1.0)
+    with ledger.reservation(0.9) as r:
+        r.commit(0.3, model="claude-3-haiku")
+    assert ledger.status()["daily"]["used"] == pytest.approx(0.3)
+
+def test_expired_reservations_are_reclaimed(tmp_path):
+    ledger = BudgetLedger(str(tmp_path / "ledger.sqlite3"), daily_limit=1.0, monthly_limit=10.0)
+    now = ts(2024, 5, 1, 12)
+    ledger.reserve(1.0, ttl=60, now=now)
+    with pytest.raises(BudgetExceeded):
+        ledger.reserve(0.1, now=now + 30)
+    ledger.reserve(1.0, now=now + 61)
+
+def test_period_rollover(tmp_path):
+    ledger = BudgetLedger(str(tmp_path / "ledger.sqlite3"), daily_limit=1.0, monthly_limit=1.5)
+    ledger.commit(None, 0.9, now=ts(2024, 5, 31, 23))
+    assert ledger.status(now=ts(2024, 5, 31, 23))["daily"]["remaining"] == pytest.approx(0.1)
+    # Neuer Tag: daily leer, monthly läuft weiter
+    ledger.commit(None, 0.5, now=ts(2024, 5, 31, 23, 30))
+    with pytest.raises(BudgetExceeded):
+        ledger.reserve(0.2, now=ts(2024, 5, 31, 23, 45))
+    # Neuer Monat: beide Buckets zurückgesetzt
+    status = ledger.status(now=ts(2024, 6, 1, 0, 5))
+    assert status["daily"]["used"] == 0 and status["monthly"]["used"] == 0
+    ledger.commit(None, 0.4, now=ts(2024, 6, 1, 0, 5))
+    assert ledger.status(now=ts(2024, 6, 1, 0, 5))["monthly"]["used"] == pytest.approx(0.4)
+
+def _spend(path, attempts, results):
+    ledger = BudgetLedger(path, daily_limit=1.0, monthly_limit=1.0)
+    granted = 0
+    for _ in range(attempts):
+        try:
+            reservation_id = ledger.reserve(0.05)
+        except BudgetExceeded:
+            continue
+        ledger.commit(reservation_id, 0.05)
+        granted += 1
+    results.put(granted)
+
+def test_concurrent_processes_never_overspend(tmp_path):
+    path = str(tmp_path / "ledger.sqlite3")
+    BudgetLedger(path).close()
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_spend, args=(path, 15, results)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+    granted = sum(results.get(timeout=5) for _ in workers)
+    # 60 Versuche a 0.05 gegen Limit 1.0 -> genau 20 dürfen durch
+    assert granted == 20
+    assert BudgetLedger(path, daily_limit=1.0, monthly_limit=1.0).status()["daily"]["used"] == pytest.approx(1.0)
+
+def test_budget_tracker_metrics(tmp_path):
+    ledger = BudgetLedger(str(tmp_path / "ledger.sqlite3"), daily_limit=100.0, monthly_limit=300.0)
+    ledger.commit(None, 12.5)
+    metrics = BudgetTracker(limit=500, ledger=ledger).get_metrics()
+    assert metrics["limit"] == 500.0
+    assert metrics["spent"] == pytest.approx(12.5)
+    assert metrics["remaining"] == pytest.approx(487.5)
+
+def test_usage_tracks_cached_input_separately(tmp_path):
+    ledger = BudgetLedger(str(tmp_path / "ledger.sqlite3"))
+    ledger.commit(None, 0.01, model="m", input_tokens=1000, cached_input_tokens=800, output_tokens=100)
+    ledger.commit(None, 0.02, model="m", input_tokens=1000, output_tokens=100)
+    usage = ledger.usage("daily")
+    assert usage["input_tokens"] == 2000
+    assert usage["cached_input_tokens"] == 800
+    assert usage["uncached_input_tokens"] == 1200
+    assert usage["cache_hit_rate"] == pytest.approx(0.4)
+    assert ledger.usage("monthly")["cost"] == pytest.approx(0.03)
+
+def test_old_ledger_schema_is_migrated(tmp_path):
+    import sqlite3
+    path = str(tmp_path / "ledger.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE transactions (id TEXT PRIMARY KEY, model TEXT, input_tokens INTEGER NOT NULL DEFAULT 0, "
+                 "output_tokens INTEGER NOT NULL DEFAULT 0, reserved REAL NOT NULL DEFAULT 0, cost REAL NOT NULL, "
+                 "created_at REAL NOT NULL)")
+    conn.commit()
+    conn.close()
+    ledger = BudgetLedger(path)
+    ledger.commit(None, 0.01, input_tokens=10, cached_input_tokens=5)
+    assert ledger.usage()["cached_input_tokens"] == 5
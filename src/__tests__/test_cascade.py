@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from src.ai_service.cascade import CascadeConfig, CascadeScheduler
+
+class BatchFast:
+    def __init__(self):
+        self.batches = []
+
+    def pre_filter_batch(self, jobs):
+        self.batches.append(len(jobs))
+        return [job["fast"] for job in jobs]
+
+class Balanced:
+    def __init__(self):
+        self.seen = []
+
+    def analyze_batch(self, jobs):
+        self.seen.append([job["id"] for job in jobs])
+        return [{**job, "score": job["quality"]} for job in jobs]
+
+class Precise:
+    def __init__(self):
+        self.seen = []
+
+    def validate(self, job):
+        self.seen.append(job["id"])
+        return {"validated": True}
+
+def make_jobs(n):
+    return [{"id": i, "fast": i / n if i % 5 else 0.0, "quality": i / n} for i in range(n)]
+
+def make_scheduler(**config):
+    models = {"fast": BatchFast(), "balanced": Balanced(), "precise": Precise()}
+    return CascadeScheduler(models, CascadeConfig(**config)), models
+
+def test_cascade_forwards_only_survivors_in_batches():
+    scheduler, models = make_scheduler(target_survivor_rate=0.2, precise_top_k=3,
+                                       precise_threshold=0.5, batch_size=8)
+    results = asyncio.run(scheduler.run(make_jobs(40)))
+    assert models["fast"].batches == [8, 8, 8, 8, 8]
+    forwarded = [i for batch in models["balanced"].seen for i in batch]
+    assert sorted(forwarded) == [31, 32, 33, 34, 36, 37, 38, 39]
+    assert sorted(models["precise"].seen) == [37, 38, 39]
+    assert [r["id"] for r in results[:3]] == [39, 38, 37] and results[0]["validated"]
+    assert len(results) == 40
+    assert next(r for r in results if r["id"] == 5)["reason"] == "Failed pre-filter"
+
+def test_thresholds_adapt_between_runs():
+    scheduler, _ = make_scheduler(target_survivor_rate=0.25, precise_top_k=2, precise_threshold=0.1)
+    asyncio.run(scheduler.run(make_jobs(20)))
+    first_fast, first_precise = scheduler.fast_threshold, scheduler.precise_threshold
+    assert first_fast > 0.5
+    assert first_precise > 0.1
+    asyncio.run(scheduler.run(make_jobs(20)))
+    assert scheduler.precise_threshold > first_precise
+
+def test_budget_caps_expensive_tiers():
+    scheduler, models = make_scheduler(target_survivor_rate=0.5, precise_top_k=5, precise_threshold=0.0,
+                                       tier_costs={"fast": 0, "balanced": 1.0, "precise": 2.0})
+    scheduler.budget = 5.0
+    asyncio.run(scheduler.run(make_jobs(20)))
+    assert sum(len(b) for b in models["balanced"].seen) == 5
+    assert scheduler.budget == 0.0
+    assert models["precise"].seen == []
+
+def test_single_job_fallback_and_empty_batch():
+    class BoolFast:
+        def pre_filter(self, job):
+            return job["id"] != 0
+    scheduler = CascadeScheduler({"fast": BoolFast(), "balanced": Balanced(), "precise": Precise()},
+                                 CascadeConfig(target_survivor_rate=1.0))
+    results = asyncio.run(scheduler.run(make_jobs(3)))
+    assert [r["id"] for r in results] == [2, 1, 0]
+    assert asyncio.run(scheduler.run([])) == []
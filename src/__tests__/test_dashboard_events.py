@@ -0,0 +1,230 @@
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from dashboard.app import EnhancedDataManager, proposals_for_table, sync_scraped_jobs
+from dashboard.events import DashboardEventLog, parse_last_event_id, sse_stream
+from dashboard.test_data import benchmark_dashboard, full_scan_dashboard_data, load_test_data
+
+def make_job(i, status="new"):
+    return {"id": f"job_{i}", "title": f"Job {i}", "platform": "Upwork", "budget": 1000, "currency": "USD",
+            "description": "...", "posted_at": f"2024-01-{i:02d}T00:00:00", "relevance": 0.8, "status": status}
+
+def make_proposal(i, status="submitted", earnings=None):
+    return {"id": f"prop_{i}", "job_id": f"job_{i}", "content": "Hallo", "submitted_at": "2024-01-01T00:00:00",
+            "status": status, "earnings": earnings}
+
+def parse(chunks):
+    """SSE-Frames -> [(id, event, data)]; Kommentare und retry: fallen weg"""
+    frames = []
+    for chunk in chunks:
+        fields = dict(line.split(": ", 1) for line in chunk.strip().split("\n") if not line.startswith(":")
+                      and not line.startswith("retry"))
+        if fields:
+            frames.append((int(fields["id"]), fields["event"], json.loads(fields["data"])))
+    return frames
+
+def take(stream, n):
+    return [next(stream) for _ in range(n)]
+
+def test_parse_last_event_id():
+    assert parse_last_event_id("12") == 12
+    assert parse_last_event_id("") is None
+    assert parse_last_event_id("abc") is None
+    assert parse_last_event_id(None) is None
+
+def test_manager_emits_deltas():
+    manager = EnhancedDataManager()
+    manager.add_job(make_job(1))
+    manager.add_job(make_job(1))    # Update, kein neuer Job
+    manager.add_proposal(make_proposal(1))
+    manager.update_proposal_status("prop_1", "accepted", earnings=1500)
+    events, complete = manager.events.since(0)
+    assert complete
+    assert [e.type for e in events] == ["job.new", "proposal.status", "earnings.tick", "proposal.status"]
+    assert events[0].data["total"] == 1
+    assert events[2].data["total"] == 1500.0 and events[2].data["delta"] == 1500.0
+    assert events[3].data == {"id": "prop_1", "job_id": "job_1", "status": "accepted", "previous": "submitted"}
+    manager.update_proposal_status("prop_1", "rejected")
+    assert manager.analytics["earnings"] == {"total": 0.0, "accepted": 0}
+
+def test_job_status_changes_emit_events():
+    manager = EnhancedDataManager()
+    manager.add_job(make_job(1))
+    manager.update_job_status("job_1", "applied")
+    manager.update_job_status("job_1", "applied")    # kein Wechsel, kein Event
+    manager.add_job(make_job(1, status="rejected"))
+    events, _ = manager.events.since(1)
+    assert [(e.type, e.data["status"], e.data["previous"]) for e in events] == [
+        ("job.status", "applied", "new"), ("job.status", "rejected", "applied")]
+    assert events[0].data["applied"] == 1 and events[1].data["applied"] == 0
+
+def test_sync_scraped_jobs(tmp_path):
+    path = tmp_path / "scraped_jobs.json"
+    path.write_text(json.dumps([{"title": "Python Dev", "url": "https://a/1", "platform": "rss"},
+                                {"title": "Go Dev", "url": "https://a/2", "platform": "rss"}]))
+    manager = EnhancedDataManager()
+    manager.add_proposal(make_proposal(9))
+    assert sync_scraped_jobs(manager, str(path)) == 2
+    assert sync_scraped_jobs(manager, str(path)) == 0
+    assert sync_scraped_jobs(manager, str(tmp_path / "missing.json")) == 0
+    assert manager.get_dashboard_data()["jobs"] == {"total": 2, "new": 2, "applied": 0}
+    assert proposals_for_table(manager)[0]["job_title"] == "job_9"
+
+def test_app_runs_as_script():
+    # start_dashboard.sh: cd dashboard && python3 app.py
+    dashboard_dir = os.path.join(os.path.dirname(__file__), "..", "..", "dashboard")
+    result = subprocess.run([sys.executable, "-c", "import app; print(app.EnhancedDataManager.__name__)"],
+                            cwd=dashboard_dir, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "EnhancedDataManager"
+
+def test_flask_app_serves_events_route():
+    pytest.importorskip("flask")
+    from dashboard.app import create_app
+    manager = EnhancedDataManager()
+    manager.add_job(make_job(1))
+    client = create_app(manager).test_client()
+    assert client.get("/api/dashboard").get_json()["jobs"]["total"] == 1
+    response = client.get("/api/events", headers={"Last-Event-ID": "0"}, buffered=False)
+    assert response.mimetype == "text/event-stream"
+    assert next(response.response).startswith("retry:")
+    response.close()
+
+def test_new_client_gets_snapshot_then_deltas():
+    manager = EnhancedDataManager()
+    manager.add_job(make_job(1))
+    stop = threading.Event()
+    stream = sse_stream(manager.events, None, manager.get_dashboard_data, heartbeat=0.05, stop=stop)
+    snapshot = parse(take(stream, 2))
+    assert snapshot[0][:2] == (1, "snapshot") and snapshot[0][2]["jobs"]["total"] == 1
+
+    manager.add_job(make_job(2))
+    chunk = next(stream)
+    while chunk.startswith(":"):
+        chunk = next(stream)
+    assert parse([chunk]) == [(2, "job.new", {"job": make_job(2), "total": 2})]
+    assert next(stream) == ": keep-alive\n\n"
+    stop.set()
+
+def test_resume_replays_only_missed_events():
+    manager = EnhancedDataManager()
+    for i in range(1, 6):
+        manager.add_job(make_job(i))
+    stream = sse_stream(manager.events, 3, manager.get_dashboard_data, heartbeat=0.05)
+    frames = parse(take(stream, 3))
+    assert [(offset, kind) for offset, kind, _ in frames] == [(4, "job.new"), (5, "job.new")]
+
+def test_resume_outside_buffer_falls_back_to_snapshot():
+    manager = EnhancedDataManager(DashboardEventLog(capacity=3))
+    for i in range(1, 7):
+        manager.add_job(make_job(i))
+    assert manager.events.since(1)[1] is False
+    frames = parse(take(sse_stream(manager.events, 1, manager.get_dashboard_data, heartbeat=0.05), 1))
+    assert frames[0][:2] == (6, "snapshot")
+    # Offset aus der Zukunft (z.B. nach Neustart ohne Persistenz) -> ebenfalls Snapshot
+    frames = parse(take(sse_stream(manager.events, 99, manager.get_dashboard_data, heartbeat=0.05), 1))
+    assert frames[0][1] == "snapshot"
+
+def test_event_log_survives_restart(tmp_path):
+    path = str(tmp_path / "events.ndjson")
+    log = DashboardEventLog(path=path)
+    log.append("job.new", {"total": 1})
+    log.append("job.new", {"total": 2})
+    log.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"offset": 3, "type": "job.n')    # abgeschnittene Zeile
+
+    log = DashboardEventLog(path=path)
+    assert log.last_offset == 2
+    assert log.append("earnings.tick", {"total": 5.0}).offset == 3
+    events, complete = log.since(1)
+    assert complete and [e.offset for e in events] == [2, 3]
+    log.close()
+    assert DashboardEventLog(path=path).last_offset == 3
+
+def test_wait_wakes_on_append():
+    log = DashboardEventLog()
+    timer = threading.Timer(0.05, log.append, args=("job.new", {"total": 1}))
+    timer.start()
+    assert log.wait(0, timeout=2)
+    assert not log.wait(1, timeout=0.01)
+
+def without_timestamp(data):
+    return {key: value for key, value in data.items() if key != "updated_at"}
+
+def test_aggregates_match_full_scan():
+    random.seed(7)
+    manager = EnhancedDataManager()
+    load_test_data(manager, 300)
+    assert without_timestamp(manager.get_dashboard_data()) == without_timestamp(full_scan_dashboard_data(manager))
+
+    # Statuswechsel, Updates bestehender Jobs und ein neuer Spitzenreiter in recentJobs
+    newest = manager.get_dashboard_data()["recentJobs"][0]
+    manager.add_job({**newest, "posted_at": "2000-01-01T00:00:00", "status": "rejected"})
+    manager.add_job({**make_job(1), "id": "job_7", "posted_at": "2999-01-01T00:00:00"})
+    manager.update_job_status("job_8", "applied")
+    for proposal_id in list(manager.proposals)[:20]:
+        manager.update_proposal_status(proposal_id, "accepted", earnings=100)
+    manager.add_job({**make_job(1), "id": "job_new", "posted_at": "2999-01-01T00:00:00"})
+    data = manager.get_dashboard_data()
+    assert without_timestamp(data) == without_timestamp(full_scan_dashboard_data(manager))
+    assert [job["id"] for job in data["recentJobs"][:2]] == ["job_7", "job_new"]
+
+def test_benchmark_snapshot_stays_flat():
+    small, large = benchmark_dashboard(sizes=(1_000, 50_000), reads=200, scan_reads=3)
+    assert [small["jobs"], large["jobs"]] == [1_000, 50_000]
+    # Lesekosten unabhängig von der Historie, weit unter dem Full-Scan
+    assert large["snapshot_us"] < small["snapshot_us"] * 3, (small, large)
+    assert large["snapshot_us"] * 50 < large["full_scan_us"], large
+
+def test_event_log_file_is_compacted_to_buffer(tmp_path):
+    path = str(tmp_path / "events.ndjson")
+    log = DashboardEventLog(capacity=3, path=path)
+    for i in range(7):
+        log.append("job.new", {"total": i + 1})
+    # Bei mehr als 2 * capacity Zeilen wird auf den Puffer gekürzt
+    with open(path, encoding="utf-8") as f:
+        assert [json.loads(line)["offset"] for line in f] == [5, 6, 7]
+    log.append("job.new", {"total": 8})
+    log.close()
+
+    # Neustart kürzt ebenfalls und setzt die Offsets fort
+    log = DashboardEventLog(capacity=2, path=path)
+    assert log.last_offset == 8
+    with open(path, encoding="utf-8") as f:
+        assert [json.loads(line)["offset"] for line in f] == [7, 8]
+    assert log.append("job.new", {"total": 9}).offset == 9
+    log.close()
+
+def test_concurrent_writers_and_readers_stay_consistent():
+    manager = EnhancedDataManager()
+    errors = []
+
+    def write(start):
+        for i in range(start, start + 200):
+            manager.add_job(make_job(i % 28 + 1) | {"id": f"job_{i}"})
+            manager.add_proposal(make_proposal(i) | {"job_id": f"job_{i}"})
+
+    def read():
+        try:
+            for _ in range(200):
+                manager.get_dashboard_data()
+                proposals_for_table(manager)
+        except RuntimeError as e:   # "dictionary changed size during iteration"
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(n * 200,)) for n in range(3)]
+    threads += [threading.Thread(target=read) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert manager.get_dashboard_data()["jobs"]["total"] == 600
+    assert len(proposals_for_table(manager)) == 600
@@ -0,0 +1,86 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("sklearn")
+
+from src.ai_service.decision_engine import AIDecisionEngine, Job, JobCategory, Skill
+
+class Engine(AIDecisionEngine):
+    def _init_models(self):
+        # Hilfsmodelle werden für die Bewertung nicht benötigt
+        pass
+
+@pytest.fixture
+def engine():
+    return Engine({
+        'skills': [Skill("python", 0.9, 5), Skill("django", 0.8, 3)],
+        'hourly_rate': 50,
+        'preferred_categories': [JobCategory.WEB_DEV]
+    })
+
+def make_job(description, budget=1000, category=JobCategory.WEB_DEV):
+    return Job("Job", description, budget, category, [])
+
+def test_evaluate_jobs_matches_weights(engine):
+    jobs = [
+        make_job("python django backend api"),
+        make_job("logo design branding", category=JobCategory.DESIGN),
+        make_job("", budget=0),
+    ]
+    scores = engine.evaluate_jobs(jobs)
+    assert scores.shape == (3,)
+    assert scores[0] > scores[1]
+    assert np.all((scores >= 0) & (scores <= 1))
+    # leere Beschreibung ohne Budget: kein Skill-Match, kein Budget, bevorzugte Kategorie
+    assert scores[2] == pytest.approx(0.2)
+
+def test_evaluate_jobs_reuses_fitted_vectorizer(engine):
+    engine.evaluate_jobs([make_job("python api"), make_job("java api")])
+    vectorizer = engine._batch_vectorizer
+    engine.evaluate_jobs([make_job("django api")])
+    assert engine._batch_vectorizer is vectorizer
+    engine.evaluate_jobs([make_job("django api")], refit=True)
+    assert engine._batch_vectorizer is not vectorizer
+
+def test_evaluate_jobs_refits_when_corpus_drifts(engine):
+    engine.evaluate_jobs([make_job("python api"), make_job("java api")])
+    vectorizer = engine._batch_vectorizer
+    # Überwiegend unbekannte Begriffe: neu fitten, sonst zählt "kubernetes" nie
+    scores = engine.evaluate_jobs([make_job("kubernetes terraform python"), make_job("kubernetes helm")])
+    assert engine._batch_vectorizer is not vectorizer
+    assert "kubernetes" in engine._batch_vectorizer.vocabulary_
+    assert scores[0] > scores[1]
+
+def test_evaluate_jobs_empty(engine):
+    assert engine.evaluate_jobs([]).shape == (0,)
+
+def test_model_cache_persists_and_invalidates(tmp_path):
+    import json
+    from src.ai_service.model_cache import SkillModelCache, profile_hash
+    corpus = tmp_path / "jobs.json"
+    corpus.write_text(json.dumps([{"title": "Python dev", "description": "<p>django &amp; python</p>"}]))
+    artifact = str(tmp_path / "model.pkl")
+
+    cache = SkillModelCache(str(corpus), artifact)
+    vectorizer, profile_vector = cache.get_model("python django")
+    assert "div" not in vectorizer.vocabulary_ and "django" in vectorizer.vocabulary_
+
+    restarted = SkillModelCache(str(corpus), artifact)
+    assert restarted.load()
+    assert profile_hash("python django") in restarted.profiles
+
+    corpus.write_text(json.dumps([{"title": "Go dev", "description": "golang"}]))
+    assert not SkillModelCache(str(corpus), artifact).load()
+
+def test_engine_with_model_cache_scores_stably(tmp_path):
+    from src.ai_service.model_cache import SkillModelCache
+    cache = SkillModelCache(str(tmp_path / "missing.json"), str(tmp_path / "model.pkl"))
+    engine = Engine({
+        'skills': [Skill("python", 0.9, 5)],
+        'hourly_rate': 50,
+        'preferred_categories': []
+    }, model_cache=cache)
+    job = make_job("<b>python</b> scripting")
+    batch = engine.evaluate_jobs([job, make_job("other words")])
+    assert engine._calculate_skill_match(job) == pytest.approx(engine._batch_skill_match([job.description], False)[0])
+    assert batch[0] == pytest.approx(engine.evaluate_jobs([job])[0])
@@ -0,0 +1,61 @@
+from src.scrapers.dedup_index import _digest, BloomFilter, JobDedupIndex, normalize_url, title_fingerprint
+
+def test_normalize_url_strips_tracking_and_noise():
+    a = normalize_url("https://WWW.Indeed.com/viewjob/?jk=abc&from=serp&utm_source=x#top")
+    b = normalize_url("https://indeed.com/viewjob?jk=abc")
+    assert a == b
+    assert normalize_url("https://indeed.com/viewjob?jk=abc") != normalize_url("https://indeed.com/viewjob?jk=def")
+
+def test_title_fingerprint_ignores_order_and_punctuation():
+    assert title_fingerprint("[Hiring] Python Dev - Remote") == title_fingerprint("remote python dev (hiring)")
+
+def test_filter_new_across_cycles(tmp_path):
+    path = str(tmp_path / "seen.sqlite3")
+    jobs = [
+        {"title": "Python Dev", "url": "https://reddit.com/r/forhire/1"},
+        {"title": "Python Dev", "url": "https://reddit.com/r/forhire/1/"},
+        {"title": "React Dev", "url": "https://indeed.com/viewjob?jk=2"},
+    ]
+    index = JobDedupIndex(path)
+    fresh = index.filter_new(jobs)
+    assert [j["title"] for j in fresh] == ["Python Dev", "React Dev"]
+    index.mark_seen(fresh)
+    index.close()
+
+    reopened = JobDedupIndex(path)
+    repost = {"title": "react dev", "url": "https://indeed.com/viewjob?jk=99"}
+    new = {"title": "Go Dev", "url": "https://indeed.com/viewjob?jk=3"}
+    assert reopened.filter_new(jobs + [repost, new]) == [new]
+
+def test_same_title_from_other_company_or_site_is_new(tmp_path):
+    index = JobDedupIndex(str(tmp_path / "seen.sqlite3"))
+    index.mark_seen([{"title": "Python Developer", "url": "https://indeed.com/viewjob?jk=1", "company": "Acme"}])
+    assert index.is_seen({"title": "python developer", "url": "https://www.indeed.com/viewjob?jk=7",
+                          "company": "ACME"})
+    other_company = {"title": "Python Developer", "url": "https://indeed.com/viewjob?jk=2", "company": "Globex"}
+    other_site = {"title": "Python Developer", "url": "https://reddit.com/r/forhire/2", "company": "Acme"}
+    assert not index.is_seen(other_company) and not index.is_seen(other_site)
+    assert index.filter_new([other_company, other_site]) == [other_company, other_site]
+
+def test_ttl_expires_entries(tmp_path):
+    index = JobDedupIndex(str(tmp_path / "seen.sqlite3"), ttl_days=1)
+    job = {"title": "Old Job", "url": "https://example.com/1"}
+    index.mark_seen([job], now=1.0)
+    assert not index.is_seen(job)
+    assert index.prune() == 2
+    assert len(index) == 0
+
+def test_without_bloom_and_title_matching(tmp_path):
+    index = JobDedupIndex(str(tmp_path / "seen.sqlite3"), use_bloom=False, match_titles=False)
+    index.mark_seen([{"title": "Dev", "url": "https://example.com/1"}])
+    assert index.is_seen({"title": "Other", "url": "https://example.com/1"})
+    assert not index.is_seen({"title": "Dev", "url": "https://example.com/2"})
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000)
+    keys = [_digest(f"job-{i}") for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(_digest(f"other-{i}") in bloom for i in range(1000))
+    assert false_positives < 50
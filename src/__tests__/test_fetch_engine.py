@@ -0,0 +1,160 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from src.scrapers.fetch_engine import AsyncFetchEngine, FetchConfig, FetchResult
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    calls = {}
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+    first_job_seen = threading.Event()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.calls[self.path] = cls.calls.get(self.path, 0) + 1
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+            count = cls.calls[self.path]
+        try:
+            if self.path == "/flaky" and count < 3:
+                self._send(503, b"busy")
+            elif self.path == "/slow":
+                time.sleep(0.5)
+                self._send(200, b"late")
+            elif self.path.startswith("/stream"):
+                self._send_chunked()
+            elif self.path == "/redirect":
+                self.send_response(302)
+                self.send_header("Location", "/page/0")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            else:
+                time.sleep(0.05)
+                self._send(200, f"ok {self.path}".encode())
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunked(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        first = '<html><a data-click-id="body" href="/r/1">Jöb 1</a>'.encode()
+        # Mehrbyte-Zeichen über die Chunk-Grenze splitten
+        second = '<a data-click-id="body" href="/r/2">Jöb 2</a></html>'.encode()
+        cut = second.index("ö".encode()) + 1
+        for part in (first, second[:cut]):
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(part), part))
+        self.wfile.flush()
+        # Rest erst senden, nachdem der Client den ersten Job verarbeitet hat
+        type(self).first_job_seen.wait(timeout=5)
+        rest = second[cut:]
+        self.wfile.write(b"%x\r\n%s\r\n0\r\n\r\n" % (len(rest), rest))
+
+    def log_message(self, *args):
+        pass
+
+class QuietServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Timeout-Tests schließen Verbindungen absichtlich vorzeitig
+        pass
+
+@pytest.fixture
+def server():
+    StubHandler.calls, StubHandler.active, StubHandler.peak = {}, 0, 0
+    StubHandler.first_job_seen = threading.Event()
+    httpd = QuietServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+def run(engine, coro_factory):
+    async def _main():
+        async with engine:
+            return await coro_factory(engine)
+    return asyncio.run(_main())
+
+def test_fetch_all_bounded_per_host_and_reuses_connections(server):
+    engine = AsyncFetchEngine(FetchConfig(per_host_limit=3, retries=0))
+    urls = [f"{server}/page/{i}" for i in range(12)]
+
+    async def fetch_twice(e):
+        first = await e.fetch_all(urls)
+        await e.fetch_all(urls)
+        return first, next(iter(e._pools.values())).created
+
+    results, created = run(engine, fetch_twice)
+    assert [r.text() for r in results] == [f"ok /page/{i}" for i in range(12)]
+    assert StubHandler.peak <= 3
+    assert created <= 3
+
+def test_fetch_retries_with_backoff(server):
+    engine = AsyncFetchEngine(FetchConfig(retries=3, backoff_base=0.01))
+    result = run(engine, lambda e: e.fetch(f"{server}/flaky"))
+    assert result.ok
+    assert result.attempts == 3
+
+def test_fetch_timeout_reports_error(server):
+    engine = AsyncFetchEngine(FetchConfig(timeout=0.1, retries=0))
+    result = run(engine, lambda e: e.fetch(f"{server}/slow"))
+    assert not result.ok
+    assert "timed out" in result.error
+
+def test_fetch_follows_redirect(server):
+    engine = AsyncFetchEngine(FetchConfig(retries=0))
+    result = run(engine, lambda e: e.fetch(f"{server}/redirect"))
+    assert result.ok and result.text() == "ok /page/0"
+
+def test_stream_jobs_yields_before_download_finishes(server, tmp_path):
+    from src.scrapers.free_scraper import stream_jobs
+    from src.scrapers.http_cache import HttpCache
+    cache = HttpCache(str(tmp_path / "cache.json"))
+    source = {"url": f"{server}/stream", "parser": "reddit"}
+
+    async def collect(engine):
+        jobs = []
+        async for job in stream_jobs(engine, source, cache, chunk_size=8):
+            if not jobs:
+                assert not StubHandler.first_job_seen.is_set()
+                StubHandler.first_job_seen.set()
+            jobs.append(job)
+        return jobs
+
+    jobs = run(AsyncFetchEngine(FetchConfig(retries=0)), collect)
+    assert jobs == [{"title": "Jöb 1", "url": "/r/1"}, {"title": "Jöb 2", "url": "/r/2"}]
+    assert cache.entries[source["url"]]["body_hash"]
+
+def test_stream_all_free_sources_merges_sources(server):
+    from src.scrapers.free_scraper import stream_all_free_sources
+    StubHandler.first_job_seen.set()
+    sources = [{"url": f"{server}/stream", "parser": "reddit"},
+               {"url": f"{server}/slow", "parser": "reddit"},
+               {"url": f"{server}/stream?again", "parser": "reddit"}]
+
+    async def collect():
+        return [job async for job in stream_all_free_sources(sources, FetchConfig(retries=0))]
+
+    jobs = asyncio.run(collect())
+    assert sorted(j["url"] for j in jobs) == ["/r/1", "/r/1", "/r/2", "/r/2"]
+
+def test_text_falls_back_to_utf8_for_unknown_charset():
+    body = "Größe".encode("utf-8")
+    assert FetchResult(url="u", status=200, body=body, headers={"content-type": "text/html; charset=x-bogus"}).text() == "Größe"
+    assert FetchResult(url="u", status=200, body="é".encode("latin-1"),
+                       headers={"content-type": "text/html; charset=ISO-8859-1"}).text() == "é"
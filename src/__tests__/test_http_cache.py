@@ -0,0 +1,38 @@
+from src.scrapers.fetch_engine import FetchResult
+from src.scrapers.http_cache import HttpCache
+
+def page(url, body=b"<html></html>", **headers):
+    return FetchResult(url=url, status=200, body=body, headers=headers)
+
+def test_conditional_headers_roundtrip(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = HttpCache(path)
+    assert cache.conditional_headers("http://a") == {}
+    assert not cache.is_unchanged(page("http://a", etag='"abc"', **{"last-modified": "Mon, 01 Jan 2024 00:00:00 GMT"}))
+    cache.save()
+    headers = HttpCache(path).conditional_headers("http://a")
+    assert headers == {"If-None-Match": '"abc"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+
+def test_same_hash_and_304_are_unchanged(tmp_path):
+    cache = HttpCache(str(tmp_path / "cache.json"))
+    assert not cache.is_unchanged(page("http://a", b"one"))
+    assert cache.is_unchanged(page("http://a", b"one"))
+    assert not cache.is_unchanged(page("http://a", b"two"))
+    assert cache.is_unchanged(FetchResult(url="http://a", status=304))
+    assert cache.hits == 2 and cache.misses == 2
+
+def test_errors_are_never_unchanged(tmp_path):
+    cache = HttpCache(str(tmp_path / "cache.json"))
+    assert not cache.is_unchanged(FetchResult(url="http://a", status=304))
+    assert not cache.is_unchanged(FetchResult(url="http://a", error="timeout"))
+
+def test_lru_eviction(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = HttpCache(path, max_entries=2)
+    cache.is_unchanged(page("http://a"))
+    cache.is_unchanged(page("http://b"))
+    cache.is_unchanged(FetchResult(url="http://a", status=304))
+    cache.is_unchanged(page("http://c"))
+    assert list(cache.entries) == ["http://a", "http://c"]
+    cache.save()
+    assert list(HttpCache(path, max_entries=2).entries) == ["http://a", "http://c"]
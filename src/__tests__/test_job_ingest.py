@@ -0,0 +1,205 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+
+from src import api_server
+from src.integrations.job_ingest import IngestClient, ingest_jobs, job_id, job_row, prepare
+from src.integrations.read_cache import ReadThroughCache
+from src.integrations.supabase_client import SupabaseClient, SupabaseError
+
+def scraped(i, **extra):
+    return {"title": f"Job {i}", "description": "<p>desc</p>", "url": f"https://example.com/jobs/{i}",
+            "platform": "remoteok", "source": "rss", **extra}
+
+def test_job_row_normalizes_scraper_output():
+    row = job_row(scraped(1, skills="Python, Django", budget="150"), "user-1")
+    assert row == {"id": job_id(scraped(1)), "user_id": "user-1", "title": "Job 1", "description": "<p>desc</p>",
+                   "budget": 150.0, "skills": ["Python", "Django"], "source": "rss", "status": "new"}
+    # Gleiche URL mit Tracking-Parametern -> gleiche id
+    assert job_id({"url": "https://example.com/jobs/1?utm_source=x", "title": "Other"}) == row["id"]
+    assert job_row({"id": 42, "title": "T"}, "u")["id"] == "42"
+    with pytest.raises(ValueError):
+        job_row({"description": "no title"}, "u")
+
+def test_prepare_dedupes_within_batch():
+    rows, results = prepare([scraped(1), scraped(2), scraped(1, description="newer"), {"budget": 1}], "u")
+    assert [index for index, _ in rows] == [1, 2]
+    assert rows[1][1]["description"] == "newer"
+    assert sorted((item["index"], item["status"]) for item in results) == [(0, "duplicate"), (3, "invalid")]
+
+class FakePostgrest(BaseHTTPRequestHandler):
+    """Upsert-Stand-in: (user_id, id) eindeutig, ein Request ist eine Transaktion"""
+    protocol_version = "HTTP/1.1"
+    table = {}
+    requests = []
+    tokens = set()
+    lock = threading.Lock()
+
+    def do_POST(self):
+        cls = type(self)
+        rows = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        url = urlsplit(self.path)
+        ok = (url.path == "/rest/v1/job_opportunities"
+              and parse_qs(url.query).get("on_conflict") == ["user_id,id"]
+              and "resolution=merge-duplicates" in self.headers.get("Prefer", ""))
+        keys = [(row["user_id"], row["id"]) for row in rows]
+        if not ok:
+            status, body = 400, b'{"message": "expected upsert"}'
+        elif len(set(keys)) != len(keys):
+            status, body = 500, b'{"message": "ON CONFLICT DO UPDATE command cannot affect row a second time"}'
+        elif any(row["budget"] < 0 for row in rows):
+            status, body = 400, b'{"message": "violates check constraint budget_positive"}'
+        else:
+            with cls.lock:
+                cls.requests.append(len(rows))
+                cls.tokens.add(self.headers.get("Authorization"))
+                for key, row in zip(keys, rows):
+                    cls.table[key] = row
+            status, body = 201, b""
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def postgrest():
+    FakePostgrest.table = {}
+    FakePostgrest.requests = []
+    FakePostgrest.tokens = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakePostgrest)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def api(postgrest, monkeypatch):
+    monkeypatch.setattr(api_server, "supabase", SupabaseClient(postgrest, "anon", http2=False))
+    monkeypatch.setattr(api_server, "read_cache", ReadThroughCache())
+    monkeypatch.setattr(api_server, "SUPABASE_SERVICE_KEY", None)
+    token = jwt.encode({"sub": "user-1"}, api_server.SUPABASE_JWT_SECRET, algorithm="HS256")
+    with TestClient(api_server.app) as http:
+        http.headers["Authorization"] = f"Bearer {token}"
+        yield http
+
+def test_bulk_endpoint_upserts_in_chunks(api):
+    jobs = [scraped(i) for i in range(1200)]
+    jobs += [scraped(5, description="rescraped"), {"description": "no title"}, scraped(2000, budget=-5)]
+    resp = api.post("/jobs/bulk", json={"jobs": jobs})
+    assert resp.status_code == 200
+    result = resp.json()
+    assert result["received"] == 1203 and result["unique"] == 1201
+    assert (result["upserted"], result["duplicate"], result["invalid"], result["failed"]) == (1200, 1, 1, 1)
+    statuses = {item["index"]: item for item in result["items"]}
+    assert statuses[5]["status"] == "duplicate" and statuses[1200]["status"] == "upserted"
+    assert statuses[1202]["status"] == "failed" and "budget_positive" in statuses[1202]["error"]
+    assert len(FakePostgrest.table) == 1200
+    assert FakePostgrest.table[("user-1", job_id(scraped(5)))]["description"] == "rescraped"
+    # 3 Chunks à 500; der letzte wird wegen der kaputten Zeile halbiert, bis sie isoliert ist
+    assert max(FakePostgrest.requests) == 500 and sum(FakePostgrest.requests) == 1200
+
+    # Ohne Service-Role-Key schreibt der Server mit dem JWT des Nutzers (RLS: auth.uid() = user_id)
+    assert FakePostgrest.tokens == {api.headers["Authorization"]}
+
+    # Erneuter Ingest ist idempotent
+    assert api.post("/jobs/bulk", json={"jobs": jobs[:10]}).json()["upserted"] == 10
+    assert len(FakePostgrest.table) == 1200
+
+def test_bulk_endpoint_rejects_oversized_batches(api):
+    assert api.post("/jobs/bulk", json={"jobs": [{"title": "x"}] * 10_001}).status_code == 413
+
+def test_bulk_endpoint_prefers_service_role_key(api, monkeypatch):
+    monkeypatch.setattr(api_server, "SUPABASE_SERVICE_KEY", "service-role")
+    assert api.post("/jobs/bulk", json={"jobs": [scraped(1)]}).json()["upserted"] == 1
+    assert FakePostgrest.tokens == {"Bearer service-role"}
+
+def run_ingest(error, jobs=2000, **kwargs):
+    calls, sleeps = [], []
+
+    async def post(path, rows):
+        calls.append(len(rows))
+        raise error
+
+    async def sleep(seconds):
+        sleeps.append(seconds)
+
+    result = asyncio.run(ingest_jobs(post, [scraped(i) for i in range(jobs)], "u", sleep=sleep, **kwargs))
+    return result, calls, sleeps
+
+@pytest.mark.parametrize("status", [401, 403, 413])
+def test_auth_and_size_errors_fail_whole_chunks(status):
+    result, calls, sleeps = run_ingest(SupabaseError(status, "denied"))
+    assert calls == [500] * 4 and not sleeps
+    assert result["failed"] == 2000
+
+def test_rate_limit_honors_retry_after_without_splitting():
+    result, calls, sleeps = run_ingest(SupabaseError(429, "slow down", retry_after=3))
+    # 4 Chunks mit je 1 + 2 Versuchen statt ~2N Requests durch Halbieren
+    assert calls == [500] * 12 and sleeps == [3] * 8
+    assert result["failed"] == 2000
+
+    _, calls, sleeps = run_ingest(SupabaseError(429, "slow down", retry_after=3600))
+    assert calls == [500] * 4 and not sleeps
+
+def test_rate_limit_recovers_after_retry():
+    attempts = []
+
+    async def post(path, rows):
+        attempts.append(len(rows))
+        if len(attempts) == 1:
+            raise SupabaseError(429, "slow down", retry_after=0)
+
+    async def sleep(seconds):
+        pass
+
+    result = asyncio.run(ingest_jobs(post, [scraped(i) for i in range(10)], "u", sleep=sleep))
+    assert result["upserted"] == 10 and attempts == [10, 10]
+
+class FakeBulkApi(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    batches = []
+    connections = set()
+
+    def do_POST(self):
+        cls = type(self)
+        jobs = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["jobs"]
+        cls.batches.append(len(jobs))
+        cls.connections.add(self.client_address)
+        assert self.headers["Authorization"] == "Bearer service-token"
+        result = {"received": len(jobs), "unique": len(jobs), "upserted": len(jobs), "duplicate": 0,
+                  "invalid": 0, "failed": 0,
+                  "items": [{"index": i, "id": str(i), "status": "upserted"} for i in range(len(jobs))]}
+        body = json.dumps(result).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def test_ingest_client_batches_over_one_connection():
+    FakeBulkApi.batches = []
+    FakeBulkApi.connections = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeBulkApi)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = IngestClient(f"http://127.0.0.1:{server.server_address[1]}/api", "service-token", batch_size=400)
+        summary = client.ingest([scraped(i) for i in range(1000)])
+        client.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert FakeBulkApi.batches == [400, 400, 200]
+    assert len(FakeBulkApi.connections) == 1
+    assert summary["upserted"] == 1000
+    assert [item["index"] for item in summary["items"]] == list(range(1000))
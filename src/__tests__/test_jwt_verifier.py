@@ -0,0 +1,114 @@
+import base64
+import json
+import time
+
+import jwt
+import pytest
+
+from src.integrations.jwt_verifier import JWTVerifier, bearer_token
+
+SECRET = "test-secret-with-at-least-32-bytes!!"
+
+def make_token(sub="user-1", exp_in=3600, key=SECRET, **headers):
+    claims = {"sub": sub, "role": "authenticated"}
+    if exp_in is not None:
+        claims["exp"] = int(time.time()) + exp_in
+    return jwt.encode(claims, key, algorithm="HS256", headers=headers or None)
+
+def test_bearer_token_parsing():
+    assert bearer_token("Bearer abc") == "abc"
+    assert bearer_token("bearer  abc ") == "abc"
+    assert bearer_token("Basic abc") is None
+    assert bearer_token("Bearer") is None
+    assert bearer_token(None) is None
+
+def test_cache_hit_skips_decode(monkeypatch):
+    verifier = JWTVerifier(SECRET)
+    token = make_token()
+    assert verifier.verify(token)["sub"] == "user-1"
+    monkeypatch.setattr(verifier, "decode", lambda token: pytest.fail("decoded twice"))
+    assert verifier.verify(token)["sub"] == "user-1"
+    assert verifier.stats == {"hits": 1, "misses": 1, "evictions": 0}
+
+def test_entry_expires_with_token():
+    now = [time.time()]
+    verifier = JWTVerifier(SECRET, clock=lambda: now[0])
+    token = make_token(exp_in=60)
+    verifier.verify(token)
+    now[0] += 59
+    verifier.verify(token)
+    assert verifier.stats["hits"] == 1
+    # Nach exp fällt der Eintrag weg; jwt.decode lehnt das (echt) abgelaufene Token ab
+    now[0] += 2
+    expired = make_token(exp_in=-10)
+    with pytest.raises(jwt.ExpiredSignatureError):
+        verifier.verify(expired)
+    verifier.verify(token)
+    assert verifier.stats["misses"] == 3
+
+def test_tokens_without_exp_are_bounded_by_max_ttl():
+    now = [1000.0]
+    verifier = JWTVerifier(SECRET, max_ttl=30, clock=lambda: now[0])
+    token = make_token(exp_in=None)
+    verifier.verify(token)
+    now[0] += 31
+    verifier.verify(token)
+    assert verifier.stats["misses"] == 2
+
+def test_invalid_tokens_are_rejected_and_not_cached():
+    verifier = JWTVerifier(SECRET)
+    forged = make_token(key="another-secret-with-at-least-32-bytes")
+    for _ in range(2):
+        with pytest.raises(jwt.InvalidTokenError):
+            verifier.verify(forged)
+    with pytest.raises(jwt.InvalidTokenError):
+        verifier.verify("not-a-jwt")
+    assert verifier.stats["hits"] == 0 and len(verifier._cache) == 0
+
+def test_lru_is_bounded():
+    verifier = JWTVerifier(SECRET, max_entries=2)
+    tokens = [make_token(sub=f"user-{i}") for i in range(3)]
+    for token in tokens:
+        verifier.verify(token)
+    assert len(verifier._cache) == 2 and verifier.stats["evictions"] == 1
+
+def test_jwks_keys_selected_by_kid(tmp_path):
+    signing_key = "jwks-signing-key-with-at-least-32-bytes"
+    jwks = {"keys": [
+        {"kty": "oct", "kid": "k1", "alg": "HS256",
+         "k": base64.urlsafe_b64encode(signing_key.encode()).rstrip(b"=").decode()},
+        {"kty": "unknown", "kid": "broken"}
+    ]}
+    path = tmp_path / "jwks.json"
+    path.write_text(json.dumps(jwks))
+    verifier = JWTVerifier(None, jwks_path=str(path))
+    assert list(verifier.keys) == ["k1"]
+    assert verifier.verify(make_token(key=signing_key, kid="k1"))["sub"] == "user-1"
+    with pytest.raises(jwt.InvalidTokenError):
+        verifier.verify(make_token(key=signing_key, kid="k2"))
+
+def per_call(fn, iterations=2000):
+    fn()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations
+
+def test_benchmark_auth_cost_per_request():
+    """Micro-Benchmark: bisheriger verify_jwt-Pfad gegen Cache-Hit"""
+    header = f"Bearer {make_token()}"
+    verifier = JWTVerifier(SECRET)
+
+    def before():
+        scheme, token = header.split()
+        assert scheme.lower() == "bearer"
+        return jwt.decode(token, SECRET, algorithms=["HS256"])
+
+    def after():
+        return verifier.verify(bearer_token(header))
+
+    cost_before = min(per_call(before) for _ in range(3))
+    cost_after = min(per_call(after) for _ in range(3))
+    # Nur der erste Aufruf dekodiert, alle weiteren sind Cache-Hits
+    assert verifier.stats["misses"] == 1 and verifier.stats["hits"] == 3 * 2001 - 1
+    assert cost_after < cost_before / 3, f"{cost_before * 1e6:.1f}us -> {cost_after * 1e6:.1f}us"
@@ -0,0 +1,412 @@
+import asyncio
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from src.ai_service.ai_router import AIRouter
+from src.ai_service.llm_dispatcher import (Completion, LLMDispatcher, LLMTimeout, OpenAICompatTransport,
+                                           ProviderError, ProviderLimits, pack_prompts, split_usage,
+                                           unpack_response)
+from src.ai_service.model_stats import ModelStatsStore
+from src.utils.budget_ledger import BudgetExceeded, BudgetLedger
+
+class FakeProvider(BaseHTTPRequestHandler):
+    """OpenAI-kompatibler Fake: antwortet auf gepackte Prompts mit einem JSON-Array"""
+    protocol_version = "HTTP/1.1"
+    prompts = []
+    prefixes = set()
+    bodies = []
+    active = 0
+    peak = 0
+    broken_packing = False
+    slow_models = set()
+    drop_keepalive = False
+    lock = threading.Lock()
+
+    def do_POST(self):
+        cls = type(self)
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = body["messages"][-1]["content"]
+        system = body["messages"][0]["content"] if len(body["messages"]) > 1 else None
+        cached = 0
+        with cls.lock:
+            cls.prompts.append(prompt)
+            cls.bodies.append(body)
+            if system is not None:
+                prefix = system[0]["text"]
+                # Prompt-Cache: gleicher Prefix ab dem zweiten Request ist "gecacht"
+                if prefix in cls.prefixes:
+                    cached = len(prefix.split())
+                cls.prefixes.add(prefix)
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        try:
+            time.sleep(1.0 if body["model"] in cls.slow_models else 0.05)
+            tasks = re.findall(r"### Task \d+\n(.*?)(?=\n### Task|\Z)", prompt, re.DOTALL)
+            if tasks and not cls.broken_packing:
+                content = json.dumps([f"answer: {task}" for task in tasks])
+            elif tasks:
+                content = "Sorry, here are my thoughts in prose."
+            else:
+                content = f"answer: {prompt}"
+            payload = json.dumps({
+                "choices": [{"message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": len(prompt.split()) + (len(system[0]["text"].split()) if system else 0),
+                          "completion_tokens": len(content.split()),
+                          "prompt_tokens_details": {"cached_tokens": cached}}
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            # Keep-Alive-Verbindung ohne "Connection: close" serverseitig schließen
+            self.close_connection = cls.drop_keepalive
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+class QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass
+
+@pytest.fixture
+def provider():
+    FakeProvider.prompts = []
+    FakeProvider.prefixes = set()
+    FakeProvider.bodies = []
+    FakeProvider.peak = 0
+    FakeProvider.broken_packing = False
+    FakeProvider.slow_models = set()
+    FakeProvider.drop_keepalive = False
+    httpd = QuietServer(("127.0.0.1", 0), FakeProvider)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/v1"
+    httpd.shutdown()
+    httpd.server_close()
+
+@pytest.fixture(autouse=True)
+def model_stats(tmp_path, monkeypatch):
+    # AIRouter speist den prozessweiten Store; in Tests nicht data/models beschreiben
+    store = ModelStatsStore(str(tmp_path / "model_stats.json"))
+    monkeypatch.setattr("src.ai_service.ai_router.get_model_stats", lambda: store)
+    return store
+
+def make_dispatcher(url, **kwargs):
+    return LLMDispatcher(OpenAICompatTransport({"fake": url}), **kwargs)
+
+def test_pack_roundtrip():
+    packed = pack_prompts(["a", "b"])
+    assert "### Task 2\nb" in packed
+    assert unpack_response('Sure: ["x", {"score": 3}]', 2) == ["x", '{"score": 3}']
+    assert unpack_response('["only one"]', 2) is None
+    assert unpack_response("no json", 1) is None
+
+def test_identical_inflight_prompts_are_coalesced(provider):
+    dispatcher = make_dispatcher(provider)
+    async def main():
+        return await asyncio.gather(*(dispatcher.submit("fake", "m", "same prompt") for _ in range(10)))
+    results = asyncio.run(main())
+    assert results == ["answer: same prompt"] * 10
+    assert len(FakeProvider.prompts) == 1
+    assert dispatcher.metrics["coalesced"] == 9
+    dispatcher.close()
+
+def test_usage_is_attributed_per_caller(provider):
+    dispatcher = make_dispatcher(provider, window=0.05, max_pack=4)
+    async def main():
+        same = await asyncio.gather(*(dispatcher.complete("fake", "m", "same prompt") for _ in range(3)))
+        packed = await asyncio.gather(*(dispatcher.complete("fake", "m", f"job {i}", kind="analysis")
+                                        for i in range(3)))
+        return same, packed
+    same, packed = asyncio.run(main())
+    # Nur der erste Aufrufer trägt den gemeinsamen Call
+    assert sorted(c.input_tokens for c in same) == [0, 0, 2]
+    assert sum(c.output_tokens for c in packed) > 0
+    assert max(c.input_tokens for c in packed) - min(c.input_tokens for c in packed) <= 1
+    assert split_usage(Completion("x", 10, 5, 1), ["a", "b", "c"]) == [
+        Completion("a", 4, 2, 1), Completion("b", 3, 2, 0), Completion("c", 3, 1, 0)]
+    dispatcher.close()
+
+def test_analysis_prompts_are_packed(provider):
+    stats = ModelStatsStore("unused.json")
+    dispatcher = make_dispatcher(provider, window=0.05, max_pack=4, stats=stats)
+    async def main():
+        return await asyncio.gather(*(dispatcher.submit("fake", "m", f"job {i}", kind="analysis")
+                                      for i in range(10)))
+    results = asyncio.run(main())
+    assert results == [f"answer: job {i}" for i in range(10)]
+    # 4 + 4 + 2 Items -> drei Provider-Calls statt zehn
+    assert len(FakeProvider.prompts) == 3
+    assert dispatcher.metrics["packed_items"] == 10
+    assert stats.snapshot()["m"]["calls"] == 3
+    dispatcher.close()
+
+def test_broken_pack_falls_back_to_single_calls(provider):
+    FakeProvider.broken_packing = True
+    dispatcher = make_dispatcher(provider, max_pack=3)
+    async def main():
+        return await asyncio.gather(*(dispatcher.submit("fake", "m", f"job {i}", kind="analysis")
+                                      for i in range(3)))
+    assert asyncio.run(main()) == [f"answer: job {i}" for i in range(3)]
+    assert len(FakeProvider.prompts) == 4
+    dispatcher.close()
+
+def test_provider_concurrency_and_rpm_limits(provider):
+    dispatcher = make_dispatcher(provider, limits={"fake": ProviderLimits(max_concurrency=2, rpm=600, burst=2)})
+    async def main():
+        started = time.monotonic()
+        await asyncio.gather(*(dispatcher.submit("fake", "m", f"p{i}") for i in range(6)))
+        return time.monotonic() - started
+    elapsed = asyncio.run(main())
+    assert FakeProvider.peak <= 2
+    # 10 Requests/s bei Burst 2: die letzten vier warten mindestens 0.4s auf Tokens
+    assert elapsed >= 0.35
+    dispatcher.close()
+
+def test_airouter_uses_dispatcher_from_threads(provider, tmp_path, monkeypatch):
+    ledger = BudgetLedger(str(tmp_path / "ledger.sqlite3"))
+    monkeypatch.setattr("src.ai_service.ai_router.get_ledger", lambda: ledger)
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({
+        "openrouter_api_key": "test",
+        "highend_threshold": 100,
+        "proposal_cache": {"enabled": False},
+        "llm_dispatcher": {
+            "providers": {"openrouter": {"base_url": provider, "max_concurrency": 4, "rpm": 6000}},
+            "highend": {"provider": "openrouter", "model": "big"},
+            "costefficient": {"provider": "openrouter", "model": "small"},
+            "analysis": {"provider": "openrouter", "model": "small"},
+            "window_ms": 100
+        }
+    }))
+    router = AIRouter(str(config))
+    jobs = [{"title": f"Job {i}", "description": "short"} for i in range(4)]
+    results = [None] * len(jobs)
+    def analyze(i):
+        results[i] = router.analyze_job_llm(jobs[i])
+    threads = [threading.Thread(target=analyze, args=(i,)) for i in range(len(jobs))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(result.startswith("answer: Job") for result in results)
+    assert len(FakeProvider.prompts) == 1
+    proposal = router.generate_proposal(jobs[0], {"name": "Tester", "skills": ["python"]})
+    assert "Job 0" in proposal
+    assert "Tester" in FakeProvider.bodies[-1]["messages"][0]["content"][0]["text"]
+    router.dispatcher.close()
+
+def test_shared_prefix_prompts_hit_provider_cache(provider, tmp_path, monkeypatch):
+    ledger = BudgetLedger(str(tmp_path / "ledger.sqlite3"))
+    monkeypatch.setattr("src.ai_service.ai_router.get_ledger", lambda: ledger)
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({
+        "highend_threshold": 10000,
+        "proposal_cache": {"enabled": False},
+        "llm_dispatcher": {
+            "providers": {"openrouter": {"base_url": provider}},
+            "costefficient": {"provider": "openrouter", "model": "small"},
+            "pricing": {"small": {"input": 1.0, "cached_input": 0.1, "output": 2.0}}
+        }
+    }))
+    router = AIRouter(str(config))
+    profile = {"name": "Tester", "skills": ["python", "django"], "rate": "50 EUR/h"}
+    for i in range(3):
+        router.generate_proposal({"title": f"Job {i}", "description": f"Build API number {i}."}, profile)
+    systems = [body["messages"][0]["content"][0] for body in FakeProvider.bodies]
+    assert len({entry["text"] for entry in systems}) == 1
+    assert all(entry["cache_control"] == {"type": "ephemeral"} for entry in systems)
+    assert all("Job" not in entry["text"] for entry in systems)
+    usage = ledger.usage("daily")
+    assert usage["cached_input_tokens"] > 0
+    assert usage["uncached_input_tokens"] > usage["cached_input_tokens"] / 2
+    assert 0 < usage["cache_hit_rate"] < 1
+    router.dispatcher.close()
+
+def router_config(tmp_path, provider, pricing):
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({
+        "highend_threshold": 10000,
+        "proposal_cache": {"enabled": False},
+        "llm_dispatcher": {
+            "providers": {"openrouter": {"base_url": provider}},
+            "costefficient": {"provider": "openrouter", "model": "small"},
+            "pricing": {"small": pricing}
+        }
+    }))
+    return str(config)
+
+def test_airouter_reserves_before_dispatch_and_reconciles(provider, tmp_path, monkeypatch):
+    ledger = BudgetLedger(str(tmp_path / "ledger.sqlite3"), daily_limit=1.0, monthly_limit=10.0)
+    monkeypatch.setattr("src.ai_service.ai_router.get_ledger", lambda: ledger)
+    router = AIRouter(router_config(tmp_path, provider, {"input": 0.1, "output": 0.2}))
+    job = {"title": "Job", "description": "Build an API."}
+    router.generate_proposal(job, {"name": "Tester"})
+    rows = ledger.conn.execute("SELECT reserved, cost FROM transactions").fetchall()
+    # Gebucht gegen die Reservierung: Schätzung (inkl. max. Antwortlänge) liegt über den echten Kosten
+    assert len(rows) == 1 and rows[0][0] > rows[0][1] > 0
+    assert ledger.conn.execute("SELECT COUNT(*) FROM reservations").fetchone()[0] == 0
+    assert ledger.status()["daily"]["used"] == pytest.approx(rows[0][1])
+    router.dispatcher.close()
+
+def test_airouter_feeds_model_stats(provider, tmp_path, monkeypatch, model_stats):
+    monkeypatch.setattr("src.ai_service.ai_router.get_ledger",
+                        lambda: BudgetLedger(str(tmp_path / "ledger.sqlite3")))
+    model_stats.save_interval = 0.0
+    router = AIRouter(router_config(tmp_path, provider, {"input": 0.1, "output": 0.2}))
+    job = {"title": "Job", "description": "Build an API."}
+    assert router.generate_proposal_with_model(job, {"name": "Tester"})[1] == "small"
+    assert model_stats.snapshot()["small"]["calls"] == 1
+    loaded = ModelStatsStore(model_stats.path)
+    assert loaded.load() and loaded.snapshot()["small"]["calls"] == 1
+    router.dispatcher.close()
+
+def test_cached_proposal_reports_no_model(provider, tmp_path, monkeypatch):
+    monkeypatch.setattr("src.ai_service.ai_router.get_ledger",
+                        lambda: BudgetLedger(str(tmp_path / "ledger.sqlite3")))
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({
+        "llm_dispatcher": {
+            "providers": {"openrouter": {"base_url": provider}},
+            "costefficient": {"provider": "openrouter", "model": "small"}
+        }
+    }))
+    router = AIRouter(str(config))
+    job = {"title": "Job", "description": "Build an API."}
+    assert router.generate_proposal_with_model(job, {"name": "Tester"})[1] == "small"
+    # Cache-Treffer stammt von keinem aktuellen Call und darf den Bandit nicht beeinflussen
+    proposal, model = router.generate_proposal_with_model(dict(job), {"name": "Tester"})
+    assert proposal and model is None and len(FakeProvider.bodies) == 1
+    router.dispatcher.close()
+
+def test_airouter_refuses_call_when_budget_exhausted(provider, tmp_path, monkeypatch):
+    ledger = BudgetLedger(str(tmp_path / "ledger.sqlite3"), daily_limit=0.01, monthly_limit=10.0)
+    monkeypatch.setattr("src.ai_service.ai_router.get_ledger", lambda: ledger)
+    router = AIRouter(router_config(tmp_path, provider, {"input": 1.0, "output": 2.0}))
+    with pytest.raises(BudgetExceeded):
+        router.generate_proposal({"title": "Job", "description": "Build an API."}, {"name": "Tester"})
+    assert FakeProvider.prompts == []
+    assert ledger.conn.execute("SELECT COUNT(*) FROM reservations").fetchone()[0] == 0
+    router.dispatcher.close()
+
+def test_transport_wraps_network_errors(provider):
+    import socket
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        closed_port = sock.getsockname()[1]
+    transport = OpenAICompatTransport({"down": f"http://127.0.0.1:{closed_port}/v1", "local": provider})
+    with pytest.raises(ProviderError, match="nicht erreichbar"):
+        transport.complete("down", "small", "hello")
+    # Der Ausfall eines Providers betrifft die anderen nicht
+    assert transport.complete("local", "small", "fine").text == "answer: fine"
+    transport.close()
+
+def test_transport_rejects_malformed_body():
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            payload = b'{"choices": []}'
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = QuietServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    transport = OpenAICompatTransport({"odd": f"http://127.0.0.1:{httpd.server_address[1]}/v1"})
+    try:
+        with pytest.raises(ProviderError, match="ungültige Antwort"):
+            transport.complete("odd", "small", "hello")
+    finally:
+        transport.close()
+        httpd.shutdown()
+        httpd.server_close()
+
+def test_transport_retries_stale_keepalive_connection(provider):
+    FakeProvider.drop_keepalive = True
+    transport = OpenAICompatTransport({"local": provider})
+    assert transport.complete("local", "small", "first").text == "answer: first"
+    time.sleep(0.05)
+    assert transport.complete("local", "small", "second").text == "answer: second"
+    assert FakeProvider.prompts == ["first", "second"]
+    transport.close()
+
+def test_airouter_falls_back_on_dispatch_timeout(provider, tmp_path, monkeypatch):
+    ledger = BudgetLedger(str(tmp_path / "ledger.sqlite3"))
+    monkeypatch.setattr("src.ai_service.ai_router.get_ledger", lambda: ledger)
+    FakeProvider.slow_models = {"big"}
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({
+        "highend_threshold": 10,
+        "proposal_cache": {"enabled": False},
+        "llm_dispatcher": {
+            "providers": {"openrouter": {"base_url": provider}},
+            "highend": {"provider": "openrouter", "model": "big"},
+            "costefficient": {"provider": "openrouter", "model": "small"},
+            "analysis": {"provider": "openrouter", "model": "big"},
+            "timeout": 0.3
+        }
+    }))
+    router = AIRouter(str(config))
+    job = {"title": "Job", "description": "A long enough description."}
+    proposal, model = router.generate_proposal_with_model(job, {"name": "Tester"})
+    assert [body["model"] for body in FakeProvider.bodies] == ["big", "small"]
+    # Akzeptanz-Stats gehören dem Modell, das den Text wirklich geschrieben hat
+    assert "Job" in proposal and model == "small"
+    assert router.analyze_job_llm(job) is None
+    FakeProvider.slow_models = {"big", "small"}
+    with pytest.raises(LLMTimeout):
+        router.call_costefficient_llm(job, {"name": "Tester"})
+    # Im Transport gescheiterte Nachzügler geben ihre Reservierung frei
+    assert wait_until(lambda: open_reservations(ledger) == 0)
+    router.dispatcher.close()
+
+def open_reservations(ledger):
+    return ledger.conn.execute("SELECT COUNT(*) FROM reservations").fetchone()[0]
+
+def wait_until(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_timed_out_call_is_still_billed(provider, tmp_path, monkeypatch):
+    ledger = BudgetLedger(str(tmp_path / "ledger.sqlite3"), daily_limit=100.0, monthly_limit=100.0)
+    monkeypatch.setattr("src.ai_service.ai_router.get_ledger", lambda: ledger)
+    FakeProvider.slow_models = {"big"}
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({
+        "highend_threshold": 10,
+        "proposal_cache": {"enabled": False},
+        "llm_dispatcher": {
+            "providers": {"openrouter": {"base_url": provider}},
+            "highend": {"provider": "openrouter", "model": "big"},
+            "costefficient": {"provider": "openrouter", "model": "small"},
+            "pricing": {"big": {"input": 1.0, "output": 2.0}, "small": {"input": 0.1, "output": 0.2}},
+            "timeout": 0.3
+        }
+    }))
+    router = AIRouter(str(config))
+    # Provider antwortet erst nach dem Timeout des Aufrufers, der Call selbst gelingt
+    router.dispatcher.transport.timeout = 5.0
+    router.generate_proposal({"title": "Job", "description": "A long enough description."}, {"name": "Tester"})
+    # Fallback ist gebucht, der weiterlaufende High-End-Call hält seine Reservierung
+    assert open_reservations(ledger) == 1
+    assert wait_until(lambda: open_reservations(ledger) == 0)
+    rows = ledger.conn.execute("SELECT model, cost FROM transactions ORDER BY created_at").fetchall()
+    assert [model for model, _ in rows] == ["small", "big"] and all(cost > 0 for _, cost in rows)
+    assert ledger.status()["daily"]["used"] == pytest.approx(sum(cost for _, cost in rows))
+    router.dispatcher.close()
@@ -0,0 +1,101 @@
+import pytest
+import random
+from src.ai_service.llm_router import AI_MODELS, LLMRouter
+from src.ai_service.model_stats import BanditSelector, Candidate, LatencyHistogram, ModelStatsStore
+
+class Router(LLMRouter):
+    def getBudgetStatus(self):
+        return {"daily": {"remaining": 20}, "monthly": {"remaining": 300}}
+
+def make_router(tmp_path, seed=0):
+    store = ModelStatsStore(str(tmp_path / "stats.json"))
+    return Router(stats=store, selector=BanditSelector(store, rng=random.Random(seed))), store
+
+def test_histogram_quantiles_are_close():
+    histogram = LatencyHistogram()
+    for ms in range(1, 1001):
+        histogram.record(float(ms))
+    assert 500 <= histogram.quantile(0.5) <= 500 * 1.15
+    assert 950 <= histogram.quantile(0.95) <= 950 * 1.15
+
+def test_store_records_and_persists(tmp_path):
+    store = ModelStatsStore(str(tmp_path / "stats.json"))
+    for _ in range(9):
+        store.record_call("gpt-4o", 2.0, output_tokens=100)
+    store.record_call("gpt-4o", 30.0, ok=False)
+    store.record_outcome("PROPOSAL_GENERATION", "gpt-4o", True)
+    snapshot = store.snapshot()["gpt-4o"]
+    assert snapshot["calls"] == 10
+    assert 0 < snapshot["error_rate"] < 0.2
+    assert snapshot["tokens_per_second"] == 50.0
+    assert 2000 <= snapshot["latency_p95_ms"] <= 2300
+    store.save()
+    loaded = ModelStatsStore(store.path)
+    assert loaded.load()
+    assert loaded.snapshot() == store.snapshot()
+    assert loaded.acceptance_for("PROPOSAL_GENERATION", "gpt-4o").accepted == 1
+
+def test_save_if_due_only_when_dirty_and_interval_elapsed(tmp_path):
+    store = ModelStatsStore(str(tmp_path / "stats.json"), save_interval=3600)
+    assert not store.save_if_due(force=True)
+    store.record_call("gpt-4o", 1.0)
+    assert not store.save_if_due()
+    assert store.save_if_due(force=True)
+    assert not store.dirty and not store.save_if_due(force=True)
+    store.save_interval = 0.0
+    store.record_outcome("PROPOSAL_GENERATION", "gpt-4o", False)
+    assert store.save_if_due()
+    loaded = ModelStatsStore(store.path)
+    assert loaded.load() and loaded.acceptance_for("PROPOSAL_GENERATION", "gpt-4o").rejected == 1
+
+def test_prefers_cheap_model_with_equal_quality(tmp_path):
+    router, store = make_router(tmp_path)
+    for _ in range(200):
+        store.record_outcome("PROPOSAL_GENERATION", "claude-3-opus", True)
+        store.record_outcome("PROPOSAL_GENERATION", "claude-3-haiku", True)
+    picks = [router.selectBestModel("PROPOSAL_GENERATION", {"input": 500, "output": 1500})["modelId"]
+             for _ in range(100)]
+    # Thompson Sampling exploriert gelegentlich, die Mehrheit geht an das günstige Modell
+    assert picks.count("claude-3-haiku") >= 90
+
+def test_learned_rejections_move_away_from_model(tmp_path):
+    router, store = make_router(tmp_path)
+    for model_id in ("claude-3-haiku", "gpt-3.5-turbo", "gemini-1.5-flash"):
+        for _ in range(300):
+            store.record_outcome("CLIENT_COMMUNICATION", model_id, False)
+    choice = router.selectBestModel("CLIENT_COMMUNICATION", {"input": 500, "output": 500})
+    assert choice["modelId"] not in ("claude-3-haiku", "gpt-3.5-turbo", "gemini-1.5-flash")
+
+def test_latency_slo_filters_slow_models(tmp_path):
+    store = ModelStatsStore(str(tmp_path / "stats.json"))
+    for _ in range(30):
+        store.record_call("slow", 9.0)
+        store.record_call("quick", 0.5)
+    selector = BanditSelector(store, rng=random.Random(1))
+    candidates = [Candidate("slow", 0.9, 0.001), Candidate("quick", 0.9, 0.01)]
+    assert selector.select("JOB_FILTERING", candidates, latency_slo_ms=3000)["modelId"] == "quick"
+    # Hält keiner das SLO, gewinnt der schnellste
+    assert selector.select("JOB_FILTERING", candidates, latency_slo_ms=100)["modelId"] == "quick"
+
+def test_force_high_quality_picks_best_quality(tmp_path):
+    router, _ = make_router(tmp_path)
+    choice = router.selectBestModel("PROJECT_PLANNING", {"input": 500, "output": 1500}, force_high_quality=True)
+    assert choice["modelId"] in ("gpt-4o", "claude-3-opus", "gemini-1.5-pro")
+
+def test_cached_input_is_discounted(tmp_path):
+    router, _ = make_router(tmp_path)
+    full = router.estimateCost("claude-3-sonnet", {"input": 2000, "output": 0})
+    cached = router.estimateCost("claude-3-sonnet", {"input": 2000, "cachedInput": 1500, "output": 0})
+    assert cached == pytest.approx(full * (500 + 1500 * 0.1) / 2000)
+
+def test_low_budget_downgrade_counts_cached_input(tmp_path):
+    class LowBudget(LLMRouter):
+        def getBudgetStatus(self):
+            return {"daily": {"remaining": 0.2}, "monthly": {"remaining": 300}}
+    models = {m: AI_MODELS[m] for m in ("claude-3-haiku", "local-llama3")}
+    router = LowBudget(models=models, stats=ModelStatsStore(str(tmp_path / "stats.json")))
+    estimate = {"input": 2_000_000, "cachedInput": 1_800_000, "output": 0}
+    choice = router.selectBestModel("PROPOSAL_GENERATION", estimate)
+    # Ohne Cache-Rabatt (0.50) läge der Call über dem Restbudget
+    assert choice["modelId"] == "claude-3-haiku"
+    assert choice["estimatedCost"] == pytest.approx(router.estimateCost("claude-3-haiku", estimate))
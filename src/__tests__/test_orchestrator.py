@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("sklearn")
+
+from src.ai_service.orchestrator import AIOrchestrator
+
+class FastModel:
+    def pre_filter(self, job):
+        return job.get("keep", True)
+
+class BalancedModel:
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def analyze(self, job):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.calls[job["id"]] = self.calls.get(job["id"], 0) + 1
+            calls = self.calls[job["id"]]
+        try:
+            if job.get("flaky") and calls == 1:
+                raise RuntimeError("provider hiccup")
+            time.sleep(job.get("delay", 0.02))
+            return {**job, "score": job["score"]}
+        finally:
+            with self.lock:
+                self.active -= 1
+
+class PreciseModel:
+    def __init__(self):
+        self.validated = []
+
+    def validate(self, job):
+        self.validated.append(job["id"])
+        return {"validated": True}
+
+def make_orchestrator(**kwargs):
+    models = {"fast": FastModel(), "balanced": BalancedModel(), "precise": PreciseModel()}
+    return AIOrchestrator(max_workers=8, retry_backoff=0.01, models=models, **kwargs)
+
+def test_batch_process_jobs_bounded_and_sorted():
+    orchestrator = make_orchestrator(max_concurrency=3)
+    jobs = [{"id": i, "score": i / 10} for i in range(10)] + [{"id": "x", "score": 1, "keep": False}]
+    results = asyncio.run(orchestrator.batch_process_jobs(jobs))
+    assert [r["id"] for r in results[:3]] == [9, 8, 7]
+    assert results[0]["validated"] and "validated" not in results[-2]
+    assert next(r for r in results if r["id"] == "x")["reason"] == "Failed pre-filter"
+    assert orchestrator.models["balanced"].peak <= 3
+
+def test_stream_yields_in_completion_order_without_blocking_loop():
+    orchestrator = make_orchestrator(max_concurrency=4)
+    jobs = [{"id": "slow", "score": 0.1, "delay": 0.3}, {"id": "fast", "score": 0.2, "delay": 0.01}]
+
+    async def main():
+        ticks = 0
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+        tick_task = asyncio.create_task(ticker())
+        order = [r["id"] async for r in orchestrator.stream_process_jobs(jobs)]
+        tick_task.cancel()
+        return order, ticks
+
+    order, ticks = asyncio.run(main())
+    assert order == ["fast", "slow"]
+    assert ticks >= 10
+
+def test_retry_and_timeout():
+    orchestrator = make_orchestrator(job_timeout=0.1, retries=1)
+    jobs = [{"id": "flaky", "score": 0.5, "flaky": True}, {"id": "hang", "score": 0.9, "delay": 0.3}]
+    results = asyncio.run(orchestrator.batch_process_jobs(jobs))
+    assert [r["id"] for r in results] == ["flaky"]
+    assert orchestrator.models["balanced"].calls["flaky"] == 2
+    # Nach dem Timeout kein zweiter Versuch, und der hängende Thread überspringt die Validierung
+    orchestrator.executor.shutdown(wait=True)
+    assert orchestrator.models["balanced"].calls["hang"] == 1
+    assert orchestrator.models["precise"].validated == []
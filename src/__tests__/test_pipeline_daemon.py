@@ -0,0 +1,171 @@
+import asyncio
+import json
+import threading
+import time
+
+from src.scrapers.dedup_index import JobDedupIndex
+from src.utils.budget_ledger import BudgetExceeded
+from src.system.pipeline_daemon import PipelineConfig, PipelineDaemon
+from src.utils.proposal_submitter import PROPOSAL_QUEUE
+from src.utils.work_queue import WorkQueue
+
+class FakeScheduler:
+    """Liefert Jobs in Wellen wie SourceScheduler.run_forever"""
+    def __init__(self, waves, interval=0.05):
+        self.waves = waves
+        self.interval = interval
+        self.queue = None
+
+    async def run_forever(self, stop):
+        for wave in self.waves:
+            for job in wave:
+                await self.queue.put(job)
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=self.interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+
+class FakeRouter:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.analyzed = []
+        self.lock = threading.Lock()
+
+    def analyze_job(self, job):
+        with self.lock:
+            self.analyzed.append(job["title"])
+        return {"roi": 10 if "good" in job["title"] else 1, "mode": "costefficient"}
+
+    def generate_proposal(self, job, profile):
+        time.sleep(self.delay)
+        return f"Proposal for {job['title']} by {profile['name']}"
+
+    def generate_proposal_with_model(self, job, profile):
+        return self.generate_proposal(job, profile), None
+
+def job(title):
+    return {"title": title, "url": f"https://example.com/{title.replace(' ', '-')}", "description": "d"}
+
+def make_daemon(tmp_path, router, scheduler, submitted, submit=None, **config):
+    config.setdefault("checkpoint_interval", 0.05)
+    config.setdefault("submit_poll_interval", 0.05)
+    config.setdefault("outbox_path", str(tmp_path / "outbox.sqlite3"))
+    return PipelineDaemon(
+        router, {"name": "Tester"},
+        PipelineConfig(checkpoint_path=str(tmp_path / "checkpoint.json"), **config),
+        scheduler=scheduler, dedup=JobDedupIndex(str(tmp_path / "seen.sqlite3")),
+        submit=submit or (lambda job, proposal: submitted.append((job["title"], proposal)))
+    )
+
+async def run_until(daemon, condition, timeout=5.0):
+    stop = asyncio.Event()
+    task = asyncio.ensure_future(daemon.run(stop))
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    stop.set()
+    await task
+
+def test_jobs_flow_through_all_stages(tmp_path):
+    submitted = []
+    waves = [[job("good 1"), job("bad 1"), job("good 2")], [job("good 1"), job("good 3")]]
+    daemon = make_daemon(tmp_path, FakeRouter(), FakeScheduler(waves), submitted)
+    asyncio.run(run_until(daemon, lambda: len(submitted) == 3))
+    assert sorted(title for title, _ in submitted) == ["good 1", "good 2", "good 3"]
+    assert daemon.stats["duplicates"] == 1 and daemon.stats["filtered"] == 1
+    # Sekunden statt Stunden vom Scrapen bis zum Submit
+    assert max(daemon.latencies) < 1.0
+    assert json.loads((tmp_path / "checkpoint.json").read_text()) == []
+
+def test_shutdown_checkpoints_and_resumes(tmp_path):
+    submitted = []
+    slow = FakeRouter(delay=0.3)
+    waves = [[job(f"good {i}") for i in range(4)]]
+    daemon = make_daemon(tmp_path, slow, FakeScheduler(waves), submitted, generation_workers=1, drain_timeout=0.1)
+    asyncio.run(run_until(daemon, lambda: daemon.stats["scored"] == 4))
+    saved = json.loads((tmp_path / "checkpoint.json").read_text())
+    outbox = WorkQueue(str(tmp_path / "outbox.sqlite3"))
+    waiting = outbox.counts(PROPOSAL_QUEUE)["pending"]
+    outbox.close()
+    # Generierte, noch nicht abgeschickte Proposals liegen in der Work-Queue statt im Checkpoint
+    assert saved and len(saved) + waiting + len(submitted) == 4
+    assert {item["stage"] for item in saved} == {"generate"}
+
+    # Neuer Prozess: gesicherte Jobs werden ohne erneutes Scraping/Scoring fertig verarbeitet
+    resumed_router = FakeRouter()
+    resumed = make_daemon(tmp_path, resumed_router, FakeScheduler([]), submitted)
+    asyncio.run(run_until(resumed, lambda: len(submitted) == 4))
+    assert sorted(title for title, _ in submitted) == [f"good {i}" for i in range(4)]
+    assert resumed_router.analyzed == []
+    assert json.loads((tmp_path / "checkpoint.json").read_text()) == []
+
+def test_backpressure_bounds_queues(tmp_path):
+    submitted = []
+    waves = [[job(f"good {i}") for i in range(30)]]
+    router = FakeRouter(delay=0.01)
+    daemon = make_daemon(tmp_path, router, FakeScheduler(waves), submitted, queue_size=2, generation_workers=1)
+    peaks = {"generate": 0}
+
+    async def main():
+        stop = asyncio.Event()
+        task = asyncio.ensure_future(daemon.run(stop))
+        while len(submitted) < 30:
+            if daemon.queues:
+                peaks["generate"] = max(peaks["generate"], daemon.queues["generate"].qsize())
+            await asyncio.sleep(0.001)
+        stop.set()
+        await task
+
+    asyncio.run(asyncio.wait_for(main(), 10))
+    assert peaks["generate"] <= 2
+    assert len(submitted) == 30
+
+def test_failed_submits_are_retried_and_never_doubled(tmp_path):
+    submitted = []
+    failures = {"good 1": 2}
+
+    def flaky_submit(job, proposal):
+        if failures.get(job["title"], 0) > 0:
+            failures[job["title"]] -= 1
+            raise ConnectionError("platform unavailable")
+        submitted.append((job["title"], proposal))
+
+    waves = [[job("good 1"), job("good 2")]]
+    daemon = make_daemon(tmp_path, FakeRouter(), FakeScheduler(waves), submitted, submit=flaky_submit,
+                         submit_backoff=0.01)
+    asyncio.run(run_until(daemon, lambda: len(submitted) == 2))
+    assert sorted(title for title, _ in submitted) == ["good 1", "good 2"]
+    assert daemon.stats["retried"] == 2
+
+    (tmp_path / "fresh").mkdir()
+    # Derselbe Job in einem späteren Lauf (z.B. nach Verlust des Dedup-Index): kein zweiter Submit
+    rerun = make_daemon(tmp_path / "fresh", FakeRouter(), FakeScheduler([[job("good 1")]]), submitted,
+                        outbox_path=str(tmp_path / "outbox.sqlite3"))
+    asyncio.run(run_until(rerun, lambda: rerun.stats["generated"] == 1))
+    assert len(submitted) == 2 and rerun.stats["duplicates"] == 1
+
+def test_budget_errors_keep_job_for_retry(tmp_path):
+    submitted = []
+    router = FakeRouter()
+    failures = {"left": 2}
+    generate = router.generate_proposal
+
+    def limited(job, profile):
+        if failures["left"]:
+            failures["left"] -= 1
+            raise BudgetExceeded("daily budget exhausted")
+        return generate(job, profile)
+    router.generate_proposal = limited
+
+    daemon = make_daemon(tmp_path, router, FakeScheduler([[job("good 1")]]), submitted, retry_delay=10)
+    asyncio.run(run_until(daemon, lambda: daemon.stats["deferred"] == 1))
+    # Weder verworfen noch als gesehen markiert: der Checkpoint hält den Job
+    saved = json.loads((tmp_path / "checkpoint.json").read_text())
+    assert [item["stage"] for item in saved] == ["generate"] and submitted == []
+    assert not daemon.dedup.is_seen(job("good 1"))
+
+    resumed = make_daemon(tmp_path, router, FakeScheduler([]), submitted, retry_delay=0.01)
+    asyncio.run(run_until(resumed, lambda: len(submitted) == 1))
+    assert resumed.stats["deferred"] == 1 and submitted[0][0] == "good 1"
+    assert resumed.dedup.is_seen(job("good 1"))
@@ -0,0 +1,129 @@
+import asyncio
+import json
+from urllib.parse import parse_qsl, unquote
+
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+
+from src import api_server
+from src.integrations.postgrest import (decode_cursor, encode_cursor, iterate_pages, list_query, parse_fields,
+                                        split_page)
+from src.integrations.read_cache import ReadThroughCache
+
+JOB_FIELDS = ["id", "title", "description", "budget", "skills", "source", "status"]
+
+def test_cursor_roundtrip():
+    assert decode_cursor(encode_cursor("job/42?x")) == "job/42?x"
+    with pytest.raises(ValueError):
+        decode_cursor("%%%")
+
+def test_parse_fields():
+    assert parse_fields(None, JOB_FIELDS) == JOB_FIELDS
+    assert parse_fields("title, budget", JOB_FIELDS) == ["id", "title", "budget"]
+    assert parse_fields("id,title", JOB_FIELDS) == ["id", "title"]
+    with pytest.raises(ValueError):
+        parse_fields("title,user_id", JOB_FIELDS)
+
+def test_list_query():
+    path = list_query("job_opportunities", {"user_id": "eq.user 1"}, ["id", "title"], 50, after="a&b")
+    assert path == ("job_opportunities?user_id=eq.user%201&select=id,title&order=id.asc&limit=51"
+                    "&id=gt.a%26b")
+
+def test_split_page():
+    rows = [{"id": str(i)} for i in range(3)]
+    assert split_page(rows, 3) == (rows, None)
+    assert split_page(rows, None) == (rows, None)
+    page, cursor = split_page(rows, 2)
+    assert page == rows[:2] and decode_cursor(cursor) == "1"
+
+class FakePostgrest:
+    """Wertet select/order/limit/id=gt. wie PostgREST auf einer In-Memory-Tabelle aus"""
+    def __init__(self, rows):
+        self.rows = sorted(rows, key=lambda row: row["id"])
+        self.paths = []
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def json(self, method, path, token, **kwargs):
+        self.paths.append(path)
+        params = dict((key, unquote(value)) for key, value in parse_qsl(path.split("?", 1)[1], keep_blank_values=True))
+        rows = [row for row in self.rows if row["user_id"] == params["user_id"][3:]]
+        if "id" in params:
+            rows = [row for row in rows if row["id"] > params["id"][3:]]
+        columns = params["select"].split(",")
+        if "limit" in params:
+            rows = rows[:int(params["limit"])]
+        return [{column: row[column] for column in columns} for row in rows]
+
+def make_jobs(count, user="user-1"):
+    return [{"id": f"job-{i:05d}", "user_id": user, "title": f"Job {i}", "description": "<p>" + "x" * 500 + "</p>",
+             "budget": float(i), "skills": ["Python"], "source": "rss", "status": "new"} for i in range(count)]
+
+@pytest.fixture
+def api(monkeypatch):
+    fake = FakePostgrest(make_jobs(25) + make_jobs(5, user="user-2"))
+    monkeypatch.setattr(api_server, "supabase", fake)
+    monkeypatch.setattr(api_server, "read_cache", ReadThroughCache())
+    token = jwt.encode({"sub": "user-1"}, api_server.SUPABASE_JWT_SECRET, algorithm="HS256")
+    with TestClient(api_server.app) as http:
+        http.headers["Authorization"] = f"Bearer {token}"
+        yield http, fake
+
+def test_keyset_pagination(api):
+    http, _ = api
+    seen, cursor = [], None
+    while True:
+        resp = http.get("/jobs", params={"limit": 10, **({"after": cursor} if cursor else {})})
+        assert resp.status_code == 200
+        seen += [row["id"] for row in resp.json()]
+        cursor = resp.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert seen == [f"job-{i:05d}" for i in range(25)]
+    assert http.get("/jobs", params={"limit": 5000}).status_code == 422
+    assert http.get("/jobs", params={"after": "%%%"}).status_code == 400
+
+def test_without_limit_returns_all_rows_unpaginated(api):
+    # Bestehende Clients (fetchJobs ohne params) sehen weiter alle Zeilen
+    http, fake = api
+    resp = http.get("/jobs")
+    assert [row["id"] for row in resp.json()] == [f"job-{i:05d}" for i in range(25)]
+    assert "X-Next-Cursor" not in resp.headers and "limit=" not in fake.paths[-1]
+    resp = http.get("/jobs", params={"after": encode_cursor("job-00002")})
+    assert len(resp.json()) == 22 and "limit=101" in fake.paths[-1]
+
+def test_field_projection(api):
+    http, fake = api
+    resp = http.get("/jobs", params={"fields": "title,budget", "limit": 3})
+    assert resp.json() == [{"id": f"job-{i:05d}", "title": f"Job {i}", "budget": float(i)} for i in range(3)]
+    assert "select=id,title,budget" in fake.paths[-1]
+    assert http.get("/jobs", params={"fields": "user_id"}).status_code == 400
+    # ETag/304 gilt auch pro Seite
+    again = http.get("/jobs", params={"fields": "title,budget", "limit": 3},
+                     headers={"If-None-Match": resp.headers["ETag"]})
+    assert again.status_code == 304 and again.headers["X-Next-Cursor"] == resp.headers["X-Next-Cursor"]
+
+def test_ndjson_export_streams_all_pages(api, monkeypatch):
+    http, fake = api
+    monkeypatch.setattr("src.integrations.postgrest.EXPORT_PAGE_SIZE", 10)
+    with http.stream("GET", "/jobs", params={"format": "ndjson", "fields": "title"}) as resp:
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in resp.iter_lines() if line]
+    assert [row["id"] for row in lines] == [f"job-{i:05d}" for i in range(25)]
+    assert set(lines[0]) == {"id", "title"}
+    assert len(fake.paths) == 3
+
+def test_iterate_pages_stops_on_empty_table():
+    async def fetch(path):
+        return []
+
+    async def main():
+        return [page async for page in iterate_pages(fetch, "jobs", {}, ["id"])]
+
+    assert asyncio.run(main()) == []
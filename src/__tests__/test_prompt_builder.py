@@ -0,0 +1,90 @@
+import json
+import os
+from src.ai_service.prompt_builder import PromptBuilder, TokenCounter, clean_description, summarize
+
+SCRAPED_JOBS = os.path.join("data", "scraped_jobs.json")
+
+def test_clean_description_strips_html():
+    text = clean_description('<p>Hello &amp; welcome<br/>to <strong>Python</strong></p><ul><li>Django</li></ul>')
+    assert text == "Hello & welcome\nto Python\nDjango"
+
+def test_counter_truncate_respects_budget():
+    counter = TokenCounter()
+    text = "word " * 500
+    assert counter.count(counter.truncate(text, 50)) <= 50
+    assert counter.truncate("short", 50) == "short"
+
+def test_summarize_keeps_first_and_keyword_sentences():
+    counter = TokenCounter()
+    text = ("We are a company. " + "We like coffee and long meetings. " * 20 +
+            "You know Python and Django. " + "Our office has plants. " * 20)
+    summary, truncated = summarize(text, 20, counter, ["python", "django"])
+    assert truncated
+    assert summary.startswith("We are a company.")
+    assert "You know Python and Django." in summary
+    assert counter.count(summary) <= 20
+
+def test_prompt_fits_token_target():
+    builder = PromptBuilder()
+    job = {"title": "Backend Engineer", "description": "<p>" + "Build Python APIs for clients. " * 400 + "</p>"}
+    prompt = builder.build_proposal(job, {"name": "Max", "skills": ["python"]}, max_input_tokens=300)
+    assert prompt.truncated
+    assert builder.counter.count(prompt.text) <= prompt.input_tokens <= 300
+    assert "<p>" not in prompt.text
+    assert prompt.token_estimate == {"input": prompt.input_tokens, "output": 600}
+
+def test_short_jobs_are_not_truncated_and_templates_localized():
+    builder = PromptBuilder()
+    prompt = builder.build_proposal({"title": "X", "description": "Kurz."}, {"name": "Max"}, lang="de")
+    assert not prompt.truncated
+    assert "Sehr geehrter Auftraggeber," in prompt.text
+    analysis = builder.build_analysis({"title": "X", "description": "Short."})
+    assert analysis.text.endswith("Expected ROI:")
+    assert analysis.output_tokens == 60
+
+def test_estimate_defaults_without_job():
+    builder = PromptBuilder()
+    assert builder.estimate("PROPOSAL_GENERATION") == {"input": 900, "output": 600}
+    assert builder.estimate("JOB_FILTERING", {"title": "t", "description": "d"})["output"] == 60
+
+def test_scraped_jobs_stay_within_budget():
+    with open(SCRAPED_JOBS, encoding="utf-8") as f:
+        jobs = json.load(f)
+    builder = PromptBuilder()
+    for job in jobs:
+        prompt = builder.build_proposal(job, {"name": "Max", "skills": ["python", "react"]})
+        assert builder.counter.count(prompt.text) <= prompt.input_tokens <= 900
+
+def test_shared_prefix_layout_is_byte_stable():
+    builder = PromptBuilder()
+    profile = {"name": "Max", "skills": ["python"], "rate": "50 EUR/h", "city": "Berlin"}
+    reordered = {"city": "Berlin", "rate": "50 EUR/h", "skills": ["python"], "name": "Max"}
+    first = builder.build_proposal({"title": "A", "description": "One."}, profile, layout="shared_prefix")
+    second = builder.build_proposal({"title": "B", "description": "Two."}, reordered, layout="shared_prefix")
+    assert first.prefix == second.prefix
+    assert "A" not in first.prefix and first.suffix.startswith("Write a job proposal for 'A'")
+    assert first.text.startswith(first.prefix)
+    messages = first.messages()
+    assert messages[0]["content"][0]["cache_control"] == {"type": "ephemeral"}
+    assert "cache_control" not in first.messages(cache_breakpoints=False)[0]["content"][0]
+    assert first.input_tokens >= builder.counter.count(first.text)
+    # Kurze Prefixe liegen unter der Cache-Mindestgröße: kein Rabatt angenommen
+    assert "cachedInput" not in first.token_estimate
+
+def test_long_prefix_reports_cached_tokens():
+    builder = PromptBuilder()
+    profile = {"name": "Max", "skills": ["python"], "portfolio": "Built many APIs. " * 400}
+    prompt = builder.build_proposal({"title": "A", "description": "One."}, profile,
+                                    max_input_tokens=4000, layout="shared_prefix")
+    assert prompt.token_estimate["cachedInput"] >= 1024
+
+def test_default_limits_leave_job_budget_with_cacheable_prefix():
+    builder = PromptBuilder()
+    profile = {"name": "Max", "skills": ["python"], "portfolio": "Built many APIs. " * 400}
+    job = {"title": "A", "description": "Build a Python API for our shop. " * 20}
+    prompt = builder.build_proposal(job, profile, layout="shared_prefix")
+    prefix = builder.shared_prefix(profile)
+    assert prefix.tokens >= 1024
+    assert prompt.token_estimate["cachedInput"] == prefix.tokens
+    assert not prompt.truncated and job["description"].strip() in prompt.suffix
+    assert builder.counter.count(prompt.text) <= prompt.input_tokens <= prefix.tokens + 2 + 900
@@ -0,0 +1,156 @@
+import asyncio
+import time
+
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+
+from src import api_server
+from src.integrations.read_cache import ReadThroughCache, etag_for, etag_matches
+
+def test_etag_matching():
+    etag = etag_for([{"id": 1}])
+    assert etag == etag_for([{"id": 1}]) and etag != etag_for([{"id": 2}])
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag) and not etag_matches('"other"', etag)
+
+def test_concurrent_misses_share_one_fetch():
+    cache = ReadThroughCache()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return [{"id": "1"}]
+
+    async def main():
+        entries = await asyncio.gather(*(cache.get_or_fetch("u1", "jobs", "jobs?u1", fetch) for _ in range(50)))
+        assert len({entry.etag for entry in entries}) == 1
+        await cache.get_or_fetch("u1", "jobs", "jobs?u1", fetch)
+        # Anderer Nutzer: eigener Eintrag
+        await cache.get_or_fetch("u2", "jobs", "jobs?u2", fetch)
+
+    asyncio.run(main())
+    assert len(calls) == 2
+    metrics = cache.metrics()
+    assert metrics["misses"] == 2 and metrics["coalesced"] == 49 and metrics["hits"] == 1
+
+def test_ttl_expiry(monkeypatch):
+    cache = ReadThroughCache(ttls={"jobs": 10})
+    values = iter(["old", "new"])
+
+    async def fetch():
+        return next(values)
+
+    async def get():
+        return (await cache.get_or_fetch("u1", "jobs", "p", fetch)).value
+
+    assert asyncio.run(get()) == "old"
+    assert asyncio.run(get()) == "old"
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert asyncio.run(get()) == "new"
+
+def test_errors_are_not_cached():
+    cache = ReadThroughCache()
+    attempts = []
+
+    async def fetch():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise ConnectionError("upstream down")
+        return "ok"
+
+    async def main():
+        results = await asyncio.gather(*(cache.get_or_fetch("u1", "jobs", "p", fetch) for _ in range(3)),
+                                       return_exceptions=True)
+        assert all(isinstance(result, ConnectionError) for result in results)
+        assert (await cache.get_or_fetch("u1", "jobs", "p", fetch)).value == "ok"
+
+    asyncio.run(main())
+    assert len(attempts) == 2
+
+def test_invalidation_during_fetch_is_not_cached():
+    cache = ReadThroughCache()
+    versions = iter(["before write", "after write"])
+
+    async def fetch():
+        value = next(versions)
+        await asyncio.sleep(0.05)
+        return value
+
+    async def main():
+        pending = asyncio.ensure_future(cache.get_or_fetch("u1", "settings", "p", fetch))
+        await asyncio.sleep(0.01)
+        cache.invalidate("u1", "settings")
+        # Neuer Leser wartet nicht auf den veralteten Fetch
+        fresh = await cache.get_or_fetch("u1", "settings", "p", fetch)
+        assert (await pending).value == "before write"
+        assert fresh.value == "after write"
+        assert (await cache.get_or_fetch("u1", "settings", "p", fetch)).value == "after write"
+
+    asyncio.run(main())
+
+class FakeSupabase:
+    """Ersetzt den Pool-Client: zählt Upstream-Calls pro Pfad"""
+    def __init__(self):
+        self.calls = []
+        self.proposals = [{"id": "p1", "job_id": "j1", "content": "Hi", "status": "draft"}]
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def json(self, method, path, token, **kwargs):
+        self.calls.append((method, path))
+        if method == "POST":
+            self.proposals = self.proposals + kwargs["json"]
+            return kwargs["json"]
+        if path.startswith("proposals"):
+            return self.proposals
+        if path.startswith("job_opportunities"):
+            return [{"id": "j1", "title": "Dev", "description": "d", "budget": 100.0,
+                     "skills": ["Python"], "source": "rss"}]
+        return []
+
+@pytest.fixture
+def api(monkeypatch):
+    fake = FakeSupabase()
+    monkeypatch.setattr(api_server, "supabase", fake)
+    monkeypatch.setattr(api_server, "read_cache", ReadThroughCache())
+    token = jwt.encode({"sub": "user-1"}, api_server.SUPABASE_JWT_SECRET, algorithm="HS256")
+    with TestClient(api_server.app) as http:
+        http.headers["Authorization"] = f"Bearer {token}"
+        yield http, fake
+
+def test_etag_and_304(api):
+    http, fake = api
+    first = http.get("/jobs")
+    assert first.status_code == 200 and first.json()[0]["id"] == "j1"
+    etag = first.headers["ETag"]
+    second = http.get("/jobs", headers={"If-None-Match": etag})
+    assert second.status_code == 304 and second.content == b"" and second.headers["ETag"] == etag
+    assert http.get("/jobs").json() == first.json()
+    assert len(fake.calls) == 1
+
+def test_create_proposal_invalidates(api, monkeypatch):
+    http, fake = api
+
+    class Router:
+        def getBudgetStatus(self):
+            return {"daily": {"remaining": 10.0}}
+
+    monkeypatch.setattr("src.ai_service.llm_router.getLLMRouter", lambda: Router())
+    before = http.get("/proposals")
+    assert len(before.json()) == 1
+    created = http.post("/proposals", json={"id": "p2", "job_id": "j2", "content": "Hello", "status": "draft"})
+    assert created.status_code == 200
+    after = http.get("/proposals", headers={"If-None-Match": before.headers["ETag"]})
+    assert after.status_code == 200 and len(after.json()) == 2
+    assert after.headers["ETag"] != before.headers["ETag"]
+    assert [method for method, _ in fake.calls] == ["GET", "POST", "GET"]
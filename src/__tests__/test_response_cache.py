@@ -0,0 +1,42 @@
+import time
+
+from src.ai_service.response_cache import ProposalCache, normalize_job_text
+
+PROFILE = {"name": "Tester", "skills": ["Python"]}
+
+def job(title, description="Build a Django backend with Celery workers and Postgres"):
+    return {"title": title, "description": description}
+
+def test_normalize_strips_html_and_whitespace():
+    assert normalize_job_text({"title": "Dev", "description": "<p>Hello&nbsp;<b>World</b></p>\n"}) == "dev hello world"
+
+def test_exact_similar_and_miss():
+    cache = ProposalCache(similarity_threshold=0.8)
+    cache.put(job("Django Dev"), PROFILE, "Hi, Django Dev here")
+    assert cache.get(job("Django Dev"), PROFILE).kind == "exact"
+    hit = cache.get(job("Django Developer"), PROFILE)
+    assert hit.kind == "similar" and hit.similarity >= 0.8
+    assert hit.adapt(job("Django Developer")) == "Hi, Django Developer here"
+    assert cache.get(job("Logo", "Design a logo for a bakery"), PROFILE) is None
+    assert cache.get(job("Django Dev"), {"name": "Other"}) is None
+    assert cache.metrics()["hit_rate"] == 0.5
+
+def test_template_version_and_variant_isolate_entries():
+    cache = ProposalCache()
+    cache.put(job("Dev"), PROFILE, "v1", variant="highend")
+    assert cache.get(job("Dev"), PROFILE, variant="costefficient") is None
+    assert ProposalCache(template_version="2").get(job("Dev"), PROFILE) is None
+
+def test_lru_eviction_and_ttl(monkeypatch):
+    cache = ProposalCache(max_entries=2, ttl=10)
+    cache.put(job("A", "alpha"), PROFILE, "a")
+    cache.put(job("B", "beta"), PROFILE, "b")
+    assert cache.get(job("A", "alpha"), PROFILE)
+    cache.put(job("C", "gamma"), PROFILE, "c")
+    assert cache.get(job("B", "beta"), PROFILE) is None
+    assert cache.metrics()["evictions"] == 1
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 60)
+    assert cache.get(job("A", "alpha"), PROFILE) is None
+    assert cache.metrics()["size"] == 0 and cache.metrics()["expirations"] == 2
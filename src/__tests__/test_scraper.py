@@ -1,34 +1,51 @@
 import pytest
+from src.scrapers.fetch_engine import AsyncFetchEngine, FetchResult
 from src.scrapers.free_scraper import scrape_all_free_sources
 
 def test_scraper_success(monkeypatch):
-    def mock_urlopen(url):
-        class Response:
-            def getcode(self): return 200
-            def read(self): return b'<html><a data-click-id="body" href="/r/test">Test Job</a></html>'
-            def __enter__(self): return self
-            def __exit__(self, *args): pass
-        return Response()
-    monkeypatch.setattr("urllib.request.urlopen", mock_urlopen)
+    def mock_request(self, url, headers):
+        return FetchResult(url=url, status=200, body=b'<html><a data-click-id="body" href="/r/test">Test Job</a></html>')
+    monkeypatch.setattr(AsyncFetchEngine, "_request_blocking", mock_request)
     jobs = scrape_all_free_sources()
     assert isinstance(jobs, list)
     assert any('Test Job' in j['title'] for j in jobs)
 
 def test_scraper_empty(monkeypatch):
-    def mock_urlopen(url):
-        class Response:
-            def getcode(self): return 200
-            def read(self): return b''
-            def __enter__(self): return self
-            def __exit__(self, *args): pass
-        return Response()
-    monkeypatch.setattr("urllib.request.urlopen", mock_urlopen)
+    def mock_request(self, url, headers):
+        return FetchResult(url=url, status=200, body=b'')
+    monkeypatch.setattr(AsyncFetchEngine, "_request_blocking", mock_request)
     jobs = scrape_all_free_sources()
     assert jobs == []
 
 def test_scraper_http_error(monkeypatch):
-    def mock_urlopen(url):
-        raise Exception("404 Not Found")
-    monkeypatch.setattr("urllib.request.urlopen", mock_urlopen)
+    def mock_request(self, url, headers):
+        return FetchResult(url=url, error="HTTPError: 404 Not Found")
+    monkeypatch.setattr(AsyncFetchEngine, "_request_blocking", mock_request)
     jobs = scrape_all_free_sources()
     assert jobs == []
+
+def test_scraper_skips_unchanged_pages(monkeypatch, tmp_path):
+    from src.scrapers.http_cache import HttpCache
+    seen_headers = []
+    def mock_request(self, url, headers):
+        seen_headers.append(headers)
+        if headers.get("If-None-Match") == '"v1"':
+            return FetchResult(url=url, status=304, headers={"etag": '"v1"'})
+        return FetchResult(url=url, status=200, headers={"etag": '"v1"'},
+                           body=b'<a data-click-id="body" href="/r/x">Cached Job</a>')
+    monkeypatch.setattr(AsyncFetchEngine, "_request_blocking", mock_request)
+    cache = HttpCache(str(tmp_path / "cache.json"))
+    assert scrape_all_free_sources(cache=cache)
+    assert scrape_all_free_sources(cache=HttpCache(str(tmp_path / "cache.json"))) == []
+    assert seen_headers[-1] == {"If-None-Match": '"v1"'}
+
+def test_parse_jobs_indeed_and_incremental_feed():
+    from src.scrapers.free_scraper import IndeedLinkParser, parse_jobs
+    html = '<a class>x</a><a class="jcs-JobTitle css-1" href="/viewjob?jk=1">Remote Dev</a>'
+    assert parse_jobs(html, "indeed") == [{"title": "Remote Dev", "url": "https://indeed.com/viewjob?jk=1"}]
+    assert parse_jobs(html, "unknown") == []
+    parser = IndeedLinkParser()
+    parser.feed(html[:40])
+    assert parser.drain() == []
+    parser.feed(html[40:])
+    assert len(parser.drain()) == 1 and parser.links == []
@@ -0,0 +1,102 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.scrapers.fetch_engine import FetchResult
+from src.scrapers.free_scraper import parse_jobs
+from src.scrapers.source_registry import (
+    SOURCE_REGISTRY, RateLimiter, SourceScheduler, SourceSpec,
+    query_paginator, scrape_registered_sources,
+)
+
+RSS = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>WWR</title>
+<item><title>Acme: Python Dev</title><link>https://weworkremotely.com/remote-jobs/acme-python</link>
+<description>&lt;p&gt;Build things&lt;/p&gt;</description></item>
+</channel></rss>"""
+
+def fake_fetcher(pages):
+    async def fetch(engine, url, headers=None):
+        delay, body = pages[url]
+        await asyncio.sleep(delay)
+        return FetchResult(url=url, status=200, body=body.encode())
+    return fetch
+
+def test_builtin_sources_registered():
+    assert {"reddit_forhire", "indeed_remote", "weworkremotely"} <= set(SOURCE_REGISTRY)
+    indeed = SOURCE_REGISTRY["indeed_remote"]
+    assert indeed.page_urls()[2] == "https://www.indeed.com/jobs?q=remote&fromage=1&start=20"
+
+def test_query_paginator_replaces_param():
+    page = query_paginator("page", start=1)
+    assert page("https://x.io/jobs?page=9&q=a", 2) == "https://x.io/jobs?q=a&page=3"
+
+def test_rss_parser_matches_scraped_jobs_format():
+    jobs = parse_jobs(RSS, "rss")
+    assert jobs == [{
+        "title": "Acme: Python Dev",
+        "description": "<p>Build things</p>",
+        "url": "https://weworkremotely.com/remote-jobs/acme-python",
+        "platform": "weworkremotely.com",
+        "source": "rss",
+    }]
+    assert parse_jobs("<html>not xml", "rss") == []
+
+def test_scrape_registered_sources_with_custom_plugin():
+    fast = SourceSpec("fast_board", "https://fast.io/jobs.rss", "rss", rate_limit=100,
+                      fetcher=fake_fetcher({"https://fast.io/jobs.rss": (0, RSS)}))
+    jobs = scrape_registered_sources([fast], parse_executor=ThreadPoolExecutor(2))
+    assert len(jobs) == 1 and jobs[0]["source"] == "rss" and jobs[0]["source_name"] == "fast_board"
+
+def test_failing_source_does_not_drop_healthy_ones():
+    async def broken(engine, url, headers=None):
+        raise LookupError("unknown encoding: x-bogus")
+
+    healthy = SourceSpec("healthy", "https://ok.io/rss", "rss", rate_limit=100,
+                         fetcher=fake_fetcher({"https://ok.io/rss": (0, RSS)}))
+    failing = SourceSpec("failing", "https://bad.io/rss", "rss", rate_limit=100, fetcher=broken)
+    jobs = scrape_registered_sources([failing, healthy], parse_executor=ThreadPoolExecutor(2))
+    assert [job["url"] for job in jobs] == ["https://weworkremotely.com/remote-jobs/acme-python"]
+
+def test_slow_source_does_not_block_fast_one():
+    pages = {"https://fast.io/rss": (0, RSS), "https://slow.io/rss": (0.5, RSS)}
+    fast = SourceSpec("fast", "https://fast.io/rss", "rss", rate_limit=100, fetcher=fake_fetcher(pages))
+    slow = SourceSpec("slow", "https://slow.io/rss", "rss", rate_limit=100, fetcher=fake_fetcher(pages))
+
+    async def first_arrival():
+        queue = asyncio.Queue()
+        scheduler = SourceScheduler([slow, fast], queue, parse_executor=ThreadPoolExecutor(2))
+        task = asyncio.create_task(scheduler.run_once())
+        started = time.monotonic()
+        job = await queue.get()
+        elapsed = time.monotonic() - started
+        await task
+        return job, elapsed, scheduler.stats
+
+    job, elapsed, stats = asyncio.run(first_arrival())
+    assert elapsed < 0.4
+    assert stats["fast"] == {"crawls": 1, "jobs": 1, "errors": 0}
+    assert stats["slow"]["jobs"] == 1
+
+def test_pagination_respects_rate_limit():
+    urls = [f"https://x.io/rss?p={i}" for i in range(3)]
+    spec = SourceSpec("paged", "https://x.io/rss", "rss", rate_limit=20, pages=3,
+                      paginate=query_paginator("p"), fetcher=fake_fetcher({u: (0, RSS) for u in urls}))
+    started = time.monotonic()
+    jobs = scrape_registered_sources([spec], parse_executor=ThreadPoolExecutor(1))
+    assert len(jobs) == 3
+    assert time.monotonic() - started >= 0.09
+
+def test_default_process_pool_parsing():
+    spec = SourceSpec("proc", "https://p.io/rss", "rss", rate_limit=100,
+                      fetcher=fake_fetcher({"https://p.io/rss": (0, RSS)}))
+    assert len(scrape_registered_sources([spec])) == 1
+
+def test_rate_limiter_spacing():
+    async def burst():
+        limiter = RateLimiter(rate=50)
+        started = time.monotonic()
+        for _ in range(4):
+            await limiter.acquire()
+        return time.monotonic() - started
+    assert asyncio.run(burst()) >= 0.055
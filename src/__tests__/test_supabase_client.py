@@ -0,0 +1,148 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+
+from src import api_server
+from src.integrations.read_cache import ReadThroughCache
+from src.integrations.supabase_client import (DEFAULT_ROUTE_TIMEOUTS, DEFAULT_TIMEOUT, CircuitOpenError, SupabaseClient,
+                                              SupabaseError, route_of)
+
+class FakeSupabase(BaseHTTPRequestHandler):
+    """PostgREST-Stub: merkt sich Requests und Client-Verbindungen"""
+    protocol_version = "HTTP/1.1"
+    connections = set()
+    requests = []
+    failing = set()
+    slow = set()
+    lock = threading.Lock()
+
+    def _handle(self):
+        cls = type(self)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        route = self.path.split("/rest/v1/", 1)[1].split("?", 1)[0]
+        with cls.lock:
+            cls.connections.add(self.client_address)
+            cls.requests.append((self.command, self.path, self.headers.get("Authorization"), body))
+        if route in cls.slow:
+            time.sleep(0.3)
+        if route in cls.failing:
+            payload, status = b'{"message": "upstream down"}', 503
+        else:
+            payload, status = json.dumps([{"route": route, "id": "1"}]).encode("utf-8"), 200
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PATCH = _handle
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stub():
+    FakeSupabase.connections = set()
+    FakeSupabase.requests = []
+    FakeSupabase.failing = set()
+    FakeSupabase.slow = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeSupabase)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def test_route_of():
+    assert route_of("job_opportunities?user_id=eq.1") == "job_opportunities"
+    assert route_of("/rpc/search_jobs") == "rpc"
+
+def test_connections_are_reused(stub):
+    async def main():
+        client = SupabaseClient(stub, "anon", http2=False)
+        await client.start()
+        for _ in range(20):
+            data = await client.json("GET", "job_opportunities?user_id=eq.u1", "anon")
+            assert data == [{"route": "job_opportunities", "id": "1"}]
+        await asyncio.gather(*(client.json("GET", "proposals?user_id=eq.u1", "anon") for _ in range(10)))
+        await client.close()
+
+    asyncio.run(main())
+    assert len(FakeSupabase.requests) == 30
+    # 20 sequentielle Requests über eine Verbindung, der parallele Burst höchstens über 10
+    assert len(FakeSupabase.connections) <= 11
+
+def test_per_route_timeout(stub):
+    FakeSupabase.slow.add("earnings_forecast")
+
+    async def main():
+        client = SupabaseClient(stub, "anon", http2=False,
+                                route_timeouts={"earnings_forecast": httpx.Timeout(0.1)})
+        try:
+            with pytest.raises(httpx.TimeoutException):
+                await client.json("GET", "earnings_forecast?user_id=eq.u1", "anon")
+            assert await client.json("GET", "proposals", "anon")
+        finally:
+            await client.close()
+
+    asyncio.run(main())
+
+def test_timeouts_are_keyed_by_method_and_route():
+    client = SupabaseClient("http://localhost", "anon",
+                            route_timeouts={**DEFAULT_ROUTE_TIMEOUTS, "rpc": httpx.Timeout(3.0)})
+    assert client.timeout_for("get", "job_opportunities").read == 5.0
+    # Bulk-Upserts bekommen nicht das knappe Polling-Timeout der Leseroute
+    assert client.timeout_for("POST", "job_opportunities").read == 30.0
+    assert client.timeout_for("POST", "rpc").read == 3.0
+    assert client.timeout_for("PATCH", "proposals") == DEFAULT_TIMEOUT
+
+def test_circuit_breaker_opens_and_recovers(stub):
+    FakeSupabase.failing.add("proposals")
+
+    async def main():
+        client = SupabaseClient(stub, "anon", http2=False, failure_threshold=3, reset_timeout=0.2)
+        try:
+            for _ in range(3):
+                with pytest.raises(SupabaseError):
+                    await client.json("GET", "proposals", "anon")
+            with pytest.raises(CircuitOpenError):
+                await client.json("GET", "proposals", "anon")
+            assert len(FakeSupabase.requests) == 3
+            # Andere Routen sind nicht betroffen
+            assert await client.json("GET", "user_settings", "anon")
+            await asyncio.sleep(0.25)
+            FakeSupabase.failing.clear()
+            assert await client.json("GET", "proposals", "anon")
+            assert client.breaker("proposals").state == "closed"
+        finally:
+            await client.close()
+
+    asyncio.run(main())
+
+def test_api_server_uses_lifespan_client(stub, monkeypatch):
+    client = SupabaseClient(stub, "anon", http2=False, failure_threshold=1, reset_timeout=60)
+    monkeypatch.setattr(api_server, "supabase", client)
+    # Ohne Read-Cache, damit jeder Request den Upstream trifft
+    monkeypatch.setattr(api_server, "read_cache", ReadThroughCache(ttls={}, default_ttl=0))
+    token = jwt.encode({"sub": "user-1"}, api_server.SUPABASE_JWT_SECRET, algorithm="HS256")
+    headers = {"Authorization": f"Bearer {token}"}
+    with TestClient(api_server.app) as http:
+        assert client.client is not None
+        resp = http.get("/analytics", headers=headers)
+        assert resp.status_code == 200
+        assert resp.json()["forecasts"] == [{"route": "earnings_forecast", "id": "1"}]
+        assert FakeSupabase.requests[-1][1] == "/rest/v1/earnings_forecast?user_id=eq.user-1"
+
+        FakeSupabase.failing.add("earnings_forecast")
+        assert http.get("/analytics", headers=headers).status_code == 503
+        resp = http.get("/analytics", headers=headers)
+        assert resp.status_code == 503 and "Retry-After" in resp.headers
+    assert client.client is None
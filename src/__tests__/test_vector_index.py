@@ -0,0 +1,32 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.ai_service.vector_index import JobProfileMatcher, LSHIndex, benchmark_recall
+
+def test_insert_query_and_delete():
+    index = LSHIndex(dim=4, n_tables=4, n_bits=4)
+    index.add_batch(["a", "b", "c"], np.array([[1, 0, 0, 0], [0.9, 0.1, 0, 0], [0, 0, 1, 0]]))
+    assert [key for key, _ in index.query([1, 0, 0, 0], k=2)] == ["a", "b"]
+    assert index.remove("a") and not index.remove("a")
+    assert "a" not in index and len(index) == 2
+    assert index.query([1, 0, 0, 0], k=1)[0][0] == "b"
+    index.add("a", [0, 0, 1, 0])
+    assert {key for key, _ in index.query([0, 0, 1, 0], k=2)} == {"a", "c"}
+
+def test_rejects_wrong_dimension():
+    with pytest.raises(ValueError):
+        LSHIndex(dim=3).add("x", [1, 2])
+
+def test_matcher_answers_both_directions():
+    matcher = JobProfileMatcher(dim=3, n_tables=4, n_bits=4)
+    matcher.add_jobs(["py", "design"], np.array([[1, 0.1, 0], [0, 0, 1]]))
+    matcher.set_profile("user-1", [1, 0, 0])
+    matcher.set_profile("user-2", [0, 0.1, 1])
+    assert matcher.top_jobs_for_profile("user-1", k=1)[0][0] == "py"
+    assert matcher.top_profiles_for_job([0, 0, 1], k=1)[0][0] == "user-2"
+
+def test_benchmark_recall_against_brute_force():
+    result = benchmark_recall(n_items=5000, dim=64, n_queries=50, n_clusters=100)
+    assert result["recall"] >= 0.9
+    assert result["lsh_ms_per_query"] > 0 and result["brute_ms_per_query"] > 0
@@ -0,0 +1,150 @@
+import threading
+
+import pytest
+from src.ai_service.model_stats import ModelStatsStore
+from src.utils.proposal_submitter import (PROPOSAL_QUEUE, drain_submissions, queue_proposal, record_proposal_outcome,
+                                          submission_key)
+from src.utils.work_queue import WorkQueue
+
+def make_queue(tmp_path, **kwargs):
+    kwargs.setdefault("jitter", 0.0)
+    return WorkQueue(str(tmp_path / "queue.sqlite3"), **kwargs)
+
+def test_enqueue_is_idempotent_per_key(tmp_path):
+    queue = make_queue(tmp_path)
+    assert queue.enqueue("proposals", "job-1", {"text": "a"})
+    assert not queue.enqueue("proposals", "job-1", {"text": "b"})
+    item, = queue.claim("proposals")
+    assert item.payload == {"text": "a"}
+    assert queue.ack(item)
+    # Auch nach erfolgreichem Submit bleibt der Key belegt
+    assert not queue.enqueue("proposals", "job-1", {"text": "c"})
+    assert queue.claim("proposals") == []
+    assert queue.enqueue("other", "job-1", {"text": "d"})
+
+def test_claim_in_batches_and_visibility_timeout(tmp_path):
+    queue = make_queue(tmp_path, visibility_timeout=60)
+    for i in range(5):
+        queue.enqueue("q", f"job-{i}", {"i": i}, now=100.0 + i)
+    first = queue.claim("q", limit=3, now=200.0)
+    assert [item.key for item in first] == ["job-0", "job-1", "job-2"]
+    second = queue.claim("q", limit=3, now=200.0)
+    assert [item.key for item in second] == ["job-3", "job-4"]
+    assert queue.claim("q", now=259.0) == []
+    # Worker abgestürzt: nach Ablauf der Lease wird neu zugestellt, alte Lease ist ungültig
+    redelivered = queue.claim("q", limit=10, now=261.0)
+    assert len(redelivered) == 5 and all(item.attempts == 2 for item in redelivered)
+    assert not queue.ack(first[0], now=262.0)
+    assert queue.ack(redelivered[0], now=262.0)
+
+def test_backoff_and_dead_letter(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=3, backoff_base=10, backoff_max=15)
+    queue.enqueue("q", "job", {}, now=0.0)
+    item, = queue.claim("q", now=0.0)
+    assert queue.fail(item, "HTTP 503", now=1.0) == "pending"
+    assert queue.claim("q", now=10.0) == []
+    item, = queue.claim("q", now=11.0)
+    assert queue.fail(item, "HTTP 503", now=11.0) == "pending"
+    # Backoff ist gedeckelt: 20s -> 15s
+    assert queue.claim("q", now=25.0) == []
+    item, = queue.claim("q", now=26.0)
+    assert queue.fail(item, "HTTP 400", now=26.0) == "dead"
+    assert queue.claim("q", now=10_000.0) == []
+    dead, = queue.dead_letters("q")
+    assert dead["key"] == "job" and dead["attempts"] == 3 and dead["last_error"] == "HTTP 400"
+    assert queue.counts("q")["dead"] == 1
+    assert queue.retry_dead("q", now=10_000.0) == 1
+    assert queue.claim("q", now=10_001.0)[0].attempts == 1
+
+def test_expired_lease_after_last_attempt_is_dead_lettered(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=1, visibility_timeout=5)
+    queue.enqueue("q", "job", {}, now=0.0)
+    queue.claim("q", now=0.0)
+    assert queue.claim("q", now=6.0) == []
+    assert queue.get("q", "job")["status"] == "dead"
+
+def test_release_returns_item_without_counting_attempt(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.enqueue("q", "job", {})
+    item, = queue.claim("q")
+    assert queue.release(item)
+    assert queue.claim("q")[0].attempts == 1
+
+def test_items_survive_reopen(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.enqueue("q", "job", {"proposal": "paid for"})
+    queue.claim("q", visibility_timeout=0)
+    queue.close()
+    reopened = make_queue(tmp_path)
+    item, = reopened.claim("q")
+    assert item.payload == {"proposal": "paid for"} and item.attempts == 2
+
+def test_concurrent_workers_never_share_items(tmp_path):
+    setup = make_queue(tmp_path)
+    for i in range(200):
+        setup.enqueue("q", f"job-{i}", {})
+    claimed = []
+    lock = threading.Lock()
+
+    def worker():
+        queue = make_queue(tmp_path)
+        while True:
+            items = queue.claim("q", limit=7)
+            if not items:
+                break
+            with lock:
+                claimed.extend(item.key for item in items)
+            for item in items:
+                queue.ack(item)
+        queue.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(claimed) == 200 and len(set(claimed)) == 200
+    assert setup.counts("q")["done"] == 200
+
+def test_drain_submissions_retries_failures(tmp_path):
+    queue = make_queue(tmp_path, backoff_base=0.0)
+    jobs = [{"id": str(i), "source": "upwork", "title": f"Job {i}"} for i in range(3)]
+    for job in jobs:
+        assert queue_proposal(job, f"Proposal {job['id']}", queue)
+    assert not queue_proposal(jobs[0], "regenerated", queue)
+    assert submission_key(jobs[0]) == "upwork:0"
+
+    sent = []
+    def submit(job, proposal):
+        if job["id"] == "1" and not any(title == "Job 1 failed" for title in sent):
+            sent.append("Job 1 failed")
+            raise ConnectionError("timeout")
+        sent.append(job["title"])
+        return {"status": "submitted", "job_id": job["id"]}
+
+    stats = drain_submissions(submit, queue, batch_size=2)
+    assert stats == {"submitted": 3, "retried": 1, "dead": 0}
+    assert sent.count("Job 0") == 1 and sent.count("Job 1") == 1
+    assert queue.get(PROPOSAL_QUEUE, "upwork:0")["result"] == {"status": "submitted", "job_id": "0"}
+
+def test_submission_outcomes_feed_model_stats(tmp_path):
+    queue = make_queue(tmp_path)
+    store = ModelStatsStore(str(tmp_path / "stats.json"))
+    jobs = [{"id": str(i), "source": "upwork", "title": f"Job {i}"} for i in range(3)]
+    queue_proposal(jobs[0], "A", queue, model="big")
+    queue_proposal(jobs[1], "B", queue, model="small")
+    queue_proposal(jobs[2], "C", queue)
+    results = {"0": {"status": "accepted"}, "1": {"status": "submitted"}, "2": {"status": "rejected"}}
+    drain_submissions(lambda job, proposal: results[job["id"]], queue, model_stats=store)
+    assert store.acceptance_for("PROPOSAL_GENERATION", "big").accepted == 1
+    # Noch offen bzw. ohne bekanntes Modell: kein Signal
+    assert store.acceptance == {"PROPOSAL_GENERATION:big": store.acceptance_for("PROPOSAL_GENERATION", "big")}
+    # Die Absage kommt erst später
+    assert record_proposal_outcome(jobs[1], False, queue, store)
+    assert store.acceptance_for("PROPOSAL_GENERATION", "small").rejected == 1
+    assert not record_proposal_outcome(jobs[2], True, queue, store)
+    assert not record_proposal_outcome({"id": "9", "source": "upwork"}, True, queue, store)
+
+def test_queue_proposal_requires_identity(tmp_path):
+    with pytest.raises(ValueError):
+        queue_proposal({"description": "no id"}, "text", make_queue(tmp_path))
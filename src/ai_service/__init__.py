@@ -0,0 +1,3 @@
+from .ai_router import AIRouter
+
+__all__ = ["AIRouter"]
@@ -1,5 +1,12 @@
+import concurrent.futures
 import json
 import random
+from .llm_dispatcher import LLMDispatcher, LLMTimeout, OpenAICompatTransport, ProviderLimits
+from .model_stats import get_model_stats
+from .prompt_builder import get_prompt_builder
+from .prompt_templates import TEMPLATE_VERSION
+from .response_cache import ProposalCache
+from src.utils.budget_ledger import get_ledger
 
 class AIRouter:
   def __init__(self, config_path):
@@ -11,29 +18,153 @@ class AIRouter:
     self.gemini_key = self.config.get("gemini_api_key")
     self.token_budget = self.config.get("token_budget", 500)
     self.highend_threshold = self.config.get("highend_threshold", 100)
+    cache_config = self.config.get("proposal_cache", {})
+    self.proposal_cache = ProposalCache(
+      max_entries=cache_config.get("max_entries", 1024),
+      ttl=cache_config.get("ttl_seconds", 7 * 86400),
+      similarity_threshold=cache_config.get("similarity_threshold", 0.9),
+      template_version=TEMPLATE_VERSION
+    ) if cache_config.get("enabled", True) else None
+    # Optional: echte Provider-Calls über den Dispatcher (Coalescing, Packing, Limits)
+    self.dispatch_config = self.config.get("llm_dispatcher")
+    self.stats = get_model_stats() if self.dispatch_config else None
+    self.dispatcher = self._build_dispatcher(self.dispatch_config) if self.dispatch_config else None
+
+  def _build_dispatcher(self, dispatch_config):
+    providers = dispatch_config.get("providers", {})
+    keys = {"openrouter": self.openrouter_key, "openai": self.openai_key, "google": self.gemini_key}
+    transport = OpenAICompatTransport(
+      {name: provider["base_url"] for name, provider in providers.items()},
+      {name: keys.get(name) or provider.get("api_key") for name, provider in providers.items()},
+      timeout=dispatch_config.get("timeout", 60)
+    )
+    limits = {
+      name: ProviderLimits(provider.get("max_concurrency", 4), provider.get("rpm", 60), provider.get("burst", 5))
+      for name, provider in providers.items()
+    }
+    return LLMDispatcher(transport, limits, window=dispatch_config.get("window_ms", 50) / 1000,
+                         max_pack=dispatch_config.get("max_pack", 8), stats=self.stats)
+
+  def _cost(self, model, input_tokens, output_tokens, cached_input_tokens=0):
+    # pricing: USD pro 1k Tokens; gecachte Input-Tokens zum Cache-Preis
+    price = self.dispatch_config.get("pricing", {}).get(model, {})
+    return ((input_tokens - cached_input_tokens) * price.get("input", 0) +
+            cached_input_tokens * price.get("cached_input", price.get("input", 0)) +
+            output_tokens * price.get("output", 0)) / 1000
+
+  def _proposal_prompt(self, route, job, user_profile):
+    # Shared-Prefix Layout: Profil/Template zuerst (byte-stabil, cachebar), Job zuletzt
+    layout = self.dispatch_config.get("prompt_layout", "shared_prefix")
+    built = get_prompt_builder().build_proposal(job, user_profile, layout=layout)
+    provider = self.dispatch_config["providers"].get(self.dispatch_config[route]["provider"], {})
+    # OpenAI cached automatisch und kennt kein cache_control
+    breakpoints = provider.get("cache_breakpoints", self.dispatch_config[route]["provider"] != "openai")
+    return built, built.messages(cache_breakpoints=breakpoints)
+
+  def _dispatch(self, route, built, prompt, kind="completion"):
+    # Budget vor dem Call reservieren (Obergrenze: ungecachter Input + maximale Antwort);
+    # reicht es nicht, wirft reservation() BudgetExceeded und es gibt keinen Provider-Call.
+    # Bei Timeout bleibt die Reservierung stehen, bis der weiterlaufende Call fertig ist
+    # und wird dann gegen dessen echte Kosten gebucht; der Aufrufer bekommt LLMTimeout
+    target = self.dispatch_config[route]
+    model = target["model"]
+    with get_ledger().reservation(self._cost(model, built.input_tokens, built.output_tokens)) as reservation:
+      def settle_late(completion):
+        if completion is None:
+          reservation.release()
+        else:
+          self._commit(reservation, model, completion)
+      try:
+        completion = self.dispatcher.complete_threadsafe(target["provider"], model, prompt, kind,
+                                                         timeout=self.dispatch_config.get("timeout", 60),
+                                                         on_late=settle_late)
+      except concurrent.futures.TimeoutError:
+        reservation.keep()
+        raise LLMTimeout(f"{target['provider']}/{model} hat nicht innerhalb des Timeouts geantwortet")
+      self._commit(reservation, model, completion)
+    self.stats.save_if_due()
+    return completion.text
+
+  def _commit(self, reservation, model, completion):
+    reservation.commit(self._cost(model, completion.input_tokens, completion.output_tokens,
+                                  completion.cached_input_tokens),
+                       model=model, input_tokens=completion.input_tokens,
+                       output_tokens=completion.output_tokens,
+                       cached_input_tokens=completion.cached_input_tokens)
   
+  def _proposal_mode(self, job):
+    # Je nach Länge der Jobbeschreibung high-end oder kosteneffizient
+    return "highend" if len(job.get("description", "")) > self.highend_threshold else "costefficient"
+
   def analyze_job(self, job):
     # Simulierte Analyse: Je nach Länge der Jobbeschreibung wird zwischen high-end und kosteneffizient gewählt.
-    description = job.get("description", "")
-    mode = "highend" if len(description) > self.highend_threshold else "costefficient"
+    mode = self._proposal_mode(job)
     roi = random.uniform(0, 20)  # Simulierter ROI-Wert
     return {"roi": roi, "mode": mode}
   
   def generate_proposal(self, job, user_profile):
     # Wählt anhand der Analyse den geeigneten LLM-Modus zur Proposal-Erzeugung.
+    return self.generate_proposal_with_model(job, user_profile)[0]
+
+  def generate_proposal_with_model(self, job, user_profile):
+    # Wie generate_proposal, liefert zusätzlich das Modell, das den Text tatsächlich erzeugt hat
+    # (nach Fallback das kosteneffiziente). None bei Cache-Treffern und ohne Dispatcher, damit
+    # record_outcome dafür keine Annahmequote verbucht.
     analysis = self.analyze_job(job)
     mode = analysis.get("mode", "costefficient")
-    if mode == "highend":
-      return self.call_highend_llm(job, user_profile)
+    # Near-Duplicates (Reposts, Crossposts) aus dem Cache bedienen statt neu zu generieren
+    if self.proposal_cache is not None:
+      hit = self.proposal_cache.get(job, user_profile, variant=mode)
+      if hit is not None:
+        return hit.adapt(job), None
+    if self.dispatcher is not None:
+      proposal, model = self._proposal_llm(mode, job, user_profile)
+    elif mode == "highend":
+      proposal, model = self.call_highend_llm(job, user_profile), None
     else:
-      return self.call_costefficient_llm(job, user_profile)
+      proposal, model = self.call_costefficient_llm(job, user_profile), None
+    if self.proposal_cache is not None:
+      self.proposal_cache.put(job, user_profile, proposal, variant=mode)
+    return proposal, model
+
+  def _proposal_llm(self, mode, job, user_profile):
+    # (Text, Modell) über den Dispatcher; hängt das High-End-Modell, übernimmt das kosteneffiziente
+    try:
+      text = self._dispatch(mode, *self._proposal_prompt(mode, job, user_profile))
+    except LLMTimeout as e:
+      if mode != "highend":
+        raise
+      print(f"{e}, Fallback auf costefficient")
+      return self._proposal_llm("costefficient", job, user_profile)
+    return text, self.dispatch_config[mode]["model"]
+
+  def analyze_job_llm(self, job, lang='en'):
+    # LLM-Analyse (Relevanz/Budget/ROI); gleichzeitige Analysen werden zu einem Call gepackt
+    if self.dispatcher is None:
+      return None
+    built = get_prompt_builder().build_analysis(job, lang)
+    try:
+      return self._dispatch("analysis", built, built.text, kind="analysis")
+    except LLMTimeout as e:
+      # Wie ohne Dispatcher: Aufrufer nutzen dann die einfache Analyse
+      print(f"LLM-Analyse übersprungen: {e}")
+      return None
+
+  def cache_metrics(self):
+    # Hit-Rate etc. des Proposal-Caches (leer, wenn deaktiviert)
+    return self.proposal_cache.metrics() if self.proposal_cache is not None else {}
   
   def call_highend_llm(self, job, user_profile):
     # Simulierter Aufruf eines High-End-LLMs (z. B. Gemini, Sonnet)
+    if self.dispatcher is not None:
+      # High-End-Modell hängt: kosteneffizientes Modell statt gar kein Proposal
+      return self._proposal_llm("highend", job, user_profile)[0]
     return f"High-end proposal for job '{job.get('title', 'N/A')}' tailored for {user_profile.get('name', '')}."
   
   def call_costefficient_llm(self, job, user_profile):
     # Simulierter Aufruf eines kosten-effizienten LLM-Modells (z. B. OpenRouter)
+    if self.dispatcher is not None:
+      return self._proposal_llm("costefficient", job, user_profile)[0]
     return f"Cost-efficient proposal for job '{job.get('title', 'N/A')}' tailored for {user_profile.get('name', '')}."
 
 # Exponiere AIRouter für den Import in anderen Modulen.
@@ -0,0 +1,146 @@
+"""
+Tiered Cascade Scheduler mit:
+- Vektorisiertem Fast-Prefilter über den ganzen Batch
+- Gebatchten Balanced/Precise-Stufen nur für Überlebende
+- Adaptiven Schwellen (Ziel-Überlebensrate, Restbudget)
+"""
+import asyncio
+import logging
+import math
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import numpy as np
+
+@dataclass
+class CascadeConfig:
+    target_survivor_rate: float = 0.3      # Anteil, der von fast -> balanced darf
+    precise_top_k: int = 5                 # höchstens so viele Jobs pro Lauf in precise
+    precise_threshold: float = 0.7         # Startwert, wird adaptiv nachgeführt
+    batch_size: int = 32
+    adapt_rate: float = 0.2                # EWMA-Gewicht für die Schwellen
+    tier_costs: Dict[str, float] = field(default_factory=lambda: {
+        'fast': 0.0, 'balanced': 0.002, 'precise': 0.02
+    })
+
+class CascadeScheduler:
+    """
+    Führt jede Stufe als Batch über alle Jobs aus statt Job für Job:
+    fast bewertet alles auf einmal, balanced bekommt nur die besten
+    target_survivor_rate, precise nur die Top-k über der Schwelle.
+    Modelle können pre_filter_batch/analyze_batch/validate_batch anbieten;
+    sonst wird auf die Einzelmethoden zurückgefallen.
+    """
+
+    def __init__(self, models: Dict, config: Optional[CascadeConfig] = None,
+                 executor: Optional[Executor] = None, budget: Optional[float] = None):
+        self.models = models
+        self.config = config or CascadeConfig()
+        self.executor = executor
+        self.budget = budget
+        self.fast_threshold: Optional[float] = None
+        self.precise_threshold = self.config.precise_threshold
+        self.logger = logging.getLogger('ai-cascade')
+        self.stats = {'fast': 0, 'balanced': 0, 'precise': 0}
+
+    async def run(self, jobs: List[Dict]) -> List[Dict]:
+        if not jobs:
+            return []
+        results: Dict[int, Dict] = {}
+
+        # Stufe 1: Fast-Prefilter vektorisiert über alle Jobs
+        fast_scores = await self._call_batch('fast', 'pre_filter_batch', 'pre_filter', jobs)
+        fast_scores = np.asarray(fast_scores, dtype=float)
+        self.stats['fast'] += len(jobs)
+        survivors = self._select_fast_survivors(fast_scores)
+        selected = set(survivors)
+        for i in range(len(jobs)):
+            if fast_scores[i] <= 0:
+                results[i] = {**jobs[i], 'score': 0, 'reason': 'Failed pre-filter'}
+            elif i not in selected:
+                results[i] = {**jobs[i], 'score': 0, 'reason': 'Below cascade cutoff'}
+
+        # Stufe 2: Balanced in vollen Batches nur für die Überlebenden
+        affordable = self._cap_by_budget('balanced', survivors)
+        for i in survivors[len(affordable):]:
+            results[i] = {**jobs[i], 'score': 0, 'reason': 'Budget exhausted'}
+        survivors = affordable
+        analyses = await self._call_batch('balanced', 'analyze_batch', 'analyze',
+                                          [jobs[i] for i in survivors])
+        self._spend('balanced', len(survivors))
+        self.stats['balanced'] += len(survivors)
+        for i, analysis in zip(survivors, analyses):
+            results[i] = analysis
+
+        # Stufe 3: Precise nur für die Top-k über der adaptiven Schwelle
+        ranked = sorted(survivors, key=lambda i: results[i]['score'], reverse=True)
+        candidates = [i for i in ranked if results[i]['score'] > self.precise_threshold]
+        chosen = self._cap_by_budget('precise', candidates[:self.config.precise_top_k])
+        validations = await self._call_batch('precise', 'validate_batch', 'validate',
+                                             [jobs[i] for i in chosen])
+        self._spend('precise', len(chosen))
+        self.stats['precise'] += len(chosen)
+        for i, validation in zip(chosen, validations):
+            results[i].update(validation)
+        self._adapt_precise_threshold([results[i]['score'] for i in ranked])
+
+        return sorted((results[i] for i in range(len(jobs))), key=lambda x: x['score'], reverse=True)
+
+    def _select_fast_survivors(self, scores: np.ndarray) -> List[int]:
+        """Top target_survivor_rate der positiven Fast-Scores (adaptive Schwelle)"""
+        passed = np.flatnonzero(scores > 0)
+        if passed.size == 0:
+            return []
+        limit = max(1, math.ceil(self.config.target_survivor_rate * len(scores)))
+        if self.fast_threshold is not None:
+            above = passed[scores[passed] >= self.fast_threshold]
+            # Reason: Schwelle aus früheren Batches schneidet vor, die Quote bleibt harte Obergrenze
+            if above.size:
+                passed = above
+        order = passed[np.argsort(-scores[passed], kind='stable')][:limit]
+
+        quantile = float(np.quantile(scores[scores > 0], 1 - self.config.target_survivor_rate))
+        a = self.config.adapt_rate
+        self.fast_threshold = quantile if self.fast_threshold is None else \
+            (1 - a) * self.fast_threshold + a * quantile
+        return [int(i) for i in order]
+
+    def _adapt_precise_threshold(self, balanced_scores: List[float]) -> None:
+        """Schwelle Richtung Score des k-ten Kandidaten nachführen"""
+        if not balanced_scores:
+            return
+        k = min(self.config.precise_top_k, len(balanced_scores))
+        target = balanced_scores[k - 1]
+        a = self.config.adapt_rate
+        self.precise_threshold = (1 - a) * self.precise_threshold + a * target
+
+    def _cap_by_budget(self, tier: str, indices: List[int]) -> List[int]:
+        cost = self.config.tier_costs.get(tier, 0.0)
+        if self.budget is None or cost <= 0:
+            return indices
+        affordable = max(0, int(self.budget // cost))
+        if affordable < len(indices):
+            self.logger.info(f"Budget cap on {tier}: {affordable}/{len(indices)} jobs")
+        return indices[:affordable]
+
+    def _spend(self, tier: str, calls: int) -> None:
+        if self.budget is not None:
+            self.budget -= calls * self.config.tier_costs.get(tier, 0.0)
+
+    async def _call_batch(self, tier: str, batch_method: str, single_method: str,
+                          jobs: List[Dict]) -> List:
+        """Batch-Methode in Chunks nutzen, sonst Einzelaufrufe im Executor"""
+        if not jobs:
+            return []
+        model = self.models[tier]
+        loop = asyncio.get_running_loop()
+        size = self.config.batch_size
+        chunks = [jobs[start:start + size] for start in range(0, len(jobs), size)]
+        if hasattr(model, batch_method):
+            method = getattr(model, batch_method)
+            outputs = await asyncio.gather(*(loop.run_in_executor(self.executor, method, chunk)
+                                             for chunk in chunks))
+            return [item for output in outputs for item in output]
+        method = getattr(model, single_method)
+        return list(await asyncio.gather(*(loop.run_in_executor(self.executor, method, job)
+                                           for job in jobs)))
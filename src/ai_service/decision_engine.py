@@ -7,6 +7,7 @@ from typing import List, Dict, Optional
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+from .model_cache import SkillModelCache, strip_html
 
 class JobCategory(Enum):
     WEB_DEV = auto()
@@ -29,9 +30,16 @@ class Job:
     required_skills: List[Skill]
 
 class AIDecisionEngine:
-    def __init__(self, profile: Dict):
+    def __init__(self, profile: Dict, model_cache: Optional[SkillModelCache] = None,
+                 max_unknown_share: float = 0.3):
         self.profile = profile
+        self.model_cache = model_cache
+        # Ohne Model-Cache: Anteil unbekannter Tokens im Batch, ab dem neu gefittet wird
+        self.max_unknown_share = max_unknown_share
         self.vectorizer = TfidfVectorizer(stop_words='english')
+        self._batch_vectorizer: Optional[TfidfVectorizer] = None
+        self._profile_vector = None
+        self._profile_skills: Optional[str] = None
         self._init_models()
 
     def _init_models(self):
@@ -54,10 +62,79 @@ class AIDecisionEngine:
         
         return 0.5*skill_score + 0.3*budget_score + 0.2*category_score
 
+    def evaluate_jobs(self, jobs: List[Job], refit: bool = False) -> np.ndarray:
+        """
+        Batch-Bewertung (0-1) mit denselben Gewichten wie evaluate_job.
+        Der Vektorizer wird wiederverwendet, bis mehr als max_unknown_share
+        der Tokens eines Batches außerhalb seines Vokabulars liegen (der
+        Job-Korpus hat sich verschoben), dann auf diesem Batch neu gefittet.
+        Alle Beschreibungen landen in einer Sparse-Matrix und die Skill-Scores
+        entstehen aus einem einzigen Matrixprodukt gegen den Profilvektor.
+        """
+        if not jobs:
+            return np.zeros(0)
+        descriptions = [job.description for job in jobs]
+        skill_scores = self._batch_skill_match(descriptions, refit)
+        budget_scores = self._batch_budget(jobs, descriptions)
+        category_scores = self._batch_category(jobs)
+        return 0.5*skill_scores + 0.3*budget_scores + 0.2*category_scores
+
+    def _profile_skill_text(self) -> str:
+        return " ".join([s.name for s in self.profile['skills']])
+
+    def _batch_skill_match(self, descriptions: List[str], refit: bool) -> np.ndarray:
+        profile_skills = self._profile_skill_text()
+        if self.model_cache is not None:
+            # Korpus-gefittetes Artefakt: stabile Scores über Zyklen und Neustarts
+            if refit:
+                self.model_cache.fit([profile_skills])
+            vectorizer, profile_vector = self.model_cache.get_model(profile_skills)
+            job_matrix = vectorizer.transform([strip_html(d) for d in descriptions])
+            return np.asarray((job_matrix @ profile_vector.T).todense()).ravel()
+
+        if refit or self._batch_vectorizer is None or self._corpus_drifted(descriptions):
+            # Reason: Vokabular/IDF einmal auf Batch + Profil fitten statt pro Job-Paar
+            self._batch_vectorizer = TfidfVectorizer(stop_words='english')
+            self._batch_vectorizer.fit(descriptions + [profile_skills])
+            self._profile_vector = None
+        if self._profile_vector is None or self._profile_skills != profile_skills:
+            self._profile_vector = self._batch_vectorizer.transform([profile_skills])
+            self._profile_skills = profile_skills
+
+        # TF-IDF Zeilen sind L2-normiert -> Skalarprodukt == Cosine Similarity
+        job_matrix = self._batch_vectorizer.transform(descriptions)
+        return np.asarray((job_matrix @ self._profile_vector.T).todense()).ravel()
+
+    def _corpus_drifted(self, descriptions: List[str]) -> bool:
+        """Sonst fehlen neue Begriffe dauerhaft im Vokabular und die IDF bleibt die des ersten Batches"""
+        analyzer = self._batch_vectorizer.build_analyzer()
+        vocabulary = self._batch_vectorizer.vocabulary_
+        tokens = unknown = 0
+        for description in descriptions:
+            for token in analyzer(description):
+                tokens += 1
+                unknown += token not in vocabulary
+        return tokens > 0 and unknown / tokens > self.max_unknown_share
+
+    def _batch_budget(self, jobs: List[Job], descriptions: List[str]) -> np.ndarray:
+        avg_rate = self.profile['hourly_rate']
+        budgets = np.fromiter((job.budget for job in jobs), dtype=float, count=len(jobs))
+        expected_hours = np.fromiter((len(d.split()) for d in descriptions), dtype=float, count=len(jobs)) / 50
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = budgets / (expected_hours * avg_rate)
+        return np.minimum(np.nan_to_num(ratio, nan=0.0, posinf=1.0), 1.0)
+
+    def _batch_category(self, jobs: List[Job]) -> np.ndarray:
+        preferred = self.profile['preferred_categories']
+        in_preferred = np.fromiter((job.category in preferred for job in jobs), dtype=bool, count=len(jobs))
+        return np.where(in_preferred, 1.0, 0.5)
+
     def _calculate_skill_match(self, job: Job) -> float:
         """Berechne Skill-Übereinstimmung mit TF-IDF + Cosine Similarity"""
+        if self.model_cache is not None:
+            return float(self._batch_skill_match([job.description], refit=False)[0])
         job_desc = job.description
-        profile_skills = " ".join([s.name for s in self.profile['skills']])
+        profile_skills = self._profile_skill_text()
         
         vectors = self.vectorizer.fit_transform([job_desc, profile_skills])
         return cosine_similarity(vectors[0:1], vectors[1:2])[0][0]
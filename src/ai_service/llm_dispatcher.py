@@ -0,0 +1,365 @@
+"""
+Dispatcher vor den LLM-Providern mit:
+- Coalescing identischer In-Flight-Prompts auf ein gemeinsames Future
+- Sammelfenster: kleine Analyse-Prompts werden zu einem Multi-Item-Call gepackt
+- Pro Provider: Concurrency-Limit (Semaphore) und RPM-Limit (Token Bucket)
+- OpenAI-kompatiblem HTTP-Transport mit Keep-Alive (OpenRouter, Ollama, Fake-Server)
+- Chat-Messages mit Cache-Breakpoints und Erfassung gecachter Input-Tokens
+"""
+import asyncio
+import concurrent.futures
+import hashlib
+import http.client
+import json
+import logging
+import re
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+from src.utils.http_pool import STALE_CONNECTION_ERRORS, HostConnectionPool
+from src.utils.rate_limiter import RateLimiter
+from .model_stats import ModelStatsStore
+
+@dataclass
+class ProviderLimits:
+    max_concurrency: int = 4
+    rpm: float = 60.0
+    burst: int = 5
+
+Prompt = Union[str, List[Dict]]   # Text oder fertige Chat-Messages
+
+@dataclass
+class Completion:
+    text: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_input_tokens: int = 0
+
+def split_usage(completion: Completion, texts: List[str]) -> List[Completion]:
+    """Usage eines gepackten Calls gleichmäßig auf die Items verteilen (Rest auf die ersten)"""
+    count = len(texts)
+
+    def share(total: int, index: int) -> int:
+        return total // count + (1 if index < total % count else 0)
+
+    return [Completion(text, share(completion.input_tokens, i), share(completion.output_tokens, i),
+                       share(completion.cached_input_tokens, i)) for i, text in enumerate(texts)]
+
+def cached_tokens(usage: Dict) -> int:
+    """Gecachte Input-Tokens aus OpenAI/OpenRouter- bzw. Anthropic-Usage"""
+    details = usage.get("prompt_tokens_details") or {}
+    return int(details.get("cached_tokens") or usage.get("cache_read_input_tokens") or 0)
+
+class ProviderError(Exception):
+    pass
+
+class LLMTimeout(ProviderError):
+    """Antwort kam nicht innerhalb des Timeouts von complete_threadsafe()"""
+
+class OpenAICompatTransport:
+    """
+    Blockierender Transport für /chat/completions. Verbindungen bleiben
+    pro Provider offen (HostConnectionPool wie beim Fetch-Engine).
+    """
+
+    def __init__(self, base_urls: Dict[str, str], api_keys: Optional[Dict[str, str]] = None,
+                 timeout: float = 60.0, pool_size: int = 8):
+        self.base_urls = base_urls
+        self.api_keys = api_keys or {}
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._pools: Dict[str, HostConnectionPool] = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, provider: str) -> Tuple[HostConnectionPool, str]:
+        parts = urlsplit(self.base_urls[provider])
+        with self._lock:
+            pool = self._pools.get(provider)
+            if pool is None:
+                pool = self._pools[provider] = HostConnectionPool(parts.scheme, parts.netloc,
+                                                                  self.pool_size, self.timeout)
+        return pool, parts.path.rstrip("/")
+
+    def complete(self, provider: str, model: str, prompt: Prompt, max_tokens: Optional[int] = None) -> Completion:
+        """Netzwerk-, Protokoll- und Formatfehler kommen einheitlich als ProviderError"""
+        pool, base_path = self._pool(provider)
+        messages = prompt if isinstance(prompt, list) else [{"role": "user", "content": prompt}]
+        payload = {"model": model, "messages": messages}
+        if max_tokens:
+            payload["max_tokens"] = max_tokens
+        headers = {"Content-Type": "application/json"}
+        if self.api_keys.get(provider):
+            headers["Authorization"] = f"Bearer {self.api_keys[provider]}"
+        path, body = f"{base_path}/chat/completions", json.dumps(payload).encode("utf-8")
+        conn, reused = pool.acquire()
+        reusable = False
+        try:
+            try:
+                conn.request("POST", path, body=body, headers=headers)
+                response = conn.getresponse()
+            except STALE_CONNECTION_ERRORS:
+                if not reused:
+                    raise
+                # Keep-Alive-Verbindung wurde serverseitig geschlossen: einmal frisch verbinden
+                conn = pool.reconnect(conn)
+                conn.request("POST", path, body=body, headers=headers)
+                response = conn.getresponse()
+            body = response.read()
+            reusable = not response.will_close
+        except (OSError, http.client.HTTPException) as e:
+            raise ProviderError(f"{provider} nicht erreichbar: {type(e).__name__}: {e}") from e
+        finally:
+            pool.release(conn, reusable)
+        if response.status != 200:
+            raise ProviderError(f"{provider} HTTP {response.status}: {body[:200]!r}")
+        try:
+            data = json.loads(body)
+            usage = data.get("usage") or {}
+            return Completion(data["choices"][0]["message"]["content"], usage.get("prompt_tokens", 0),
+                              usage.get("completion_tokens", 0), cached_tokens(usage))
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+            raise ProviderError(f"{provider} ungültige Antwort: {type(e).__name__}: {e}") from e
+
+    def close(self) -> None:
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+PACK_HEADER = (
+    "Answer each of the following {count} independent tasks. Respond ONLY with a JSON array "
+    "of {count} strings, one answer per task, in the same order.\n"
+)
+
+def pack_prompts(prompts: List[str]) -> str:
+    """Mehrere kleine Prompts zu einem Multi-Item-Prompt zusammenfassen"""
+    items = "\n".join(f"### Task {i + 1}\n{prompt}" for i, prompt in enumerate(prompts))
+    return PACK_HEADER.format(count=len(prompts)) + items
+
+_JSON_ARRAY_RE = re.compile(r"\[.*\]", re.DOTALL)
+
+def unpack_response(text: str, count: int) -> Optional[List[str]]:
+    """JSON-Array aus der Antwort lesen; None, wenn es nicht genau count Einträge sind"""
+    match = _JSON_ARRAY_RE.search(text)
+    if not match:
+        return None
+    try:
+        items = json.loads(match.group(0))
+    except ValueError:
+        return None
+    if not isinstance(items, list) or len(items) != count:
+        return None
+    return [item if isinstance(item, str) else json.dumps(item) for item in items]
+
+@dataclass
+class _PackBatch:
+    prompts: List[str] = field(default_factory=list)
+    futures: List[asyncio.Future] = field(default_factory=list)
+    timer: Optional[asyncio.TimerHandle] = None
+
+class LLMDispatcher:
+    """
+    submit() liefert den Text der Antwort, complete() zusätzlich die Usage,
+    die dieser Aufrufer verursacht hat (für die Abrechnung gegen seine
+    Budget-Reservierung). Identische Prompts, die gerade laufen, teilen sich
+    einen Call; nur der erste Aufrufer trägt dessen Usage. kind='analysis'
+    wartet bis zu window Sekunden auf weitere Analyse-Prompts desselben
+    Modells und schickt sie als einen gepackten Call (max. max_pack Items).
+    """
+
+    def __init__(self, transport, limits: Optional[Dict[str, ProviderLimits]] = None,
+                 window: float = 0.05, max_pack: int = 8, executor: Optional[Executor] = None,
+                 stats: Optional[ModelStatsStore] = None,
+                 on_usage: Optional[Callable[[str, str, Completion], None]] = None):
+        self.transport = transport
+        self.limits = limits or {}
+        self.window = window
+        self.max_pack = max_pack
+        self.executor = executor or ThreadPoolExecutor(max_workers=16)
+        self.stats = stats
+        self.on_usage = on_usage
+        self.logger = logging.getLogger('llm-dispatcher')
+        self.metrics = {"submitted": 0, "coalesced": 0, "provider_calls": 0, "packed_items": 0}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._packs: Dict[Tuple[str, str], _PackBatch] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._limiters: Dict[str, RateLimiter] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
+
+    def _provider_limits(self, provider: str) -> ProviderLimits:
+        return self.limits.get(provider) or ProviderLimits()
+
+    def _semaphore(self, provider: str) -> asyncio.Semaphore:
+        if provider not in self._semaphores:
+            self._semaphores[provider] = asyncio.Semaphore(self._provider_limits(provider).max_concurrency)
+        return self._semaphores[provider]
+
+    def _limiter(self, provider: str) -> RateLimiter:
+        if provider not in self._limiters:
+            limits = self._provider_limits(provider)
+            self._limiters[provider] = RateLimiter(limits.rpm / 60.0, limits.burst)
+        return self._limiters[provider]
+
+    async def submit(self, provider: str, model: str, prompt: Prompt, kind: str = "completion") -> str:
+        return (await self.complete(provider, model, prompt, kind)).text
+
+    async def complete(self, provider: str, model: str, prompt: Prompt, kind: str = "completion") -> Completion:
+        self.metrics["submitted"] += 1
+        body = prompt if isinstance(prompt, str) else json.dumps(prompt, sort_keys=True)
+        key = hashlib.sha256(f"{provider}\0{model}\0{kind}\0{body}".encode("utf-8")).hexdigest()
+        future = self._inflight.get(key)
+        if future is not None:
+            self.metrics["coalesced"] += 1
+            # Reason: shield, damit ein abbrechender Aufrufer den gemeinsamen Call nicht cancelt
+            shared = await asyncio.shield(future)
+            return Completion(shared.text)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._inflight[key] = future
+        future.add_done_callback(lambda done: self._settle(key, done))
+        if kind == "analysis" and self.max_pack > 1 and isinstance(prompt, str):
+            self._enqueue_pack(provider, model, prompt, future)
+        else:
+            asyncio.ensure_future(self._run_single(provider, model, prompt, future))
+        return await asyncio.shield(future)
+
+    def _settle(self, key: str, future: asyncio.Future) -> None:
+        self._inflight.pop(key, None)
+        # Reason: haben alle Aufrufer per Timeout aufgegeben, holt sonst niemand den Fehler ab
+        if not future.cancelled():
+            future.exception()
+
+    def _enqueue_pack(self, provider: str, model: str, prompt: str, future: asyncio.Future) -> None:
+        batch = self._packs.setdefault((provider, model), _PackBatch())
+        batch.prompts.append(prompt)
+        batch.futures.append(future)
+        if len(batch.prompts) >= self.max_pack:
+            self._flush_pack(provider, model)
+        elif batch.timer is None:
+            batch.timer = asyncio.get_running_loop().call_later(self.window, self._flush_pack, provider, model)
+
+    def _flush_pack(self, provider: str, model: str) -> None:
+        batch = self._packs.pop((provider, model), None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        asyncio.ensure_future(self._run_pack(provider, model, batch))
+
+    async def _run_single(self, provider: str, model: str, prompt: Prompt, future: asyncio.Future) -> None:
+        try:
+            completion = await self._call(provider, model, prompt)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(completion)
+
+    async def _run_pack(self, provider: str, model: str, batch: _PackBatch) -> None:
+        if len(batch.prompts) == 1:
+            await self._run_single(provider, model, batch.prompts[0], batch.futures[0])
+            return
+        try:
+            completion = await self._call(provider, model, pack_prompts(batch.prompts))
+            answers = unpack_response(completion.text, len(batch.prompts))
+        except Exception as e:
+            self.logger.warning(f"Packed call to {provider}/{model} failed: {e}")
+            answers = None
+        if answers is None:
+            # Modell hat das Format nicht eingehalten: Items einzeln nachholen
+            await asyncio.gather(*(self._run_single(provider, model, prompt, future)
+                                   for prompt, future in zip(batch.prompts, batch.futures)))
+            return
+        self.metrics["packed_items"] += len(answers)
+        for future, share in zip(batch.futures, split_usage(completion, answers)):
+            if not future.done():
+                future.set_result(share)
+
+    async def _call(self, provider: str, model: str, prompt: Prompt) -> Completion:
+        async with self._semaphore(provider):
+            await self._limiter(provider).acquire()
+            self.metrics["provider_calls"] += 1
+            loop = asyncio.get_running_loop()
+            started = time.perf_counter()
+            try:
+                completion = await loop.run_in_executor(self.executor, self.transport.complete,
+                                                        provider, model, prompt)
+            except Exception:
+                if self.stats is not None:
+                    self.stats.record_call(model, time.perf_counter() - started, ok=False)
+                raise
+            if self.stats is not None:
+                self.stats.record_call(model, time.perf_counter() - started, completion.output_tokens)
+            if self.on_usage is not None:
+                try:
+                    self.on_usage(provider, model, completion)
+                except Exception as e:
+                    self.logger.warning(f"Usage callback failed: {e}")
+            return completion
+
+    def submit_threadsafe(self, provider: str, model: str, prompt: Prompt, kind: str = "completion",
+                          timeout: Optional[float] = None) -> str:
+        """Blockierende Variante für synchronen Code (AIRouter, Orchestrator-Threads)"""
+        return self.complete_threadsafe(provider, model, prompt, kind, timeout).text
+
+    def complete_threadsafe(self, provider: str, model: str, prompt: Prompt, kind: str = "completion",
+                            timeout: Optional[float] = None,
+                            on_late: Optional[Callable[[Optional[Completion]], None]] = None) -> Completion:
+        """
+        Bei Timeout läuft der Provider-Call weiter. on_late bekommt dann dessen
+        Completion (None bei Fehler/Abbruch), damit die Kosten noch gebucht werden.
+        """
+        with self._loop_lock:
+            if self._loop is None:
+                self._start_loop()
+        future = asyncio.run_coroutine_threadsafe(self.complete(provider, model, prompt, kind), self._loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            if on_late is None:
+                # Aufrufer gibt auf: Warten im Loop beenden (ein gemeinsamer Call läuft dank shield weiter)
+                future.cancel()
+            else:
+                future.add_done_callback(lambda done: self.executor.submit(
+                    on_late, None if done.cancelled() or done.exception() else done.result()))
+            raise
+
+    def _start_loop(self) -> None:
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="llm-dispatcher", daemon=True)
+        self._thread.start()
+        ready.wait()
+        self._loop = loop
+
+    async def _cancel_pending(self) -> None:
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def close(self) -> None:
+        if self._loop is not None:
+            # Calls, auf die niemand mehr wartet (Timeout), nicht mit dem Loop verwerfen
+            asyncio.run_coroutine_threadsafe(self._cancel_pending(), self._loop).result(5)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(5)
+            self._loop.close()
+            self._loop = None
+        if hasattr(self.transport, "close"):
+            self.transport.close()
+        self.executor.shutdown(wait=False)
@@ -1,10 +1,97 @@
 # ... (bestehender Code bleibt)
+from src.utils.budget_ledger import get_ledger
+from src.ai_service.model_stats import BanditSelector, Candidate, get_model_stats
+
+# Spiegel von AI_MODELS / TASK_PROFILES aus llm_router.js
+AI_MODELS = {
+    'gpt-4o': {'provider': 'openai', 'costPer1kTokens': {'input': 0.01, 'output': 0.03}, 'tokenLimit': 128000,
+               'responseTime': 'medium', 'priority': 3,
+               'capabilities': {'creativeWriting': 0.95, 'technicalContent': 0.92, 'communication': 0.94,
+                                'reasoning': 0.93, 'dataAnalysis': 0.88}},
+    'gpt-3.5-turbo': {'provider': 'openai', 'costPer1kTokens': {'input': 0.0005, 'output': 0.0015}, 'tokenLimit': 16000,
+                      'responseTime': 'fast', 'priority': 1,
+                      'capabilities': {'creativeWriting': 0.82, 'technicalContent': 0.75, 'communication': 0.85,
+                                       'reasoning': 0.70, 'dataAnalysis': 0.65}},
+    'gemini-1.5-pro': {'provider': 'google', 'costPer1kTokens': {'input': 0.0025, 'output': 0.0075}, 'tokenLimit': 1000000,
+                       'responseTime': 'medium', 'priority': 2,
+                       'capabilities': {'creativeWriting': 0.88, 'technicalContent': 0.89, 'communication': 0.86,
+                                        'reasoning': 0.90, 'dataAnalysis': 0.85}},
+    'gemini-1.5-flash': {'provider': 'google', 'costPer1kTokens': {'input': 0.0005, 'output': 0.0015}, 'tokenLimit': 1000000,
+                         'responseTime': 'fast', 'priority': 1,
+                         'capabilities': {'creativeWriting': 0.82, 'technicalContent': 0.78, 'communication': 0.80,
+                                          'reasoning': 0.75, 'dataAnalysis': 0.70}},
+    'claude-3-opus': {'provider': 'anthropic', 'costPer1kTokens': {'input': 0.015, 'output': 0.075}, 'tokenLimit': 200000,
+                      'responseTime': 'slow', 'priority': 3,
+                      'capabilities': {'creativeWriting': 0.91, 'technicalContent': 0.93, 'communication': 0.94,
+                                       'reasoning': 0.95, 'dataAnalysis': 0.88}},
+    'claude-3-sonnet': {'provider': 'anthropic', 'costPer1kTokens': {'input': 0.003, 'output': 0.015}, 'tokenLimit': 200000,
+                        'responseTime': 'medium', 'priority': 2,
+                        'capabilities': {'creativeWriting': 0.90, 'technicalContent': 0.88, 'communication': 0.92,
+                                         'reasoning': 0.89, 'dataAnalysis': 0.83}},
+    'claude-3-haiku': {'provider': 'anthropic', 'costPer1kTokens': {'input': 0.00025, 'output': 0.00125}, 'tokenLimit': 200000,
+                       'responseTime': 'fast', 'priority': 1,
+                       'capabilities': {'creativeWriting': 0.85, 'technicalContent': 0.80, 'communication': 0.87,
+                                        'reasoning': 0.78, 'dataAnalysis': 0.72}},
+    'mistral-large': {'provider': 'mistral', 'costPer1kTokens': {'input': 0.002, 'output': 0.006}, 'tokenLimit': 32000,
+                      'responseTime': 'medium', 'priority': 2,
+                      'capabilities': {'creativeWriting': 0.87, 'technicalContent': 0.89, 'communication': 0.86,
+                                       'reasoning': 0.88, 'dataAnalysis': 0.82}},
+    'mistral-small': {'provider': 'mistral', 'costPer1kTokens': {'input': 0.0002, 'output': 0.0006}, 'tokenLimit': 32000,
+                      'responseTime': 'fast', 'priority': 1,
+                      'capabilities': {'creativeWriting': 0.75, 'technicalContent': 0.78, 'communication': 0.76,
+                                       'reasoning': 0.74, 'dataAnalysis': 0.68}},
+    'local-llama3': {'provider': 'ollama', 'costPer1kTokens': {'input': 0.0, 'output': 0.0}, 'tokenLimit': 8000,
+                     'responseTime': 'slow', 'priority': 0,
+                     'capabilities': {'creativeWriting': 0.65, 'technicalContent': 0.70, 'communication': 0.60,
+                                      'reasoning': 0.62, 'dataAnalysis': 0.55}}
+}
+
+TASK_PROFILES = {
+    'JOB_FILTERING': {'requirements': {'creativeWriting': 0.1, 'technicalContent': 0.6, 'communication': 0.2,
+                                       'reasoning': 0.7, 'dataAnalysis': 0.5},
+                      'minAcceptableScore': 0.6, 'latencySloMs': 3000},
+    'PROPOSAL_GENERATION': {'requirements': {'creativeWriting': 0.9, 'technicalContent': 0.7, 'communication': 0.9,
+                                             'reasoning': 0.7, 'dataAnalysis': 0.3},
+                            'minAcceptableScore': 0.8, 'latencySloMs': 20000},
+    'CLIENT_COMMUNICATION': {'requirements': {'creativeWriting': 0.6, 'technicalContent': 0.4, 'communication': 0.9,
+                                              'reasoning': 0.7, 'dataAnalysis': 0.2},
+                             'minAcceptableScore': 0.75, 'latencySloMs': 8000},
+    'PROJECT_PLANNING': {'requirements': {'creativeWriting': 0.3, 'technicalContent': 0.7, 'communication': 0.6,
+                                          'reasoning': 0.9, 'dataAnalysis': 0.8},
+                         'minAcceptableScore': 0.75, 'latencySloMs': 20000},
+    'COST_OPTIMIZATION': {'requirements': {'creativeWriting': 0.2, 'technicalContent': 0.6, 'communication': 0.5,
+                                           'reasoning': 0.8, 'dataAnalysis': 0.9},
+                          'minAcceptableScore': 0.7, 'latencySloMs': 20000}
+}
+
+# Preisfaktor für Input-Tokens aus dem Prompt-Cache (relativ zum normalen Input-Preis)
+CACHE_READ_DISCOUNT = {'anthropic': 0.1, 'openai': 0.5, 'google': 0.25}
 
 class LLMRouter:
-    # ... (bestehender init)
+    def __init__(self, models=None, task_profiles=None, stats=None, selector=None):
+        self.models = models or AI_MODELS
+        self.taskProfiles = task_profiles or TASK_PROFILES
+        self.stats = stats or get_model_stats()
+        self.selector = selector or BanditSelector(self.stats)
+
+    def estimateCost(self, model_id, token_estimate):
+        """token_estimate['cachedInput'] (Teil von input) wird zum Cache-Preis gerechnet"""
+        model = self.models[model_id]
+        cost = model['costPer1kTokens']
+        cached = min(token_estimate.get('cachedInput', 0), token_estimate['input'])
+        discount = CACHE_READ_DISCOUNT.get(model['provider'], 1.0)
+        return ((token_estimate['input'] - cached) * cost['input'] / 1000 +
+                cached * cost['input'] * discount / 1000 +
+                token_estimate['output'] * cost['output'] / 1000)
+
+    def calculateModelFitness(self, model, task_profile):
+        requirements = task_profile['requirements']
+        total = sum(requirements.values())
+        if not total:
+            return 0.0
+        return sum(model['capabilities'].get(req, 0) * weight for req, weight in requirements.items()) / total
 
-    def selectBestModel(self, task_type, token_estimate, force_high_quality=False):
-        # ... (bestehende Logik)
+    def selectBestModel(self, task_type, token_estimate, force_high_quality=False, latency_slo_ms=None):
         budget = self.getBudgetStatus()
         available = min(budget['daily']['remaining'], budget['monthly']['remaining'])
 
@@ -12,8 +99,7 @@ class LLMRouter:
         if available < 1.0 and not force_high_quality:
             cheaper_models = [m for m in self.models if self.models[m]['priority'] <= 1]
             for m in cheaper_models:
-                est_cost = (token_estimate['input'] * self.models[m]['costPer1kTokens']['input'] / 1000 +
-                            token_estimate['output'] * self.models[m]['costPer1kTokens']['output'] / 1000)
+                est_cost = self.estimateCost(m, token_estimate)
                 if est_cost <= available:
                     return {
                         "modelId": m,
@@ -31,12 +117,54 @@ class LLMRouter:
                 "tokenLimit": 8000
             }
 
-        # sonst bestes Modell
-        return super().selectBestModel(task_type, token_estimate, force_high_quality)
+        # sonst bestes Modell: Wert pro Dollar aus gelernten Statistiken
+        task_profile = self.taskProfiles.get(task_type)
+        if task_profile is None:
+            raise ValueError(f"Unbekannter Aufgabentyp: {task_type}")
+        tokens_needed = token_estimate['input'] + token_estimate['output']
+        candidates = []
+        for model_id, model in self.models.items():
+            fitness = self.calculateModelFitness(model, task_profile)
+            est_cost = self.estimateCost(model_id, token_estimate)
+            if fitness < task_profile['minAcceptableScore'] or est_cost > available:
+                continue
+            if model['tokenLimit'] < tokens_needed:
+                continue
+            candidates.append(Candidate(model_id, fitness, est_cost, model.get('responseTime', 'medium')))
+
+        slo = latency_slo_ms if latency_slo_ms is not None else task_profile.get('latencySloMs')
+        choice = self.selector.select(task_type, candidates, slo, prefer_quality=force_high_quality)
+        if choice is None:
+            return {
+                "modelId": "local-llama3",
+                "provider": "ollama",
+                "estimatedCost": 0,
+                "fitness": 0.3,
+                "tokenLimit": 8000
+            }
+        model = self.models[choice['modelId']]
+        return {**choice, "provider": model['provider'], "tokenLimit": model['tokenLimit']}
+
+    def recordCall(self, model_id, latency_s, output_tokens=0, ok=True):
+        """Nach jedem LLM-Call: Latenz, Durchsatz, Fehler"""
+        self.stats.record_call(model_id, latency_s, output_tokens, ok)
+
+    def recordOutcome(self, task_type, model_id, accepted):
+        """Downstream-Feedback: Proposal angenommen/abgelehnt"""
+        self.stats.record_outcome(task_type, model_id, accepted)
+
+    def getModelStats(self):
+        return self.stats.snapshot()
 
     def getBudgetStatus(self):
-        # Dummy Budget, ersetzen durch Supabase oder Config
-        return {
-            "daily": {"limit": 20, "used": 5, "remaining": 15},
-            "monthly": {"limit": 300, "used": 50, "remaining": 250}
-        }
+        # Lokales, prozessübergreifendes Ledger statt Netzwerk-Roundtrip
+        return get_ledger().status()
+
+_router = None
+
+def getLLMRouter():
+    """Prozessweite Router-Instanz (API-Server, Worker)"""
+    global _router
+    if _router is None:
+        _router = LLMRouter()
+    return _router
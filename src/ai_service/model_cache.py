@@ -0,0 +1,125 @@
+"""
+Persistenter Model-Artefakt-Cache für Skill Matching mit:
+- IDF-Gewichten gefittet auf dem historischen Job-Korpus
+- Serialisierten Profilvektoren
+- Invalidierung über Korpus-Version und Profil-Hash
+"""
+import hashlib
+import html
+import json
+import os
+import pickle
+import re
+from typing import Dict, List, Optional, Tuple
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+DEFAULT_CORPUS_PATH = os.path.join("data", "scraped_jobs.json")
+DEFAULT_ARTIFACT_PATH = os.path.join("data", "models", "skill_model.pkl")
+ARTIFACT_FORMAT = 1
+
+_TAG_RE = re.compile(r"<[^>]+>")
+
+def strip_html(text: str) -> str:
+    """HTML-Tags entfernen und Entities auflösen (Job-Beschreibungen aus RSS)"""
+    return html.unescape(_TAG_RE.sub(" ", text or ""))
+
+def profile_hash(profile_skills: str) -> str:
+    return hashlib.sha256(profile_skills.encode("utf-8")).hexdigest()[:16]
+
+class SkillModelCache:
+    """
+    Hält einen auf dem Korpus gefitteten TfidfVectorizer samt Profilvektoren
+    auf Platte. Ein neu gestarteter Worker lädt das Artefakt statt neu zu
+    fitten; Scores bleiben über Zyklen vergleichbar.
+    """
+
+    def __init__(self, corpus_path: str = DEFAULT_CORPUS_PATH,
+                 artifact_path: str = DEFAULT_ARTIFACT_PATH):
+        self.corpus_path = corpus_path
+        self.artifact_path = artifact_path
+        self.vectorizer: Optional[TfidfVectorizer] = None
+        self.corpus_version: Optional[str] = None
+        self.profiles: Dict[str, object] = {}
+        self._stat_version: Tuple[Optional[tuple], Optional[str]] = (None, None)
+
+    def current_corpus_version(self) -> str:
+        """Inhalts-Hash des Korpus; fehlt die Datei, gilt die leere Version"""
+        try:
+            stat = os.stat(self.corpus_path)
+            stat_key = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stat_key = None
+        # Reason: nur neu hashen, wenn sich mtime/Größe geändert haben
+        if stat_key is not None and self._stat_version[0] == stat_key:
+            return self._stat_version[1]
+        digest = hashlib.sha256()
+        try:
+            with open(self.corpus_path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 16), b""):
+                    digest.update(block)
+        except OSError:
+            pass
+        version = digest.hexdigest()[:16]
+        self._stat_version = (stat_key, version)
+        return version
+
+    def _load_corpus(self) -> List[str]:
+        try:
+            with open(self.corpus_path, "r", encoding="utf-8") as f:
+                jobs = json.load(f)
+        except (OSError, ValueError):
+            return []
+        return [strip_html(f"{job.get('title', '')} {job.get('description', '')}") for job in jobs]
+
+    def load(self) -> bool:
+        """Artefakt laden, wenn es zur aktuellen Korpus-Version passt"""
+        version = self.current_corpus_version()
+        try:
+            with open(self.artifact_path, "rb") as f:
+                artifact = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return False
+        if artifact.get("format") != ARTIFACT_FORMAT or artifact.get("corpus_version") != version:
+            return False
+        self.vectorizer = artifact["vectorizer"]
+        self.profiles = artifact.get("profiles", {})
+        self.corpus_version = version
+        return True
+
+    def save(self) -> None:
+        directory = os.path.dirname(self.artifact_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.artifact_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({
+                "format": ARTIFACT_FORMAT,
+                "corpus_version": self.corpus_version,
+                "vectorizer": self.vectorizer,
+                "profiles": self.profiles
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.artifact_path)
+
+    def fit(self, extra_documents: Optional[List[str]] = None) -> None:
+        """IDF auf dem historischen Korpus (plus optionalen Dokumenten) fitten"""
+        documents = self._load_corpus() + list(extra_documents or [])
+        self.vectorizer = TfidfVectorizer(stop_words='english')
+        self.vectorizer.fit(documents)
+        self.corpus_version = self.current_corpus_version()
+        self.profiles = {}
+
+    def get_model(self, profile_skills: str) -> Tuple[TfidfVectorizer, object]:
+        """(Vektorizer, Profilvektor) -- lädt, fittet und speichert bei Bedarf"""
+        dirty = False
+        if self.vectorizer is None or self.corpus_version != self.current_corpus_version():
+            if not self.load():
+                # Profiltext mitfitten, damit Skills nie komplett außerhalb des Vokabulars liegen
+                self.fit([profile_skills])
+                dirty = True
+        key = profile_hash(profile_skills)
+        if key not in self.profiles:
+            self.profiles[key] = self.vectorizer.transform([profile_skills])
+            dirty = True
+        if dirty:
+            self.save()
+        return self.vectorizer, self.profiles[key]
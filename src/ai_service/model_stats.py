@@ -0,0 +1,288 @@
+"""
+Online-Statistiken pro LLM-Modell mit:
+- Latenz p50/p95 über ein Log-Bucket-Histogramm (O(1) pro Messung)
+- Tokens/Sekunde und Fehlerrate als EWMA
+- Downstream-Akzeptanz (Proposal angenommen) pro Aufgabentyp als Beta-Posterior
+- Thompson-Sampling Auswahl: Wert pro Dollar unter Latenz-SLO
+"""
+import atexit
+import json
+import math
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+DEFAULT_STATS_PATH = os.path.join("data", "models", "model_stats.json")
+STATS_FORMAT = 1
+
+# Startwerte, solange ein Modell noch keine Messungen hat (entspricht responseTime im JS-Router)
+LATENCY_PRIORS_MS = {'fast': 2000.0, 'medium': 6000.0, 'slow': 15000.0}
+
+class LatencyHistogram:
+    """
+    Geometrische Buckets ab min_ms mit Faktor growth: record() ist O(1),
+    Quantile kosten O(Buckets) mit fester Bucket-Anzahl und ~growth/2 relativem Fehler.
+    """
+
+    def __init__(self, min_ms: float = 10.0, growth: float = 1.15, n_buckets: int = 80):
+        self.min_ms = min_ms
+        self.growth = growth
+        self.counts = [0] * n_buckets
+        self.total = 0
+        self._log_growth = math.log(growth)
+
+    def record(self, ms: float) -> None:
+        if ms <= self.min_ms:
+            index = 0
+        else:
+            index = min(len(self.counts) - 1, 1 + int(math.log(ms / self.min_ms) / self._log_growth))
+        self.counts[index] += 1
+        self.total += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.total:
+            return None
+        rank = q * self.total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                # Obere Bucketgrenze: Quantil eher über- als unterschätzen (SLO-Prüfung)
+                return self.min_ms * self.growth ** index
+        return self.min_ms * self.growth ** (len(self.counts) - 1)
+
+    def to_dict(self) -> Dict:
+        return {"min_ms": self.min_ms, "growth": self.growth, "counts": self.counts}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LatencyHistogram":
+        histogram = cls(data["min_ms"], data["growth"], len(data["counts"]))
+        histogram.counts = list(data["counts"])
+        histogram.total = sum(histogram.counts)
+        return histogram
+
+@dataclass
+class ModelStats:
+    calls: int = 0
+    error_rate: float = 0.0
+    tokens_per_second: Optional[float] = None
+    histogram: Optional[LatencyHistogram] = None
+
+    def __post_init__(self):
+        if self.histogram is None:
+            self.histogram = LatencyHistogram()
+
+@dataclass
+class Acceptance:
+    """Beta-Posterior für P(Proposal angenommen) pro (Aufgabentyp, Modell)"""
+    accepted: float = 0.0
+    rejected: float = 0.0
+
+class ModelStatsStore:
+    """
+    Sammelt Messungen aus allen LLM-Calls eines Prozesses. Jede Aktualisierung
+    ist O(1); save()/load() persistieren den Stand als JSON für Neustarts,
+    save_if_due() höchstens alle save_interval Sekunden und nur bei Änderungen.
+    """
+
+    def __init__(self, path: str = DEFAULT_STATS_PATH, ewma_alpha: float = 0.1, save_interval: float = 60.0):
+        self.path = path
+        self.ewma_alpha = ewma_alpha
+        self.save_interval = save_interval
+        self.models: Dict[str, ModelStats] = {}
+        self.acceptance: Dict[str, Acceptance] = {}
+        self.dirty = False
+        self._last_save = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _model(self, model_id: str) -> ModelStats:
+        stats = self.models.get(model_id)
+        if stats is None:
+            stats = self.models[model_id] = ModelStats()
+        return stats
+
+    def record_call(self, model_id: str, latency_s: float, output_tokens: int = 0, ok: bool = True) -> None:
+        """Ein abgeschlossener LLM-Call (auch fehlgeschlagene zählen für die Fehlerrate)"""
+        a = self.ewma_alpha
+        with self._lock:
+            stats = self._model(model_id)
+            stats.calls += 1
+            self.dirty = True
+            # Reason: erste Messungen stärker gewichten, sonst klebt die Rate lange an 0
+            weight = max(a, 1.0 / stats.calls)
+            stats.error_rate = (1 - weight) * stats.error_rate + weight * (0.0 if ok else 1.0)
+            if not ok:
+                return
+            stats.histogram.record(latency_s * 1000.0)
+            if output_tokens > 0 and latency_s > 0:
+                tps = output_tokens / latency_s
+                stats.tokens_per_second = tps if stats.tokens_per_second is None else \
+                    (1 - a) * stats.tokens_per_second + a * tps
+
+    def record_outcome(self, task_type: str, model_id: str, accepted: bool) -> None:
+        """Downstream-Signal: wurde das Proposal dieses Modells angenommen?"""
+        with self._lock:
+            entry = self.acceptance.setdefault(f"{task_type}:{model_id}", Acceptance())
+            self.dirty = True
+            if accepted:
+                entry.accepted += 1
+            else:
+                entry.rejected += 1
+
+    def latency_p(self, model_id: str, q: float) -> Optional[float]:
+        stats = self.models.get(model_id)
+        return stats.histogram.quantile(q) if stats else None
+
+    def error_rate(self, model_id: str) -> float:
+        stats = self.models.get(model_id)
+        return stats.error_rate if stats else 0.0
+
+    def acceptance_for(self, task_type: str, model_id: str) -> Acceptance:
+        return self.acceptance.get(f"{task_type}:{model_id}", Acceptance())
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Kennzahlen pro Modell (Monitoring / API)"""
+        with self._lock:
+            return {
+                model_id: {
+                    "calls": stats.calls,
+                    "error_rate": stats.error_rate,
+                    "tokens_per_second": stats.tokens_per_second,
+                    "latency_p50_ms": stats.histogram.quantile(0.5),
+                    "latency_p95_ms": stats.histogram.quantile(0.95)
+                }
+                for model_id, stats in self.models.items()
+            }
+
+    def save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            data = {
+                "format": STATS_FORMAT,
+                "models": {
+                    model_id: {
+                        "calls": stats.calls,
+                        "error_rate": stats.error_rate,
+                        "tokens_per_second": stats.tokens_per_second,
+                        "histogram": stats.histogram.to_dict()
+                    }
+                    for model_id, stats in self.models.items()
+                },
+                "acceptance": {key: [entry.accepted, entry.rejected] for key, entry in self.acceptance.items()}
+            }
+            self.dirty = False
+            self._last_save = time.monotonic()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def save_if_due(self, force: bool = False) -> bool:
+        """Periodisch aus dem Call-Pfad bzw. beim Shutdown (force) speichern"""
+        if not self.dirty:
+            return False
+        if not force and time.monotonic() - self._last_save < self.save_interval:
+            return False
+        self.save()
+        return True
+
+    def load(self) -> bool:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("format") != STATS_FORMAT:
+            return False
+        with self._lock:
+            self.models = {
+                model_id: ModelStats(entry["calls"], entry["error_rate"], entry["tokens_per_second"],
+                                     LatencyHistogram.from_dict(entry["histogram"]))
+                for model_id, entry in data.get("models", {}).items()
+            }
+            self.acceptance = {key: Acceptance(*value) for key, value in data.get("acceptance", {}).items()}
+        return True
+
+@dataclass
+class Candidate:
+    model_id: str
+    prior_quality: float        # Fitness aus den statischen Capabilities (0..1)
+    estimated_cost: float       # USD für diesen Call
+    response_time: str = 'medium'
+
+class BanditSelector:
+    """
+    Thompson Sampling über Beta(prior + Akzeptanz) pro (Aufgabentyp, Modell).
+    Kontext ist der Aufgabentyp; der Prior aus der Capability-Fitness zählt
+    wie prior_strength Beobachtungen. Unter allen Modellen, deren (fehler-
+    bereinigte) Qualität höchstens quality_tolerance unter der besten liegt
+    und die das Latenz-SLO einhalten, gewinnt das mit dem besten Wert pro Dollar.
+    """
+
+    def __init__(self, store: ModelStatsStore, prior_strength: float = 50.0,
+                 quality_tolerance: float = 0.05, min_latency_samples: int = 20,
+                 cost_floor: float = 1e-4, rng: Optional[random.Random] = None):
+        self.store = store
+        self.prior_strength = prior_strength
+        self.quality_tolerance = quality_tolerance
+        self.min_latency_samples = min_latency_samples
+        self.cost_floor = cost_floor
+        self.rng = rng or random.Random()
+
+    def predicted_latency_ms(self, candidate: Candidate) -> float:
+        stats = self.store.models.get(candidate.model_id)
+        if stats is not None and stats.histogram.total >= self.min_latency_samples:
+            return stats.histogram.quantile(0.95)
+        return LATENCY_PRIORS_MS.get(candidate.response_time, LATENCY_PRIORS_MS['medium'])
+
+    def sample_quality(self, task_type: str, candidate: Candidate) -> float:
+        prior = min(max(candidate.prior_quality, 0.01), 0.99)
+        observed = self.store.acceptance_for(task_type, candidate.model_id)
+        alpha = prior * self.prior_strength + observed.accepted
+        beta = (1 - prior) * self.prior_strength + observed.rejected
+        return self.rng.betavariate(alpha, beta) * (1 - self.store.error_rate(candidate.model_id))
+
+    def select(self, task_type: str, candidates: List[Candidate],
+               latency_slo_ms: Optional[float] = None, prefer_quality: bool = False) -> Optional[Dict]:
+        if not candidates:
+            return None
+        scored = []
+        for candidate in candidates:
+            latency = self.predicted_latency_ms(candidate)
+            scored.append((candidate, self.sample_quality(task_type, candidate), latency))
+
+        if latency_slo_ms is not None:
+            within = [entry for entry in scored if entry[2] <= latency_slo_ms]
+            # Reason: hält kein Modell das SLO, lieber das schnellste als gar keins
+            scored = within or [min(scored, key=lambda entry: entry[2])]
+
+        best_quality = max(quality for _, quality, _ in scored)
+        if prefer_quality:
+            chosen = max(scored, key=lambda entry: entry[1])
+        else:
+            eligible = [entry for entry in scored if entry[1] >= best_quality - self.quality_tolerance]
+            chosen = max(eligible, key=lambda entry: entry[1] / (entry[0].estimated_cost + self.cost_floor))
+        candidate, quality, latency = chosen
+        return {
+            "modelId": candidate.model_id,
+            "estimatedCost": candidate.estimated_cost,
+            "fitness": quality,
+            "predictedLatencyMs": latency
+        }
+
+_store: Optional[ModelStatsStore] = None
+
+def get_model_stats() -> ModelStatsStore:
+    """Prozessweiter Stats-Store (beim ersten Zugriff von Platte geladen)"""
+    global _store
+    if _store is None:
+        _store = ModelStatsStore()
+        _store.load()
+        # Reason: Messungen seit dem letzten periodischen Save nicht beim Beenden verlieren
+        atexit.register(_store.save_if_due, True)
+    return _store
@@ -4,19 +4,32 @@ Enterprise AI Orchestrator mit:
 - Cost Optimization
 - Quality Control
 """
+import asyncio
 import logging
-from typing import List, Dict
+import threading
+from typing import AsyncIterator, Dict, Iterable, List, Optional
 from concurrent.futures import ThreadPoolExecutor
 from .decision_engine import AIDecisionEngine
+from .cascade import CascadeConfig, CascadeScheduler
 
 class AIOrchestrator:
-    def __init__(self, max_workers=4):
+    def __init__(self, max_workers=4, max_concurrency: Optional[int] = None,
+                 job_timeout: float = 30.0, retries: int = 1,
+                 retry_backoff: float = 0.5, models: Optional[Dict] = None):
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
         self.logger = logging.getLogger('ai-orchestrator')
-        self._init_models()
+        self.max_concurrency = max_concurrency or max_workers
+        self.job_timeout = job_timeout
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.cascade: Optional[CascadeScheduler] = None
+        self._init_models(models)
 
-    def _init_models(self):
+    def _init_models(self, models: Optional[Dict] = None):
         """Initialisiere Modelle mit unterschiedlichen Stärken"""
+        if models is not None:
+            self.models = models
+            return
         self.models = {
             'fast': FastModel(),
             'balanced': BalancedModel(),
@@ -29,42 +42,116 @@ class AIOrchestrator:
         - Dynamischem Load Balancing
         - Automatic Retry
         - Progress Tracking
+
+        Sammelt stream_process_jobs und sortiert erst am Ende nach Score.
+        """
+        results = [result async for result in self.stream_process_jobs(jobs)]
+        return sorted(results, key=lambda x: x['score'], reverse=True)
+
+    async def cascade_process_jobs(self, jobs: List[Dict], budget: Optional[float] = None,
+                                   config: Optional[CascadeConfig] = None) -> List[Dict]:
+        """
+        Stufenweise Batch-Verarbeitung: fast über alle Jobs, balanced nur für
+        die Überlebenden, precise nur für die Top-k. Der Scheduler bleibt
+        zwischen Aufrufen erhalten, damit sich die Schwellen einpendeln.
         """
-        futures = []
-        results = []
-        
-        for job in jobs:
-            future = self.executor.submit(
-                self._process_single_job,
-                job
-            )
-            futures.append(future)
-        
-        for future in as_completed(futures):
+        if self.cascade is None or config is not None:
+            self.cascade = CascadeScheduler(self.models, config, self.executor)
+        self.cascade.budget = budget
+        return await self.cascade.run(jobs)
+
+    async def stream_process_jobs(self, jobs: Iterable[Dict]) -> AsyncIterator[Dict]:
+        """
+        Liefert Ergebnisse in Fertigstellungsreihenfolge, ohne den Event Loop
+        zu blockieren. Höchstens max_concurrency Jobs sind gleichzeitig in
+        Arbeit; neue Jobs werden erst angenommen, wenn ein Platz frei wird
+        (Backpressure auch für lange/unendliche Job-Iteratoren).
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        done: asyncio.Queue = asyncio.Queue()
+        pending = 0
+
+        async def run(job: Dict) -> None:
             try:
-                results.append(future.result())
+                await done.put(await self._process_with_retry(job))
             except Exception as e:
                 self.logger.error(f"Job processing failed: {e}")
-        
-        return sorted(results, key=lambda x: x['score'], reverse=True)
+                await done.put(None)
+            finally:
+                semaphore.release()
+
+        tasks = set()
+        try:
+            for job in jobs:
+                await semaphore.acquire()
+                task = asyncio.create_task(run(job))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                pending += 1
+                # Fertige Ergebnisse schon während der Annahme weiterreichen
+                while not done.empty():
+                    pending -= 1
+                    result = done.get_nowait()
+                    if result is not None:
+                        yield result
+            while pending:
+                pending -= 1
+                result = await done.get()
+                if result is not None:
+                    yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _process_with_retry(self, job: Dict) -> Dict:
+        """
+        Job im Executor verarbeiten, mit Timeout und Retries je Job. Den Worker-Thread
+        kann wait_for nicht abbrechen: nach einem Timeout wird er nur per Flag zwischen
+        den Phasen gestoppt und der Job nicht erneut eingereicht, sonst liefe der Pool
+        mit hängenden Threads voll.
+        """
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.retries + 1):
+            cancel = threading.Event()
+            try:
+                return await asyncio.wait_for(
+                    loop.run_in_executor(self.executor, self._process_single_job, job, cancel),
+                    timeout=self.job_timeout
+                )
+            except asyncio.TimeoutError:
+                cancel.set()
+                raise
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                self.logger.warning(f"Retry {attempt + 1} for job {job.get('id')}: {e!r}")
+                await asyncio.sleep(self.retry_backoff * (2 ** attempt))
+
+    def _process_single_job(self, job: Dict, cancel: Optional[threading.Event] = None) -> Dict:
+        """Verarbeite einzelnen Job mit adaptivem Model Routing; bricht vor jeder Phase ab, sobald cancel gesetzt ist"""
+        def check_cancelled():
+            if cancel is not None and cancel.is_set():
+                raise TimeoutError(f"Job {job.get('id')} nach Timeout abgebrochen")
 
-    def _process_single_job(self, job: Dict) -> Dict:
-        """Verarbeite einzelnen Job mit adaptivem Model Routing"""
         try:
             # Phase 1: Schnelle Vorauswahl
             if not self.models['fast'].pre_filter(job):
                 return {**job, 'score': 0, 'reason': 'Failed pre-filter'}
             
             # Phase 2: Detaillierte Analyse
+            check_cancelled()
             detailed_analysis = self.models['balanced'].analyze(job)
             
             # Phase 3: Hochpräzise Validierung
             if detailed_analysis['score'] > 0.7:
+                check_cancelled()
                 detailed_analysis.update(
                     self.models['precise'].validate(job)
                 )
             
             return detailed_analysis
+        except TimeoutError:
+            raise
         except Exception as e:
-            self.logger.error(f"Error processing job {job['id']}: {e}")
+            self.logger.error(f"Error processing job {job.get('id')}: {e}")
             raise
@@ -0,0 +1,304 @@
+"""
+Prompt-Assembly mit Token-Budget:
+- DE/EN Templates einmalig vorkompiliert (statischer Teil samt Tokenzahl gecacht)
+- Tokenzählung exakt mit tiktoken, sonst konservative obere Schranke
+- HTML-Bereinigung und extraktive Kürzung der Jobbeschreibung auf ein Zielbudget
+- Echte Token-Schätzungen für LLMRouter.selectBestModel
+- Shared-Prefix Layout: byte-stabiler System/Profil-Prefix mit Cache-Breakpoint, Job-Teil zuletzt
+"""
+import html
+import math
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .prompt_templates import DE_PROMPTS, EN_PROMPTS
+from .response_cache import profile_fingerprint
+
+try:
+    import tiktoken
+except ImportError:  # optional: ohne tiktoken wird geschätzt
+    tiktoken = None
+
+DEFAULT_LIMITS = {
+    # (max_input_tokens, max_output_tokens)
+    "proposal": (900, 600),
+    "analysis": (400, 60)
+}
+TASK_KINDS = {"PROPOSAL_GENERATION": "proposal", "JOB_FILTERING": "analysis"}
+# Kürzere Prefixe cachen Anthropic/OpenAI nicht; darunter wird kein Cache-Rabatt angenommen
+MIN_CACHEABLE_TOKENS = 1024
+
+_PIECE_RE = re.compile(r"[^\W\d_]+|\d{1,3}|[^\w\s]|\s+")
+_BLOCK_TAG_RE = re.compile(r"<\s*(br|/p|/div|/li|/h\d|/tr)[^>]*>", re.IGNORECASE)
+_TAG_RE = re.compile(r"<[^>]+>")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD_RE = re.compile(r"[a-z0-9äöüß+#]+")
+
+class TokenCounter:
+    """
+    Mit tiktoken exakt (encoding des Zielmodells), sonst Obergrenze über
+    eine BPE-ähnliche Vorzerlegung: Wortteile ~4 Zeichen pro Token,
+    Nicht-ASCII-Zeichen und Satzzeichen je ein Token.
+    """
+
+    def __init__(self, encoding: str = "cl100k_base"):
+        self._encoding = None
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.get_encoding(encoding)
+            except Exception:
+                self._encoding = None
+
+    @property
+    def exact(self) -> bool:
+        return self._encoding is not None
+
+    def count(self, text: str) -> int:
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        tokens = 0
+        for piece in _PIECE_RE.findall(text):
+            if piece.isspace():
+                tokens += piece.count("\n") or (1 if len(piece) > 1 else 0)
+            elif piece[0].isalpha():
+                tokens += math.ceil(len(piece) / 4) + sum(1 for ch in piece if ord(ch) > 127)
+            else:
+                tokens += 1
+        return tokens
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Text auf höchstens max_tokens kürzen (an Wortgrenzen)"""
+        if max_tokens <= 0:
+            return ""
+        if self._encoding is not None:
+            ids = self._encoding.encode(text)
+            return text if len(ids) <= max_tokens else self._encoding.decode(ids[:max_tokens])
+        words = text.split(" ")
+        low, high = 0, len(words)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.count(" ".join(words[:middle])) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        return " ".join(words[:low])
+
+def clean_description(text: str) -> str:
+    """HTML (RSS-Beschreibungen) zu Fließtext mit Zeilenumbrüchen an Blockgrenzen"""
+    text = _BLOCK_TAG_RE.sub("\n", text or "")
+    text = html.unescape(_TAG_RE.sub(" ", text))
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+def summarize(text: str, max_tokens: int, counter: TokenCounter, keywords: Optional[List[str]] = None) -> Tuple[str, bool]:
+    """
+    Extraktive Kürzung: erster Satz bleibt, danach die Sätze mit den meisten
+    Keyword-Treffern (Skills, Titel) in Originalreihenfolge, bis das Budget voll ist.
+    Liefert (Text, gekürzt?).
+    """
+    if counter.count(text) <= max_tokens:
+        return text, False
+    sentences = [s.strip() for s in _SENTENCE_SPLIT_RE.split(text) if s.strip()]
+    if not sentences:
+        return counter.truncate(text, max_tokens), True
+    terms = {word for keyword in keywords or [] for word in _WORD_RE.findall(keyword.lower())}
+    costs = [counter.count(sentence) + 1 for sentence in sentences]
+    ranked = sorted(range(1, len(sentences)), key=lambda i: (
+        -len(terms.intersection(_WORD_RE.findall(sentences[i].lower()))), i))
+
+    chosen, used = set(), 0
+    for i in [0] + ranked:
+        if used + costs[i] <= max_tokens:
+            chosen.add(i)
+            used += costs[i]
+    if not chosen:
+        return counter.truncate(sentences[0], max_tokens), True
+    return "\n".join(sentences[i] for i in sorted(chosen)), True
+
+class CompiledTemplate:
+    """Literale Teile mit Slots; statische Tokens werden nur einmal gezählt"""
+    _SLOT_RE = re.compile(r"\{(\w+)\}")
+
+    def __init__(self, source: str, counter: TokenCounter):
+        self.parts: List[Tuple[bool, str]] = []
+        position = 0
+        for match in self._SLOT_RE.finditer(source):
+            self.parts.append((False, source[position:match.start()]))
+            self.parts.append((True, match.group(1)))
+            position = match.end()
+        self.parts.append((False, source[position:]))
+        self.slots = [value for is_slot, value in self.parts if is_slot]
+        self.static_tokens = sum(counter.count(value) for is_slot, value in self.parts if not is_slot)
+        # Reason: BPE kann über Slotgrenzen anders mergen; ein Token Reserve pro Slot hält die Schranke
+        self.overhead = self.static_tokens + len(self.slots)
+
+    def render(self, values: Dict[str, str]) -> str:
+        return "".join(values[value] if is_slot else value for is_slot, value in self.parts)
+
+INSTRUCTIONS = {
+    "de": ("Schreibe ein Angebot für '{title}'.\nJobbeschreibung:\n{description}\n"
+           "Freelancer: {name} ({skills})\nAufbau: "),
+    "en": ("Write a job proposal for '{title}'.\nJob description:\n{description}\n"
+           "Freelancer: {name} ({skills})\nStructure: ")
+}
+
+PREFIX_INSTRUCTIONS = {
+    "de": "Du schreibst Angebote für den folgenden Freelancer.\nFreelancer: {name}\nSkills: {skills}\n{profile}Aufbau: ",
+    "en": "You write job proposals for the freelancer below.\nFreelancer: {name}\nSkills: {skills}\n{profile}Structure: "
+}
+
+JOB_SECTIONS = {
+    "de": "Schreibe ein Angebot für '{title}'.\nJobbeschreibung:\n{description}",
+    "en": "Write a job proposal for '{title}'.\nJob description:\n{description}"
+}
+
+def _structure(prompts: Dict) -> str:
+    proposal = prompts["proposal"]
+    return " / ".join(proposal[section] for section in ("intro", "skills", "approach", "closing"))
+
+def _template_sources(lang: str, prompts: Dict) -> Dict[str, str]:
+    return {
+        "proposal": INSTRUCTIONS[lang] + _structure(prompts),
+        "analysis": "{title}\n{description}\n\n" + "\n".join(prompts["analysis"].values()),
+        "prefix": PREFIX_INSTRUCTIONS[lang] + _structure(prompts),
+        "job": JOB_SECTIONS[lang]
+    }
+
+def _profile_lines(user_profile: Dict) -> str:
+    """Weitere Profilfelder in fester Reihenfolge, damit der Prefix byte-identisch bleibt"""
+    extra = {key: value for key, value in user_profile.items() if key not in ("name", "skills")}
+    return "".join(f"{key}: {extra[key]}\n" for key in sorted(extra))
+
+@dataclass
+class SharedPrefix:
+    text: str
+    tokens: int
+
+@dataclass
+class BuiltPrompt:
+    text: str
+    input_tokens: int
+    output_tokens: int
+    truncated: bool
+    exact: bool
+    prefix: Optional[str] = None          # nur im Shared-Prefix Layout
+    suffix: Optional[str] = None
+    cached_prefix_tokens: int = 0         # erwartete Cache-Treffer ab dem zweiten Call
+
+    @property
+    def token_estimate(self) -> Dict[str, int]:
+        """Format von LLMRouter.selectBestModel (cachedInput ist Teil von input)"""
+        estimate = {"input": self.input_tokens, "output": self.output_tokens}
+        if self.cached_prefix_tokens:
+            estimate["cachedInput"] = self.cached_prefix_tokens
+        return estimate
+
+    def messages(self, cache_breakpoints: bool = True) -> List[Dict]:
+        """
+        Chat-Messages: Prefix als System-Message, Job als User-Message.
+        cache_breakpoints markiert das Prefix-Ende (Anthropic/OpenRouter
+        cache_control); OpenAI cached Prefixe automatisch und braucht keinen Marker.
+        """
+        if self.prefix is None:
+            return [{"role": "user", "content": self.text}]
+        system: Dict = {"type": "text", "text": self.prefix}
+        if cache_breakpoints:
+            system["cache_control"] = {"type": "ephemeral"}
+        return [{"role": "system", "content": [system]}, {"role": "user", "content": self.suffix}]
+
+class PromptBuilder:
+    def __init__(self, counter: Optional[TokenCounter] = None):
+        self.counter = counter or TokenCounter()
+        self.templates = {
+            lang: {kind: CompiledTemplate(source, self.counter) for kind, source in _template_sources(lang, prompts).items()}
+            for lang, prompts in (("de", DE_PROMPTS), ("en", EN_PROMPTS))
+        }
+        self._prefixes: Dict[Tuple[str, str], SharedPrefix] = {}
+
+    def _template(self, lang: str, kind: str) -> CompiledTemplate:
+        return self.templates.get(lang, self.templates["en"])[kind]
+
+    def _build(self, kind: str, lang: str, job: Dict, values: Dict[str, str], keywords: List[str],
+               max_input_tokens: Optional[int], max_output_tokens: Optional[int]) -> BuiltPrompt:
+        default_input, default_output = DEFAULT_LIMITS.get(kind, DEFAULT_LIMITS["proposal"])
+        max_input_tokens = max_input_tokens or default_input
+        template = self._template(lang, kind)
+        values = {**values, "title": job.get("title", "")}
+        fixed = template.overhead + sum(self.counter.count(value) for value in values.values())
+        description, truncated = summarize(clean_description(job.get("description", "")),
+                                           max(0, max_input_tokens - fixed), self.counter, keywords)
+        values["description"] = description
+        text = template.render(values)
+        return BuiltPrompt(text, fixed + self.counter.count(description), max_output_tokens or default_output,
+                           truncated, self.counter.exact)
+
+    def shared_prefix(self, user_profile: Dict, lang: str = "en") -> SharedPrefix:
+        """Profil-Prefix pro (Sprache, Profil) nur einmal rendern und zählen"""
+        key = (lang if lang in self.templates else "en", profile_fingerprint(user_profile))
+        prefix = self._prefixes.get(key)
+        if prefix is None:
+            template = self._template(key[0], "prefix")
+            text = template.render({
+                "name": str(user_profile.get("name", "")),
+                "skills": ", ".join(user_profile.get("skills", [])),
+                "profile": _profile_lines(user_profile)
+            })
+            prefix = self._prefixes[key] = SharedPrefix(text, self.counter.count(text))
+        return prefix
+
+    def build_proposal(self, job: Dict, user_profile: Dict, lang: str = "en",
+                       max_input_tokens: Optional[int] = None, max_output_tokens: Optional[int] = None,
+                       layout: str = "inline") -> BuiltPrompt:
+        """
+        layout='shared_prefix' trennt invarianten Profil-Prefix und Job-Teil.
+        Ohne max_input_tokens bekommt der Job-Teil das volle Default-Budget und
+        der (gecachte) Prefix kommt obendrauf; sonst ist max_input_tokens die Gesamtgrenze.
+        """
+        skills = list(user_profile.get("skills", []))
+        keywords = skills + [job.get("title", "")]
+        if layout != "shared_prefix":
+            values = {"name": user_profile.get("name", ""), "skills": ", ".join(skills)}
+            return self._build("proposal", lang, job, values, keywords, max_input_tokens, max_output_tokens)
+
+        prefix = self.shared_prefix(user_profile, lang)
+        default_input, default_output = DEFAULT_LIMITS["proposal"]
+        # Reason: Prefixe ab MIN_CACHEABLE_TOKENS passen nie in default_input; würden sie
+        # mitzählen, bliebe entweder kein Cache-Rabatt oder kein Platz für die Jobbeschreibung
+        budget = max(1, max_input_tokens - prefix.tokens - 2) if max_input_tokens else default_input
+        suffix = self._build("job", lang, job, {}, keywords, budget, max_output_tokens or default_output)
+        cached = prefix.tokens if prefix.tokens >= MIN_CACHEABLE_TOKENS else 0
+        return BuiltPrompt(f"{prefix.text}\n\n{suffix.text}", prefix.tokens + 2 + suffix.input_tokens,
+                           suffix.output_tokens, suffix.truncated, self.counter.exact,
+                           prefix=prefix.text, suffix=suffix.text, cached_prefix_tokens=cached)
+
+    def build_analysis(self, job: Dict, lang: str = "en", max_input_tokens: Optional[int] = None,
+                       max_output_tokens: Optional[int] = None) -> BuiltPrompt:
+        keywords = list(job.get("skills", [])) + [job.get("title", "")]
+        return self._build("analysis", lang, job, {}, keywords, max_input_tokens, max_output_tokens)
+
+    def estimate(self, task_type: str, job: Optional[Dict] = None, user_profile: Optional[Dict] = None,
+                 lang: str = "en") -> Dict[str, int]:
+        """Token-Schätzung für /llm/select; ohne Job die Obergrenzen des Aufgabentyps"""
+        kind = TASK_KINDS.get(task_type, "proposal")
+        if job is None:
+            max_input, max_output = DEFAULT_LIMITS[kind]
+            return {"input": max_input, "output": max_output}
+        if kind == "analysis":
+            return self.build_analysis(job, lang).token_estimate
+        return self.build_proposal(job, user_profile or {}, lang).token_estimate
+
+_builder: Optional[PromptBuilder] = None
+
+def get_prompt_builder() -> PromptBuilder:
+    global _builder
+    if _builder is None:
+        _builder = PromptBuilder()
+    return _builder
+
+def build_analysis_prompt(job: Dict, lang: str = "en") -> str:
+    """Kurzer Analyse-Prompt (wird vom Dispatcher mit anderen gepackt)"""
+    return get_prompt_builder().build_analysis(job, lang).text
+
+def build_proposal_prompt(job: Dict, user_profile: Dict, lang: str = "en") -> str:
+    return get_prompt_builder().build_proposal(job, user_profile, lang).text
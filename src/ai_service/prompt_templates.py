@@ -1,6 +1,10 @@
 """
 Professionelle Prompt-Vorlagen für deutsche/englische Job-Proposals
 """
+from typing import Dict
+
+# Bei jeder inhaltlichen Änderung erhöhen: invalidiert gecachte Proposals
+TEMPLATE_VERSION = "1"
 
 DE_PROMPTS = {
     "proposal": {
@@ -0,0 +1,170 @@
+"""
+Semantischer Response-Cache für Proposal-Generierung mit:
+- Level 1: Exakter Hash auf normalisiertem Jobtext + Profil + Template-Version
+- Level 2: Ähnlichkeitssuche über gehashte Job-Vektoren (Near-Duplicates)
+- TTL und LRU-Eviction
+- Hit-Rate Metriken
+"""
+import hashlib
+import html
+import json
+import math
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_TOKEN_RE = re.compile(r"[a-z0-9äöüß]+")
+VECTOR_DIM = 1 << 18
+
+def normalize_job_text(job: Dict) -> str:
+    """Titel + Beschreibung ohne HTML, klein, Whitespace zusammengefasst"""
+    text = f"{job.get('title', '')} {job.get('description', '')}"
+    text = html.unescape(_TAG_RE.sub(" ", text)).lower()
+    return " ".join(text.split())
+
+def profile_fingerprint(profile: Dict) -> str:
+    return hashlib.sha256(json.dumps(profile, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+def job_vector(text: str) -> Dict[int, float]:
+    """L2-normierter Hashing-Vektor aus Uni- und Bigrammen"""
+    tokens = _TOKEN_RE.findall(text)
+    counts: Dict[int, float] = {}
+    for gram in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+        h = int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "little") % VECTOR_DIM
+        counts[h] = counts.get(h, 0.0) + 1.0
+    norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+    return {h: v / norm for h, v in counts.items()}
+
+def cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(h, 0.0) for h, v in a.items())
+
+@dataclass
+class CacheEntry:
+    proposal: str
+    title: str
+    namespace: str
+    vector: Dict[int, float]
+    created_at: float
+
+@dataclass
+class CacheHit:
+    proposal: str
+    kind: str                 # 'exact' | 'similar'
+    similarity: float
+    source_title: str
+
+    def adapt(self, job: Dict) -> str:
+        """Leichte Anpassung eines ähnlichen Entwurfs an den neuen Job"""
+        if self.kind == 'exact' or not self.source_title:
+            return self.proposal
+        return self.proposal.replace(self.source_title, job.get('title', self.source_title))
+
+@dataclass
+class CacheStats:
+    exact_hits: int = 0
+    similar_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.exact_hits + self.similar_hits + self.misses
+        return (self.exact_hits + self.similar_hits) / lookups if lookups else 0.0
+
+class ProposalCache:
+    """
+    Zwei-Level Cache vor dem LLM-Aufruf. Ähnlichkeitssuche läuft nur
+    innerhalb desselben Profil/Template-Namensraums.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 7 * 86400,
+                 similarity_threshold: float = 0.9, template_version: str = "1"):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.template_version = template_version
+        self.entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.namespaces: Dict[str, Set[str]] = {}
+        self.stats = CacheStats()
+
+    def _namespace(self, profile: Dict, variant: str) -> str:
+        return f"{self.template_version}:{variant}:{profile_fingerprint(profile)}"
+
+    def _key(self, text: str, namespace: str) -> str:
+        return hashlib.sha256(f"{namespace}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, job: Dict, profile: Dict, variant: str = "") -> Optional[CacheHit]:
+        """variant trennt z.B. highend/costefficient Entwürfe"""
+        now = time.time()
+        text = normalize_job_text(job)
+        namespace = self._namespace(profile, variant)
+        key = self._key(text, namespace)
+
+        entry = self.entries.get(key)
+        if entry is not None and not self._expired(key, entry, now):
+            self.entries.move_to_end(key)
+            self.stats.exact_hits += 1
+            return CacheHit(entry.proposal, 'exact', 1.0, entry.title)
+
+        vector = job_vector(text)
+        best_key, best_score = None, 0.0
+        for other_key in list(self.namespaces.get(namespace, ())):
+            other = self.entries.get(other_key)
+            if other is None or self._expired(other_key, other, now):
+                continue
+            score = cosine(vector, other.vector)
+            if score > best_score:
+                best_key, best_score = other_key, score
+        if best_key is not None and best_score >= self.similarity_threshold:
+            self.entries.move_to_end(best_key)
+            self.stats.similar_hits += 1
+            best = self.entries[best_key]
+            return CacheHit(best.proposal, 'similar', best_score, best.title)
+
+        self.stats.misses += 1
+        return None
+
+    def put(self, job: Dict, profile: Dict, proposal: str, variant: str = "") -> None:
+        text = normalize_job_text(job)
+        namespace = self._namespace(profile, variant)
+        key = self._key(text, namespace)
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = CacheEntry(proposal, job.get('title', ''), namespace, job_vector(text), time.time())
+        self.namespaces.setdefault(namespace, set()).add(key)
+        while len(self.entries) > self.max_entries:
+            oldest = next(iter(self.entries))
+            self._remove(oldest)
+            self.stats.evictions += 1
+
+    def _expired(self, key: str, entry: CacheEntry, now: float) -> bool:
+        if now - entry.created_at <= self.ttl:
+            return False
+        self._remove(key)
+        self.stats.expirations += 1
+        return True
+
+    def _remove(self, key: str) -> None:
+        entry = self.entries.pop(key)
+        keys = self.namespaces.get(entry.namespace)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.namespaces[entry.namespace]
+
+    def metrics(self) -> Dict:
+        return {
+            "exact_hits": self.stats.exact_hits,
+            "similar_hits": self.stats.similar_hits,
+            "misses": self.stats.misses,
+            "hit_rate": self.stats.hit_rate,
+            "evictions": self.stats.evictions,
+            "expirations": self.stats.expirations,
+            "size": len(self.entries)
+        }
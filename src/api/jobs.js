@@ -1,8 +1,11 @@
 import axios from 'axios';
 
-export const fetchJobs = async (token) => {
+// params: { limit, after, fields } -- ohne limit alle Jobs; mit limit steht der Cursor
+// der nächsten Seite im Header X-Next-Cursor
+export const fetchJobs = async (token, params = {}) => {
   const res = await axios.get('/api/jobs', {
-    headers: { Authorization: `Bearer ${token}` }
+    headers: { Authorization: `Bearer ${token}` },
+    params
   });
   return res.data;
 };
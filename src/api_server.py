@@ -1,14 +1,35 @@
+import json
 import os
-from fastapi import FastAPI, HTTPException, Depends, Header
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 import uvicorn
 import jwt
 import httpx
 from datetime import datetime
+from src.integrations.job_ingest import MAX_BULK_ITEMS, UPSERT_PREFER, ingest_jobs
+from src.integrations.jwt_verifier import JWTVerifier, bearer_token
+from src.integrations.postgrest import (DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, iterate_pages, list_query, parse_fields,
+                                        split_page)
+from src.integrations.read_cache import ReadThroughCache, etag_matches
+from src.integrations.supabase_client import CircuitOpenError, SupabaseClient, SupabaseError
+
+supabase = SupabaseClient.from_env()
+read_cache = ReadThroughCache()
+
+@asynccontextmanager
+async def lifespan(app):
+    # Ein Verbindungspool für die ganze Laufzeit statt TCP+TLS-Handshake pro Request
+    await supabase.start()
+    try:
+        yield
+    finally:
+        await supabase.close()
 
-app = FastAPI(title="AutoMonet API", version="1.0")
+app = FastAPI(title="AutoMonet API", version="1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,31 +39,47 @@ app.add_middleware(
 
 SUPABASE_URL = os.getenv("VITE_SUPABASE_URL")
 SUPABASE_KEY = os.getenv("VITE_SUPABASE_ANON_KEY")
+# Nur serverseitig: umgeht RLS, user_id kommt dann ausschließlich aus dem geprüften JWT
+SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET", "changeme")
+# JWKS (asymmetrische Schlüssel) wird einmal beim Start aus der lokalen Datei geladen
+jwt_verifier = JWTVerifier(SUPABASE_JWT_SECRET, jwks_path=os.getenv("SUPABASE_JWKS_PATH"))
 
 async def supabase_request(method, path, token, **kwargs):
-    url = f"{SUPABASE_URL}/rest/v1/{path}"
-    headers = {
-        "apikey": SUPABASE_KEY,
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json",
-        "Prefer": "return=representation"
-    }
-    timeout = httpx.Timeout(10.0, connect=5.0)
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        resp = await client.request(method, url, headers=headers, **kwargs)
-        if resp.status_code >= 400:
-            raise HTTPException(status_code=resp.status_code, detail=resp.text)
-        return resp.json()
-
-def verify_jwt(authorization: str = Header(...)):
     try:
-        scheme, token = authorization.split()
-        if scheme.lower() != "bearer":
-            raise
-        payload = jwt.decode(token, SUPABASE_JWT_SECRET, algorithms=["HS256"])
-        return payload
-    except Exception:
+        return await supabase.json(method, path, token, **kwargs)
+    except SupabaseError as e:
+        headers = {"Retry-After": str(round(e.retry_after))} if e.retry_after is not None else None
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=headers)
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e),
+                            headers={"Retry-After": str(max(1, round(e.retry_after)))})
+    except httpx.TimeoutException:
+        raise HTTPException(status_code=504, detail="Supabase timeout")
+    except httpx.TransportError as e:
+        raise HTTPException(status_code=502, detail=f"Supabase unreachable: {e}")
+
+async def cached_read(user, route, path):
+    """GET über den Read-Through-Cache (pro Nutzer und Route)"""
+    return await read_cache.get_or_fetch(user['sub'], route, path,
+                                         lambda: supabase_request("GET", path, SUPABASE_KEY))
+
+def conditional(request: Request, response: Response, entry):
+    """ETag setzen; 304-Response, wenn der Client den Stand schon hat"""
+    headers = {"ETag": entry.etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+async def verify_jwt(authorization: str = Header(...)):
+    # async: Cache-Hits brauchen keinen Umweg über den Threadpool
+    token = bearer_token(authorization)
+    if token is None:
+        raise HTTPException(status_code=401, detail="Invalid or missing token")
+    try:
+        return jwt_verifier.verify(token)
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid or missing token")
 
 class Job(BaseModel):
@@ -69,19 +106,87 @@ class SettingsModel(BaseModel):
     platformSettings: dict
     systemSettings: dict
 
+class BulkJobs(BaseModel):
+    jobs: List[Dict[str, Any]]
+
 class LLMRequest(BaseModel):
     task_type: str
     force_high_quality: bool = False
+    job: Optional[dict] = None
+    lang: str = "en"
+
+async def list_rows(request: Request, user, route, table, model, limit, after, fields, format):
+    """
+    Eine Seite (Keyset über id, Cursor der Folgeseite in X-Next-Cursor) oder
+    bei format=ndjson alle Zeilen gestreamt. Ohne limit und after wie bisher
+    alle Zeilen ungeblättert; after ohne limit blättert mit DEFAULT_PAGE_SIZE.
+    Zeilen gehen als rohe Dicts raus, ohne Pydantic-Modelle; response_model
+    dient nur der Dokumentation.
+    """
+    try:
+        columns = parse_fields(fields, model.__annotations__)
+        cursor = decode_cursor(after) if after else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    filters = {"user_id": f"eq.{user['sub']}"}
+    if format == "ndjson":
+        return await ndjson_export(table, filters, columns, cursor)
+    if limit is None and cursor is not None:
+        limit = DEFAULT_PAGE_SIZE
+
+    entry = await cached_read(user, route, list_query(table, filters, columns, limit, cursor))
+    rows, next_cursor = split_page(entry.value, limit)
+    headers = {"ETag": entry.etag, "Cache-Control": "private, no-cache"}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(rows, headers=headers)
+
+def ndjson(rows):
+    return "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+
+async def ndjson_export(table, filters, columns, after):
+    pages = iterate_pages(lambda path: supabase_request("GET", path, SUPABASE_KEY), table, filters, columns, after)
+    # Erste Seite vor dem Senden der Header holen: Upstream-Fehler werden so noch zu 4xx/5xx
+    try:
+        first = await pages.__anext__()
+    except StopAsyncIteration:
+        first = []
+
+    async def lines():
+        if first:
+            yield ndjson(first)
+        async for page in pages:
+            yield ndjson(page)
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 @app.get("/jobs", response_model=List[Job])
-async def get_jobs(user=Depends(verify_jwt)):
-    data = await supabase_request("GET", f"job_opportunities?user_id=eq.{user['sub']}", SUPABASE_KEY)
-    return data
+async def get_jobs(request: Request, user=Depends(verify_jwt),
+                   limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE), after: Optional[str] = None,
+                   fields: Optional[str] = None, format: str = Query("json", pattern="^(json|ndjson)$")):
+    return await list_rows(request, user, "jobs", "job_opportunities", Job, limit, after, fields, format)
+
+@app.post("/jobs/bulk")
+async def bulk_upsert_jobs(body: BulkJobs, user=Depends(verify_jwt), authorization: str = Header(...)):
+    if len(body.jobs) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Maximal {MAX_BULK_ITEMS} Jobs pro Request")
+    # Reason: RLS auf job_opportunities verlangt auth.uid() = user_id; mit dem Anon-Key scheitert jeder Upsert
+    token = SUPABASE_SERVICE_KEY or bearer_token(authorization)
+
+    async def post(path, rows):
+        await supabase_request("POST", path, token, json=rows, headers={"Prefer": UPSERT_PREFER})
+
+    result = await ingest_jobs(post, body.jobs, user['sub'])
+    if result["upserted"]:
+        read_cache.invalidate(user['sub'], "jobs")
+    return result
 
 @app.get("/proposals", response_model=List[Proposal])
-async def get_proposals(user=Depends(verify_jwt)):
-    data = await supabase_request("GET", f"proposals?user_id=eq.{user['sub']}", SUPABASE_KEY)
-    return data
+async def get_proposals(request: Request, user=Depends(verify_jwt),
+                        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE), after: Optional[str] = None,
+                        fields: Optional[str] = None, format: str = Query("json", pattern="^(json|ndjson)$")):
+    return await list_rows(request, user, "proposals", "proposals", Proposal, limit, after, fields, format)
 
 @app.post("/proposals", response_model=Proposal)
 async def create_proposal(proposal: Proposal, user=Depends(verify_jwt)):
@@ -93,31 +198,41 @@ async def create_proposal(proposal: Proposal, user=Depends(verify_jwt)):
     payload = proposal.dict()
     payload['user_id'] = user['sub']
     data = await supabase_request("POST", "proposals", SUPABASE_KEY, json=[payload])
+    read_cache.invalidate(user['sub'], "proposals", "analytics")
     return data[0]
 
 @app.get("/settings", response_model=SettingsModel)
-async def get_settings(user=Depends(verify_jwt)):
-    data = await supabase_request("GET", f"user_settings?user_id=eq.{user['sub']}", SUPABASE_KEY)
-    if not data:
+async def get_settings(request: Request, response: Response, user=Depends(verify_jwt)):
+    entry = await cached_read(user, "settings", f"user_settings?user_id=eq.{user['sub']}")
+    if not entry.value:
         raise HTTPException(status_code=404, detail="Settings not found")
-    return data[0]
+    return conditional(request, response, entry) or entry.value[0]
 
 @app.put("/settings", response_model=SettingsModel)
 async def update_settings(settings: SettingsModel, user=Depends(verify_jwt)):
     data = await supabase_request("PATCH", f"user_settings?user_id=eq.{user['sub']}", SUPABASE_KEY, json=settings.dict())
+    read_cache.invalidate(user['sub'], "settings")
     return data[0]
 
 @app.post("/llm/select")
 async def select_llm(req: LLMRequest, user=Depends(verify_jwt)):
     from src.ai_service.llm_router import getLLMRouter
+    from src.ai_service.prompt_builder import get_prompt_builder
     router = getLLMRouter()
-    result = router.selectBestModel(req.task_type, {"input":500, "output":1500}, req.force_high_quality)
+    # Token-Schätzung aus dem tatsächlich gebauten Prompt statt Pauschalwerten
+    token_estimate = get_prompt_builder().estimate(req.task_type, req.job, lang=req.lang)
+    try:
+        result = router.selectBestModel(req.task_type, token_estimate, req.force_high_quality)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return result
 
 @app.get("/analytics")
-async def get_analytics(user=Depends(verify_jwt)):
-    data = await supabase_request("GET", f"earnings_forecast?user_id=eq.{user['sub']}", SUPABASE_KEY)
-    return {"forecasts": data, "updated_at": datetime.utcnow().isoformat()}
+async def get_analytics(request: Request, response: Response, user=Depends(verify_jwt)):
+    entry = await cached_read(user, "analytics", f"earnings_forecast?user_id=eq.{user['sub']}")
+    # updated_at = Zeitpunkt des Upstream-Fetches, damit der ETag zum Body passt
+    return conditional(request, response, entry) or {
+        "forecasts": entry.value, "updated_at": datetime.utcfromtimestamp(entry.fetched_at).isoformat()}
 
 @app.get("/health")
 async def health():
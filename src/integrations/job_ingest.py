@@ -0,0 +1,185 @@
+"""
+Bulk-Ingest gescrapter Jobs nach job_opportunities mit:
+- Normalisierung auf die Tabellenspalten und stabiler id (Plattform-id, sonst Hash aus URL/Titel)
+- Deduplizierung innerhalb des Batches
+- Großen PostgREST-Upserts (on_conflict=user_id,id, merge-duplicates) in parallelen Chunks
+- Ergebnis pro Item; bei Datenfehlern (400/409/422) wird der Chunk halbiert, bis die fehlerhaften
+  Zeilen isoliert sind. Auth-Fehler und Rate-Limits treffen den ganzen Chunk; bei 429 wird
+  Retry-After abgewartet und begrenzt erneut versucht
+- IngestClient: schickt Scraper-Ergebnisse gechunkt an POST /jobs/bulk (Keep-Alive)
+"""
+import asyncio
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from src.scrapers.dedup_index import job_keys
+from src.utils.http_pool import HostConnectionPool
+
+TABLE = "job_opportunities"
+CONFLICT_COLUMNS = "user_id,id"
+UPSERT_PREFER = "resolution=merge-duplicates,return=minimal"
+DEFAULT_CHUNK_SIZE = 500
+MAX_BULK_ITEMS = 10_000
+# Nur diese Status liegen an einzelnen Zeilen; 401/403/413/429 usw. würde Halbieren nur vervielfachen
+SPLIT_STATUSES = frozenset({400, 409, 422})
+RATE_LIMIT_RETRIES = 2
+MAX_RETRY_AFTER = 30.0
+
+def job_id(job: Dict) -> Optional[str]:
+    if job.get("id"):
+        return str(job["id"])
+    url_key, title_key = job_keys(job)
+    key = url_key or title_key
+    return key.hex() if key is not None else None
+
+def job_row(job: Dict, user_id: str) -> Dict:
+    """Scraper-Dict -> Zeile mit genau den Spalten von job_opportunities; ValueError bei Unbrauchbarem"""
+    row_id = job_id(job)
+    if row_id is None or not job.get("title"):
+        raise ValueError("Job braucht id, url oder title")
+    skills = job.get("skills") or []
+    if isinstance(skills, str):
+        skills = [skill.strip() for skill in skills.split(",") if skill.strip()]
+    try:
+        budget = float(job.get("budget") or 0)
+    except (TypeError, ValueError):
+        raise ValueError(f"Ungültiges Budget: {job.get('budget')!r}")
+    return {
+        "id": row_id,
+        "user_id": user_id,
+        "title": str(job["title"]),
+        "description": str(job.get("description") or ""),
+        "budget": budget,
+        "skills": list(skills),
+        "source": str(job.get("source") or job.get("platform") or "unknown"),
+        "status": str(job.get("status") or "new"),
+    }
+
+def prepare(jobs: List[Dict], user_id: str) -> Tuple[List[Tuple[int, Dict]], List[Dict]]:
+    """
+    (eindeutige Zeilen mit Index im Request, Ergebnisse für ungültige/doppelte Items).
+    Bei Duplikaten gewinnt das letzte Vorkommen (neuester Scrape), wie beim Upsert selbst.
+    """
+    results: List[Dict] = []
+    latest: Dict[str, Tuple[int, Dict]] = {}
+    for index, job in enumerate(jobs):
+        try:
+            row = job_row(job, user_id)
+        except (ValueError, TypeError, AttributeError) as e:
+            results.append({"index": index, "id": None, "status": "invalid", "error": str(e)})
+            continue
+        previous = latest.get(row["id"])
+        if previous is not None:
+            results.append({"index": previous[0], "id": row["id"], "status": "duplicate"})
+        latest[row["id"]] = (index, row)
+    return sorted(latest.values(), key=lambda item: item[0]), results
+
+def chunked(items: List, size: int) -> List[List]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+Post = Callable[[str, List[Dict]], Awaitable[Any]]
+
+def retry_after_of(error: Exception) -> Optional[float]:
+    """Retry-After aus SupabaseError.retry_after bzw. den Headern einer HTTPException"""
+    value = getattr(error, "retry_after", None)
+    if value is None:
+        value = (getattr(error, "headers", None) or {}).get("Retry-After")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+async def upsert_chunk(post: Post, chunk: List[Tuple[int, Dict]], path: str,
+                       rate_limit_retries: int = RATE_LIMIT_RETRIES, sleep=asyncio.sleep) -> List[Dict]:
+    attempt = 0
+    while True:
+        try:
+            await post(path, [row for _, row in chunk])
+            return [{"index": index, "id": row["id"], "status": "upserted"} for index, row in chunk]
+        except Exception as e:
+            status = getattr(e, "status_code", None)
+            if status in SPLIT_STATUSES and len(chunk) > 1:
+                middle = len(chunk) // 2
+                return (await upsert_chunk(post, chunk[:middle], path, rate_limit_retries, sleep) +
+                        await upsert_chunk(post, chunk[middle:], path, rate_limit_retries, sleep))
+            retry_after = retry_after_of(e)
+            if status == 429 and attempt < rate_limit_retries and (retry_after or 0) <= MAX_RETRY_AFTER:
+                attempt += 1
+                await sleep(retry_after if retry_after is not None else 2 ** attempt)
+                continue
+            detail = getattr(e, "detail", None) or str(e)
+            return [{"index": index, "id": row["id"], "status": "failed", "error": str(detail)[:500]}
+                    for index, row in chunk]
+
+async def ingest_jobs(post: Post, jobs: List[Dict], user_id: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                      concurrency: int = 4, rate_limit_retries: int = RATE_LIMIT_RETRIES,
+                      sleep=asyncio.sleep) -> Dict:
+    """post(path, rows) schickt einen Upsert an PostgREST und wirft bei Fehlern"""
+    rows, results = prepare(jobs, user_id)
+    path = f"{TABLE}?on_conflict={CONFLICT_COLUMNS}"
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(chunk):
+        async with semaphore:
+            return await upsert_chunk(post, chunk, path, rate_limit_retries, sleep)
+
+    for chunk_results in await asyncio.gather(*(run(chunk) for chunk in chunked(rows, chunk_size))):
+        results.extend(chunk_results)
+    results.sort(key=lambda item: item["index"])
+    counts = {status: 0 for status in ("upserted", "duplicate", "invalid", "failed")}
+    for item in results:
+        counts[item["status"]] += 1
+    return {"received": len(jobs), "unique": len(rows), **counts, "items": results}
+
+class IngestClient:
+    """
+    Synchroner Client für Scraper/automonet.py: schickt Jobs in Requests zu
+    je batch_size an POST /jobs/bulk über eine Keep-Alive-Verbindung.
+    """
+
+    def __init__(self, base_url: str, token: str, batch_size: int = 2000, timeout: float = 60.0):
+        parts = urlsplit(base_url)
+        self.base_path = parts.path.rstrip("/")
+        self.token = token
+        self.batch_size = min(batch_size, MAX_BULK_ITEMS)
+        self.pool = HostConnectionPool(parts.scheme, parts.netloc, 1, timeout)
+
+    @classmethod
+    def from_env(cls) -> Optional["IngestClient"]:
+        base_url, token = os.getenv("AUTOMONET_API_URL"), os.getenv("AUTOMONET_API_TOKEN")
+        if not base_url or not token:
+            return None
+        return cls(base_url, token)
+
+    def _post(self, jobs: List[Dict]) -> Dict:
+        body = json.dumps({"jobs": jobs}, ensure_ascii=False).encode("utf-8")
+        headers = {"Content-Type": "application/json", "Authorization": f"Bearer {self.token}"}
+        conn, _ = self.pool.acquire()
+        reusable = False
+        try:
+            conn.request("POST", f"{self.base_path}/jobs/bulk", body=body, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+            reusable = not response.will_close
+        finally:
+            self.pool.release(conn, reusable)
+        if response.status != 200:
+            raise RuntimeError(f"/jobs/bulk HTTP {response.status}: {data[:200]!r}")
+        return json.loads(data)
+
+    def ingest(self, jobs: List[Dict]) -> Dict:
+        """Summen über alle Requests; items mit Index relativ zur übergebenen Liste"""
+        summary = {"received": 0, "unique": 0, "upserted": 0, "duplicate": 0, "invalid": 0, "failed": 0,
+                   "items": []}
+        for offset in range(0, len(jobs), self.batch_size):
+            result = self._post(jobs[offset:offset + self.batch_size])
+            for key in summary:
+                if key != "items":
+                    summary[key] += result.get(key, 0)
+            summary["items"] += [{**item, "index": item["index"] + offset} for item in result.get("items", [])]
+        return summary
+
+    def close(self) -> None:
+        self.pool.close()
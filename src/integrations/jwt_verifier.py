@@ -0,0 +1,113 @@
+"""
+JWT-Prüfung für den API-Server mit:
+- Begrenztem LRU-Cache verifizierter Claims, Key = SHA-256 des Tokens
+- Ablauf jedes Cache-Eintrags am exp des Tokens (höchstens max_ttl)
+- Asymmetrischen Schlüsseln aus einer lokalen JWKS-Datei (einmal beim Start geladen, Auswahl per kid)
+- HS256 mit dem Supabase-Secret als Fallback für Tokens ohne bekannten kid
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import jwt
+
+logger = logging.getLogger('jwt-verifier')
+
+def bearer_token(authorization: Optional[str]) -> Optional[str]:
+    """'Bearer <token>' -> token; None bei fehlendem oder anderem Schema"""
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    token = token.strip()
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return token
+
+class JWTVerifier:
+    """
+    verify() kostet bei einem Cache-Hit einen Hash und einen Dict-Zugriff statt
+    Base64-Dekodierung, JSON-Parsing und Signaturprüfung. Ungültige Tokens
+    werden nie gecacht. Gecachte Claims sind geteilt und dürfen nicht verändert werden.
+    """
+
+    def __init__(self, secret: Optional[str] = None, algorithms: Iterable[str] = ("HS256",),
+                 jwks_path: Optional[str] = None, audience: Optional[str] = None,
+                 issuer: Optional[str] = None, max_entries: int = 10_000, max_ttl: float = 3600.0,
+                 leeway: float = 0.0, clock=time.time):
+        self.secret = secret
+        self.algorithms = list(algorithms)
+        self.audience = audience
+        self.issuer = issuer
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self.leeway = leeway
+        self.clock = clock
+        self.keys: Dict[str, jwt.PyJWK] = {}
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._cache: "OrderedDict[bytes, Tuple[Dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        if jwks_path:
+            self.load_jwks(jwks_path)
+
+    def load_jwks(self, path: str) -> int:
+        """Schlüssel aus einer JWKS-Datei laden; nicht nutzbare Einträge werden übersprungen"""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for entry in data.get("keys", []):
+            try:
+                key = jwt.PyJWK(entry)
+            except (jwt.PyJWKError, jwt.InvalidKeyError) as e:
+                # Reason: RSA/EC-Schlüssel brauchen das optionale cryptography-Paket
+                logger.warning(f"Skipping JWK {entry.get('kid')}: {e}")
+                continue
+            if key.key_id:
+                self.keys[key.key_id] = key
+        return len(self.keys)
+
+    def _key_for(self, token: str) -> Tuple[object, List[str]]:
+        kid = jwt.get_unverified_header(token).get("kid")
+        if kid is not None and kid in self.keys:
+            jwk = self.keys[kid]
+            return jwk.key, [jwk.algorithm_name]
+        if self.secret:
+            return self.secret, self.algorithms
+        raise jwt.InvalidTokenError(f"Unknown key id: {kid}")
+
+    def decode(self, token: str) -> Dict:
+        """Vollständige Prüfung ohne Cache"""
+        key, algorithms = self._key_for(token)
+        return jwt.decode(token, key, algorithms=algorithms, audience=self.audience, issuer=self.issuer,
+                          leeway=self.leeway, options={"verify_aud": self.audience is not None})
+
+    def verify(self, token: str) -> Dict:
+        """Claims eines gültigen Tokens; wirft jwt.InvalidTokenError"""
+        digest = hashlib.sha256(token.encode("utf-8")).digest()
+        now = self.clock()
+        with self._lock:
+            entry = self._cache.get(digest)
+            if entry is not None:
+                if entry[1] > now:
+                    self._cache.move_to_end(digest)
+                    self.stats["hits"] += 1
+                    return entry[0]
+                del self._cache[digest]
+            self.stats["misses"] += 1
+
+        claims = self.decode(token)
+        expires_at = now + self.max_ttl
+        if claims.get("exp") is not None:
+            expires_at = min(expires_at, float(claims["exp"]))
+        with self._lock:
+            self._cache[digest] = (claims, expires_at)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+                self.stats["evictions"] += 1
+        return claims
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
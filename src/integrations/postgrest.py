@@ -0,0 +1,75 @@
+"""
+PostgREST-Queries für Listen-Endpunkte mit:
+- Keyset-Pagination über id (Cursor statt OFFSET, konstante Kosten pro Seite)
+- Feld-Projektion (select=) aus einer Whitelist, damit große Spalten wie HTML-Beschreibungen wegfallen können
+- Seiten-Iterator für gestreamte Exporte mit begrenztem Speicher
+"""
+import base64
+import re
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+MAX_PAGE_SIZE = 1000
+# Seitengröße, wenn nur ein Cursor (after) ohne limit kommt
+DEFAULT_PAGE_SIZE = 100
+EXPORT_PAGE_SIZE = 500
+_CURSOR_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+def encode_cursor(last_id: Any) -> str:
+    return base64.urlsafe_b64encode(str(last_id).encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> str:
+    if not _CURSOR_RE.match(cursor):
+        raise ValueError("Ungültiger Cursor")
+    try:
+        return base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+    except ValueError:
+        raise ValueError("Ungültiger Cursor")
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str], key: str = "id") -> List[str]:
+    """'title,budget' -> ['id', 'title', 'budget']; der Keyset-Schlüssel ist immer dabei"""
+    allowed = list(allowed)
+    if not fields:
+        return allowed
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        raise ValueError(f"Unbekannte Felder: {', '.join(unknown)}")
+    return [key] + [field for field in requested if field != key]
+
+def list_query(table: str, filters: Dict[str, str], fields: List[str], limit: Optional[int],
+               after: Optional[str] = None, key: str = "id") -> str:
+    """
+    Pfad für eine Seite: aufsteigend nach key, nur Zeilen nach dem Cursor.
+    Fragt limit + 1 Zeilen an, damit ohne zweiten Request feststeht, ob es weitergeht;
+    limit=None liefert alle Zeilen.
+    """
+    params = [f"{column}={quote(value, safe='.')}" for column, value in filters.items()]
+    params.append(f"select={','.join(fields)}")
+    params.append(f"order={key}.asc")
+    if limit is not None:
+        params.append(f"limit={limit + 1}")
+    if after is not None:
+        params.append(f"{key}=gt.{quote(after, safe='')}")
+    return f"{table}?{'&'.join(params)}"
+
+def split_page(rows: List[Dict], limit: Optional[int], key: str = "id") -> Tuple[List[Dict], Optional[str]]:
+    """(Zeilen der Seite, Cursor der nächsten Seite oder None)"""
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(page[-1][key])
+
+async def iterate_pages(fetch: Callable[[str], Awaitable[List[Dict]]], table: str, filters: Dict[str, str],
+                        fields: List[str], after: Optional[str] = None, page_size: Optional[int] = None,
+                        key: str = "id") -> AsyncIterator[List[Dict]]:
+    """Alle Seiten nacheinander; im Speicher liegt immer nur eine"""
+    page_size = page_size or EXPORT_PAGE_SIZE
+    while True:
+        rows = await fetch(list_query(table, filters, fields, page_size, after, key))
+        page, cursor = split_page(rows, page_size, key)
+        if page:
+            yield page
+        if cursor is None:
+            return
+        after = str(page[-1][key])
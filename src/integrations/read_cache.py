@@ -0,0 +1,136 @@
+"""
+Read-Through-Cache für Dashboard-Reads im API-Server mit:
+- Einträgen pro Nutzer und Route mit eigener TTL
+- Stabilem ETag pro Eintrag (If-None-Match -> 304 ohne Body)
+- Invalidierung bei Schreibzugriffen des Nutzers (Generationszähler gegen veraltete In-Flight-Fetches)
+- Stampede-Schutz: gleichzeitige Misses auf denselben Key teilen sich einen Upstream-Fetch
+"""
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Sekunden; Settings ändern sich selten und werden beim Schreiben ohnehin invalidiert
+DEFAULT_TTLS = {"jobs": 30.0, "proposals": 15.0, "settings": 300.0, "analytics": 120.0}
+
+def etag_for(value: Any) -> str:
+    body = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match kann mehrere (auch schwache W/) ETags oder * enthalten"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+@dataclass
+class CachedValue:
+    value: Any
+    etag: str
+    fetched_at: float
+    expires_at: float
+
+@dataclass
+class ReadCacheStats:
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    invalidations: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses + self.coalesced
+        return (self.hits + self.coalesced) / lookups if lookups else 0.0
+
+Key = Tuple[str, str, str]   # (user_id, route, upstream path)
+
+class ReadThroughCache:
+    """
+    Prozesslokal (ein Event-Loop): mehrere Uvicorn-Worker haben je einen
+    eigenen Cache, fremde Schreibzugriffe werden dort erst nach Ablauf der
+    TTL sichtbar.
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, default_ttl: float = 30.0,
+                 max_entries: int = 10_000):
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.stats = ReadCacheStats()
+        self._entries: "OrderedDict[Key, CachedValue]" = OrderedDict()
+        self._inflight: Dict[Key, asyncio.Future] = {}
+        self._generations: Dict[Tuple[str, str], int] = {}
+
+    async def get_or_fetch(self, user_id: str, route: str, path: str,
+                           fetch: Callable[[], Awaitable[Any]]) -> CachedValue:
+        key = (user_id, route, path)
+        entry = self._entries.get(key)
+        now = time.time()
+        if entry is not None and entry.expires_at > now:
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats.coalesced += 1
+            return await asyncio.shield(future)
+
+        self.stats.misses += 1
+        # Reason: eigener Task, damit ein abbrechender Client den gemeinsamen Fetch nicht cancelt
+        future = asyncio.ensure_future(self._fetch(key, fetch))
+        self._inflight[key] = future
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Key, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    async def _fetch(self, key: Key, fetch: Callable[[], Awaitable[Any]]) -> CachedValue:
+        user_id, route, _ = key
+        generation = self._generations.get((user_id, route), 0)
+        value = await fetch()
+        now = time.time()
+        entry = CachedValue(value, etag_for(value), now, now + self.ttls.get(route, self.default_ttl))
+        # Während des Fetches invalidiert: Ergebnis ausliefern, aber nicht cachen
+        if self._generations.get((user_id, route), 0) == generation:
+            self._store(key, entry)
+        return entry
+
+    def _store(self, key: Key, entry: CachedValue) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def invalidate(self, user_id: str, *routes: str) -> None:
+        """Einträge des Nutzers für die Routen verwerfen (nach create_proposal / update_settings)"""
+        for route in routes:
+            self._generations[(user_id, route)] = self._generations.get((user_id, route), 0) + 1
+        stale = [key for key in self._entries if key[0] == user_id and key[1] in routes]
+        for key in stale:
+            del self._entries[key]
+        # Laufende Fetches stammen von vor dem Schreiben: neue Leser sollen nicht mehr darauf warten
+        for key in [key for key in self._inflight if key[0] == user_id and key[1] in routes]:
+            del self._inflight[key]
+        self.stats.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            "size": len(self._entries),
+            "hits": self.stats.hits,
+            "misses": self.stats.misses,
+            "coalesced": self.stats.coalesced,
+            "invalidations": self.stats.invalidations,
+            "evictions": self.stats.evictions,
+            "hit_rate": self.stats.hit_rate
+        }
@@ -0,0 +1,195 @@
+"""
+Geteilter async Supabase-REST-Client für den API-Server mit:
+- Einem httpx.AsyncClient für die ganze App-Laufzeit (Keep-Alive statt Handshake pro Request)
+- HTTP/2, wenn das h2-Paket installiert ist, sonst HTTP/1.1 mit Keep-Alive-Pool
+- Timeouts pro (Methode, Route), z.B. kürzer für Dashboard-Polling, länger für Bulk-Upserts
+- Circuit Breaker pro Route: nach wiederholten Fehlern sofort abweisen statt zu warten
+"""
+import importlib.util
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple, Union
+
+import httpx
+
+@dataclass
+class PoolLimits:
+    max_connections: int = 50
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+
+# Schlüssel (Methode, Route) oder nur Route für alle Methoden
+RouteTimeouts = Dict[Union[str, Tuple[str, str]], httpx.Timeout]
+
+# Reason: Polling-Routen sollen schnell scheitern, Schreibzugriffe (Bulk-Upserts bis
+# MAX_BULK_ITEMS Zeilen) dürfen länger dauern und fallen sonst auf DEFAULT_TIMEOUT
+DEFAULT_ROUTE_TIMEOUTS: RouteTimeouts = {
+    ("GET", "job_opportunities"): httpx.Timeout(5.0, connect=2.0),
+    ("GET", "proposals"): httpx.Timeout(8.0, connect=2.0),
+    ("GET", "user_settings"): httpx.Timeout(5.0, connect=2.0),
+    ("GET", "earnings_forecast"): httpx.Timeout(10.0, connect=2.0),
+    ("POST", "job_opportunities"): httpx.Timeout(30.0, connect=2.0),
+}
+DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+
+class SupabaseError(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: Optional[float] = None):
+        super().__init__(f"Supabase HTTP {status_code}: {detail[:200]}")
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After in Sekunden (HTTP-Datum wird nicht unterstützt -> None)"""
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+class CircuitOpenError(Exception):
+    def __init__(self, route: str, retry_after: float):
+        super().__init__(f"Circuit for {route} open, retry in {retry_after:.1f}s")
+        self.route = route
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """
+    closed -> open nach failure_threshold Fehlern in Folge; nach reset_timeout
+    lässt half-open genau einen Probe-Request durch. Erfolg schließt wieder,
+    Fehler öffnet erneut. Nur Serverfehler/Timeouts zählen, 4xx nicht.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def before_request(self, route: str) -> None:
+        if self.state == "closed":
+            return
+        elapsed = self.clock() - self.opened_at
+        if self.state == "open" and elapsed >= self.reset_timeout:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probing:
+            self._probing = True
+            return
+        raise CircuitOpenError(route, max(0.0, self.reset_timeout - elapsed))
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def abort(self) -> None:
+        """Probe ohne Ergebnis (z.B. Client-Abbruch): nächster Request darf erneut proben"""
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = self.clock()
+
+def http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+def route_of(path: str) -> str:
+    """'job_opportunities?user_id=eq.1' -> 'job_opportunities'"""
+    return path.split("?", 1)[0].strip("/").split("/", 1)[0]
+
+class SupabaseClient:
+    """
+    start() im Lifespan des API-Servers, close() beim Shutdown. request()
+    ist sicher für parallele Aufrufe aus vielen Handlern: httpx verteilt sie
+    auf den Verbindungspool (bzw. Streams einer HTTP/2-Verbindung).
+    """
+
+    def __init__(self, base_url: str, api_key: Optional[str], limits: Optional[PoolLimits] = None,
+                 route_timeouts: Optional[RouteTimeouts] = None,
+                 default_timeout: httpx.Timeout = DEFAULT_TIMEOUT, http2: Optional[bool] = None,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base_url = (base_url or "").rstrip("/")
+        self.api_key = api_key
+        self.limits = limits or PoolLimits()
+        self.route_timeouts = DEFAULT_ROUTE_TIMEOUTS if route_timeouts is None else route_timeouts
+        self.default_timeout = default_timeout
+        self.http2 = http2_available() if http2 is None else http2
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.transport = transport
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def from_env(cls, **kwargs) -> "SupabaseClient":
+        return cls(os.getenv("VITE_SUPABASE_URL"), os.getenv("VITE_SUPABASE_ANON_KEY"), **kwargs)
+
+    async def start(self) -> None:
+        if self.client is not None:
+            return
+        self.client = httpx.AsyncClient(
+            base_url=f"{self.base_url}/rest/v1/",
+            http2=self.http2,
+            limits=httpx.Limits(max_connections=self.limits.max_connections,
+                                max_keepalive_connections=self.limits.max_keepalive_connections,
+                                keepalive_expiry=self.limits.keepalive_expiry),
+            timeout=self.default_timeout,
+            transport=self.transport,
+            headers={"apikey": self.api_key or "", "Content-Type": "application/json"}
+        )
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def timeout_for(self, method: str, route: str) -> httpx.Timeout:
+        """(Methode, Route) vor Route vor default_timeout"""
+        timeout = self.route_timeouts.get((method.upper(), route))
+        if timeout is None:
+            timeout = self.route_timeouts.get(route, self.default_timeout)
+        return timeout
+
+    def breaker(self, route: str) -> CircuitBreaker:
+        if route not in self.breakers:
+            self.breakers[route] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return self.breakers[route]
+
+    async def request(self, method: str, path: str, token: Optional[str],
+                      headers: Optional[Dict[str, str]] = None, **kwargs) -> httpx.Response:
+        """Roh-Response (für Header wie ETag/Content-Range); wirft SupabaseError ab Status 400"""
+        if self.client is None:
+            await self.start()
+        route = route_of(path)
+        breaker = self.breaker(route)
+        breaker.before_request(route)
+        request_headers = {"Authorization": f"Bearer {token}", "Prefer": "return=representation"}
+        request_headers.update(headers or {})
+        try:
+            resp = await self.client.request(method, path, headers=request_headers,
+                                             timeout=self.timeout_for(method, route),
+                                             **kwargs)
+        except httpx.TransportError:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            breaker.abort()
+            raise
+        if resp.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        if resp.status_code >= 400:
+            raise SupabaseError(resp.status_code, resp.text, parse_retry_after(resp.headers.get("Retry-After")))
+        return resp
+
+    async def json(self, method: str, path: str, token: Optional[str], **kwargs) -> Any:
+        resp = await self.request(method, path, token, **kwargs)
+        return resp.json() if resp.content else None
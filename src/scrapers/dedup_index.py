@@ -0,0 +1,178 @@
+"""
+Persistenter Dedup-Index für gescrapte Jobs mit:
+- Normalisierter URL + Titel-Fingerprint (pro Firma/Plattform) als Schlüssel
+- SQLite als kompaktem On-Disk Seen-Set
+- Optionalem Bloom-Filter als Vorabprüfung
+- TTL, damit alte Einträge auslaufen
+"""
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_DEDUP_PATH = os.path.join("data", "cache", "seen_jobs.sqlite3")
+
+# Query-Parameter, die nur Tracking sind und denselben Job unter neuer URL zeigen
+TRACKING_PARAMS = {"ref", "from", "vjk", "tk", "advn", "adid", "sjdu", "utm_source",
+                   "utm_medium", "utm_campaign", "utm_term", "utm_content", "context"}
+
+_TITLE_NOISE = re.compile(r"[^a-z0-9]+")
+
+def normalize_url(url: str) -> str:
+  """Schema/Host klein, ohne Fragment, Tracking-Parameter und Slash am Ende"""
+  parts = urlsplit(url.strip())
+  query = sorted(
+    (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+    if k.lower() not in TRACKING_PARAMS
+  )
+  netloc = parts.netloc.lower()
+  if netloc.startswith("www."):
+    netloc = netloc[4:]
+  path = parts.path.rstrip("/") or "/"
+  return urlunsplit((parts.scheme.lower() or "https", netloc, path, urlencode(query), ""))
+
+def title_fingerprint(title: str) -> str:
+  """Reihenfolge- und Satzzeichen-unabhängiger Titel-Fingerprint"""
+  tokens = sorted(set(t for t in _TITLE_NOISE.split(title.lower()) if t))
+  return " ".join(tokens)
+
+def title_scope(job: Dict) -> str:
+  """
+  Firma und Plattform, unter denen ein Titel eindeutig sein muss: gleiche
+  Titel verschiedener Firmen oder Seiten ("Python Developer") sind verschiedene Jobs.
+  """
+  company = " ".join((job.get("company") or "").lower().split())
+  platform = job.get("platform") or urlsplit(job.get("url") or "").netloc or job.get("source") or ""
+  platform = platform.lower()
+  if platform.startswith("www."):
+    platform = platform[4:]
+  return f"{company}|{platform}"
+
+def _digest(value: str) -> bytes:
+  return hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+
+def job_keys(job: Dict) -> Tuple[Optional[bytes], Optional[bytes]]:
+  """(url_key, title_key) als 16-Byte Hashes; None wenn Feld fehlt"""
+  url = job.get("url") or ""
+  title = title_fingerprint(job.get("title") or "")
+  return (_digest(normalize_url(url)) if url else None,
+          _digest(f"{title_scope(job)}\n{title}") if title else None)
+
+class BloomFilter:
+  """Einfacher Bloom-Filter mit Double Hashing über einen 16-Byte Key"""
+
+  def __init__(self, capacity: int = 100_000, error_rate: float = 0.01):
+    self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+    self.hashes = max(1, round(self.size / capacity * math.log(2)))
+    self.bits = bytearray((self.size + 7) // 8)
+
+  def _positions(self, key: bytes) -> Iterable[int]:
+    h1 = int.from_bytes(key[:8], "little")
+    h2 = int.from_bytes(key[8:], "little") | 1
+    return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+  def add(self, key: bytes) -> None:
+    for pos in self._positions(key):
+      self.bits[pos >> 3] |= 1 << (pos & 7)
+
+  def __contains__(self, key: bytes) -> bool:
+    return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+class JobDedupIndex:
+  """
+  Merkt sich verarbeitete Jobs über Zyklen hinweg. filter_new() vor der
+  Analyse, mark_seen() danach -- ein Absturz dazwischen verliert keine Jobs.
+  """
+  KIND_URL = 0
+  KIND_TITLE = 1
+
+  def __init__(self, path: str = DEFAULT_DEDUP_PATH, ttl_days: float = 30,
+               use_bloom: bool = True, match_titles: bool = True):
+    self.path = path
+    self.ttl = ttl_days * 86400
+    self.match_titles = match_titles
+    directory = os.path.dirname(path)
+    if directory:
+      os.makedirs(directory, exist_ok=True)
+    self.conn = sqlite3.connect(path)
+    self.conn.execute("PRAGMA journal_mode=WAL")
+    self.conn.execute(
+      "CREATE TABLE IF NOT EXISTS seen ("
+      " key BLOB PRIMARY KEY, kind INTEGER NOT NULL, seen_at REAL NOT NULL"
+      ") WITHOUT ROWID"
+    )
+    self.conn.commit()
+    self.bloom: Optional[BloomFilter] = None
+    self.prune()
+    if use_bloom:
+      self._rebuild_bloom()
+
+  def close(self) -> None:
+    self.conn.close()
+
+  def _rebuild_bloom(self) -> None:
+    count = self.conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+    self.bloom = BloomFilter(capacity=max(10_000, count * 2))
+    for (key,) in self.conn.execute("SELECT key FROM seen"):
+      self.bloom.add(key)
+
+  def prune(self, now: Optional[float] = None) -> int:
+    """Lösche Einträge älter als die TTL"""
+    cutoff = (now or time.time()) - self.ttl
+    removed = self.conn.execute("DELETE FROM seen WHERE seen_at < ?", (cutoff,)).rowcount
+    self.conn.commit()
+    if removed and self.bloom is not None:
+      # Reason: Bloom-Filter können nicht löschen, also neu aufbauen
+      self._rebuild_bloom()
+    return removed
+
+  def _is_known(self, key: Optional[bytes], cutoff: float) -> bool:
+    if key is None:
+      return False
+    if self.bloom is not None and key not in self.bloom:
+      return False
+    row = self.conn.execute("SELECT 1 FROM seen WHERE key = ? AND seen_at >= ?", (key, cutoff)).fetchone()
+    return row is not None
+
+  def is_seen(self, job: Dict) -> bool:
+    url_key, title_key = job_keys(job)
+    cutoff = time.time() - self.ttl
+    return self._is_known(url_key, cutoff) or (self.match_titles and self._is_known(title_key, cutoff))
+
+  def filter_new(self, jobs: Iterable[Dict]) -> List[Dict]:
+    """Nur noch nicht gesehene Jobs, zusätzlich innerhalb des Batches dedupliziert"""
+    cutoff = time.time() - self.ttl
+    batch_keys = set()
+    fresh = []
+    for job in jobs:
+      url_key, title_key = job_keys(job)
+      keys = [k for k in (url_key, title_key if self.match_titles else None) if k is not None]
+      if not keys or any(k in batch_keys for k in keys):
+        continue
+      if any(self._is_known(k, cutoff) for k in keys):
+        continue
+      batch_keys.update(keys)
+      fresh.append(job)
+    return fresh
+
+  def mark_seen(self, jobs: Iterable[Dict], now: Optional[float] = None) -> None:
+    now = now or time.time()
+    rows = []
+    for job in jobs:
+      url_key, title_key = job_keys(job)
+      if url_key is not None:
+        rows.append((url_key, self.KIND_URL, now))
+      if title_key is not None:
+        rows.append((title_key, self.KIND_TITLE, now))
+    self.conn.executemany("INSERT OR REPLACE INTO seen (key, kind, seen_at) VALUES (?, ?, ?)", rows)
+    self.conn.commit()
+    if self.bloom is not None:
+      for key, _, _ in rows:
+        self.bloom.add(key)
+
+  def __len__(self) -> int:
+    return self.conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
@@ -0,0 +1,280 @@
+"""
+Asynchrone Fetch-Engine für die Free-Scraper mit:
+- Begrenzter Parallelität pro Host
+- Keep-Alive Connection Pools
+- Timeouts pro Request
+- Retries mit Jitter-Backoff
+"""
+import asyncio
+import http.client
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from src.utils.http_pool import STALE_CONNECTION_ERRORS, HostConnectionPool
+
+DEFAULT_HEADERS = {
+  "User-Agent": "Mozilla/5.0 (compatible; AutoMonet/0.3)",
+  "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+  "Accept-Encoding": "identity",
+  "Connection": "keep-alive"
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+MAX_REDIRECTS = 5
+
+@dataclass
+class FetchConfig:
+  per_host_limit: int = 4
+  total_limit: int = 32
+  timeout: float = 10.0
+  retries: int = 2
+  backoff_base: float = 0.5
+  backoff_max: float = 8.0
+
+@dataclass
+class FetchResult:
+  url: str
+  status: int = 0
+  body: bytes = b""
+  headers: Dict[str, str] = field(default_factory=dict)
+  error: Optional[str] = None
+  attempts: int = 0
+  elapsed: float = 0.0
+
+  @property
+  def ok(self) -> bool:
+    return self.error is None and self.status == 200
+
+  def text(self) -> str:
+    """Dekodiere den Body anhand des Content-Type Charsets (Fallback UTF-8)"""
+    try:
+      return self.body.decode(charset_from_headers(self.headers), errors="replace")
+    except LookupError:  # unbekanntes Charset, z.B. charset=x-bogus
+      return self.body.decode("utf-8", errors="replace")
+
+def charset_from_headers(headers: Dict[str, str]) -> str:
+  content_type = headers.get("content-type", "")
+  for part in content_type.split(";")[1:]:
+    key, _, value = part.strip().partition("=")
+    if key.lower() == "charset" and value:
+      return value.strip('"\' ').lower()
+  return "utf-8"
+
+class AsyncFetchEngine:
+  """
+  Lädt viele URLs gleichzeitig. Die blockierenden http.client-Aufrufe laufen
+  im Thread-Pool, das Scheduling (Limits, Backoff) im Event Loop.
+  """
+
+  def __init__(self, config: Optional[FetchConfig] = None):
+    self.config = config or FetchConfig()
+    self._pools: Dict[Tuple[str, str], HostConnectionPool] = {}
+    self._host_limits: Dict[str, asyncio.Semaphore] = {}
+    self._pools_lock = threading.Lock()
+    self._executor = ThreadPoolExecutor(
+      max_workers=self.config.total_limit,
+      thread_name_prefix="automonet-fetch"
+    )
+
+  async def __aenter__(self) -> "AsyncFetchEngine":
+    return self
+
+  async def __aexit__(self, *exc) -> None:
+    self.close()
+
+  def close(self) -> None:
+    self._executor.shutdown(wait=False)
+    with self._pools_lock:
+      pools, self._pools = list(self._pools.values()), {}
+    for pool in pools:
+      pool.close()
+
+  async def fetch_all(self, urls: List[str], headers: Optional[Dict[str, str]] = None) -> List[FetchResult]:
+    """Lade alle URLs parallel, Ergebnisse in Eingabereihenfolge"""
+    return await asyncio.gather(*(self.fetch(url, headers) for url in urls))
+
+  async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> FetchResult:
+    """Lade eine URL mit Host-Limit, Timeout und Retries. Wirft nie."""
+    loop = asyncio.get_running_loop()
+    started = time.monotonic()
+    result = FetchResult(url=url, error="not attempted")
+    for attempt in range(self.config.retries + 1):
+      async with self._host_limit(url):
+        result = await loop.run_in_executor(self._executor, self._request_blocking, url, headers or {})
+      result.attempts = attempt + 1
+      if not self._should_retry(result) or attempt == self.config.retries:
+        break
+      await asyncio.sleep(self._backoff_delay(attempt, result))
+    result.elapsed = time.monotonic() - started
+    return result
+
+  def _host_limit(self, url: str) -> asyncio.Semaphore:
+    host = urlsplit(url).netloc
+    if host not in self._host_limits:
+      self._host_limits[host] = asyncio.Semaphore(self.config.per_host_limit)
+    return self._host_limits[host]
+
+  def _should_retry(self, result: FetchResult) -> bool:
+    return result.error is not None or result.status in RETRY_STATUSES
+
+  def _backoff_delay(self, attempt: int, result: FetchResult) -> float:
+    # Reason: "Full Jitter" verhindert, dass alle Retries eines Hosts synchron
+    # wieder einschlagen; Retry-After des Servers hat Vorrang.
+    retry_after = result.headers.get("retry-after", "")
+    if retry_after.isdigit():
+      return min(float(retry_after), self.config.backoff_max)
+    ceiling = min(self.config.backoff_max, self.config.backoff_base * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+  def _pool_for(self, scheme: str, netloc: str) -> HostConnectionPool:
+    key = (scheme, netloc)
+    with self._pools_lock:
+      pool = self._pools.get(key)
+      if pool is None:
+        pool = HostConnectionPool(scheme, netloc, self.config.per_host_limit, self.config.timeout)
+        self._pools[key] = pool
+      return pool
+
+  def _request_blocking(self, url: str, headers: Dict[str, str]) -> FetchResult:
+    """Ein HTTP GET inkl. Redirects (läuft im Worker-Thread)"""
+    current = url
+    try:
+      for _ in range(MAX_REDIRECTS + 1):
+        status, resp_headers, body = self._get_once(current, headers)
+        location = resp_headers.get("location")
+        if status in REDIRECT_STATUSES and location:
+          current = urljoin(current, location)
+          continue
+        return FetchResult(url=url, status=status, body=body, headers=resp_headers)
+      return FetchResult(url=url, status=status, headers=resp_headers, error="too many redirects")
+    except Exception as e:
+      return FetchResult(url=url, error=f"{type(e).__name__}: {e}")
+
+  def _get_once(self, url: str, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+    pool, conn, response = self._send(url, headers)
+    try:
+      body = response.read()
+    except Exception:
+      conn.close()
+      raise
+    resp_headers = {k.lower(): v for k, v in response.getheaders()}
+    pool.release(conn, reusable=not response.will_close)
+    return response.status, resp_headers, body
+
+  def _send(self, url: str, headers: Dict[str, str]):
+    """Sende GET und liefere (pool, conn, response) mit ungelesenem Body"""
+    parts = urlsplit(url)
+    pool = self._pool_for(parts.scheme, parts.netloc)
+    path = parts.path or "/"
+    if parts.query:
+      path += "?" + parts.query
+    request_headers = {**DEFAULT_HEADERS, **headers}
+
+    conn, reused = pool.acquire()
+    try:
+      try:
+        conn.request("GET", path, headers=request_headers)
+        response = conn.getresponse()
+      except STALE_CONNECTION_ERRORS:
+        if not reused:
+          raise
+        # Keep-Alive-Verbindung wurde serverseitig geschlossen: einmal frisch verbinden
+        conn = pool.reconnect(conn)
+        conn.request("GET", path, headers=request_headers)
+        response = conn.getresponse()
+    except Exception:
+      conn.close()
+      raise
+    return pool, conn, response
+
+  @asynccontextmanager
+  async def stream(self, url: str, headers: Optional[Dict[str, str]] = None) -> AsyncIterator["StreamResponse"]:
+    """
+    Öffne eine URL im Streaming-Modus. Retries gibt es nur bis zum Eintreffen
+    des Status, danach werden die Chunks direkt vom Socket gelesen.
+    """
+    loop = asyncio.get_running_loop()
+    limit = self._host_limit(url)
+    for attempt in range(self.config.retries + 1):
+      await limit.acquire()
+      try:
+        stream = await loop.run_in_executor(self._executor, self._open_stream_blocking, url, headers or {})
+      except Exception as e:
+        limit.release()
+        if attempt == self.config.retries:
+          raise FetchError(f"{type(e).__name__}: {e}") from e
+        await asyncio.sleep(self._backoff_delay(attempt, FetchResult(url=url)))
+        continue
+      if stream.status not in RETRY_STATUSES or attempt == self.config.retries:
+        break
+      await loop.run_in_executor(self._executor, stream.discard)
+      limit.release()
+      await asyncio.sleep(self._backoff_delay(attempt, FetchResult(url=url, headers=stream.headers)))
+
+    stream._executor = self._executor
+    try:
+      yield stream
+    finally:
+      stream.close()
+      limit.release()
+
+  def _open_stream_blocking(self, url: str, headers: Dict[str, str]) -> "StreamResponse":
+    current = url
+    for _ in range(MAX_REDIRECTS + 1):
+      pool, conn, response = self._send(current, headers)
+      resp_headers = {k.lower(): v for k, v in response.getheaders()}
+      location = resp_headers.get("location")
+      stream = StreamResponse(url, response.status, resp_headers, pool, conn, response)
+      if response.status in REDIRECT_STATUSES and location:
+        stream.discard()
+        current = urljoin(current, location)
+        continue
+      return stream
+    raise FetchError("too many redirects")
+
+class FetchError(Exception):
+  pass
+
+class StreamResponse:
+  """Offene Antwort, deren Body chunkweise vom Socket gelesen wird"""
+
+  def __init__(self, url: str, status: int, headers: Dict[str, str], pool: HostConnectionPool,
+               conn: http.client.HTTPConnection, response: http.client.HTTPResponse):
+    self.url = url
+    self.status = status
+    self.headers = headers
+    self._pool = pool
+    self._conn = conn
+    self._response = response
+    self._executor = None
+    self._finished = False
+
+  async def iter_chunks(self, chunk_size: int = 16 * 1024) -> AsyncIterator[bytes]:
+    loop = asyncio.get_running_loop()
+    while True:
+      chunk = await loop.run_in_executor(self._executor, self._response.read1, chunk_size)
+      if not chunk:
+        self._finished = True
+        return
+      yield chunk
+
+  def discard(self) -> None:
+    """Body verwerfen (blockierend), damit die Verbindung wiederverwendbar bleibt"""
+    self._response.read()
+    self._finished = True
+    self.close()
+
+  def close(self) -> None:
+    if self._conn is None:
+      return
+    # Nur vollständig gelesene Antworten geben die Verbindung an den Pool zurück
+    reusable = self._finished and not self._response.will_close
+    self._pool.release(self._conn, reusable=reusable)
+    self._conn = None
@@ -1,12 +1,27 @@
-import urllib.request
+import asyncio
+import codecs
+import hashlib
 from html.parser import HTMLParser
+from typing import AsyncIterator, Dict, List, Optional
+from urllib.parse import urlsplit
+from xml.etree import ElementTree
+from .fetch_engine import AsyncFetchEngine, FetchConfig, charset_from_headers
+from .http_cache import HttpCache
 
 SOURCES = [
   {"url": "https://www.reddit.com/r/forhire/new/", "parser": "reddit"},
   {"url": "https://www.indeed.com/jobs?q=remote&fromage=1", "parser": "indeed"}
 ]
 
-class RedditLinkParser(HTMLParser):
+STREAM_CHUNK_SIZE = 16 * 1024
+
+class LinkParser(HTMLParser):
+  """
+  Basis für die Link-Parser. Kann inkrementell gefüttert werden: drain()
+  liefert die seit dem letzten Aufruf gefundenen Links und gibt sie frei.
+  """
+  url_prefix = ""
+
   def __init__(self):
     super().__init__()
     self.links = []
@@ -14,12 +29,16 @@ class RedditLinkParser(HTMLParser):
     self.collect_data = False
     self.current_data = []
 
+  def match_link(self, attrs) -> Optional[str]:
+    """href des <a>-Tags, falls es ein Job-Link ist"""
+    raise NotImplementedError
+
   def handle_starttag(self, tag, attrs):
     if tag == "a":
-      attr_dict = dict(attrs)
-      if attr_dict.get("data-click-id") == "body":
+      href = self.match_link(attrs)
+      if href is not None:
         self.collect_data = True
-        self.current_link = attr_dict.get("href", "")
+        self.current_link = href
 
   def handle_data(self, data):
     if self.collect_data:
@@ -28,58 +47,206 @@ class RedditLinkParser(HTMLParser):
   def handle_endtag(self, tag):
     if tag == "a" and self.collect_data:
       text = "".join(self.current_data).strip()
-      self.links.append({"title": text, "url": self.current_link})
+      self.links.append({"title": text, "url": self.url_prefix + self.current_link})
       self.collect_data = False
       self.current_data = []
       self.current_link = None
 
-class IndeedLinkParser(HTMLParser):
+  def drain(self) -> List[Dict]:
+    links, self.links = self.links, []
+    return links
+
+class RedditLinkParser(LinkParser):
+  def match_link(self, attrs):
+    # Reason: attrs linear scannen statt dict(attrs) pro <a>-Tag zu bauen
+    href, is_job = "", False
+    for name, value in attrs:
+      if name == "data-click-id":
+        is_job = value == "body"
+      elif name == "href":
+        href = value or ""
+    return href if is_job else None
+
+class IndeedLinkParser(LinkParser):
+  # Ergänze die indeed-URL als Prefix
+  url_prefix = "https://indeed.com"
+
+  def match_link(self, attrs):
+    href, is_job = "", False
+    for name, value in attrs:
+      if name == "class":
+        is_job = value is not None and "jcs-JobTitle" in value
+      elif name == "href":
+        href = value or ""
+    return href if is_job else None
+
+class RssJobParser:
+  """
+  Inkrementeller RSS-Parser (z.B. WeWorkRemotely). Gleiche Schnittstelle wie
+  LinkParser: feed(), drain(), close(). Kaputte Feeds liefern, was bis zum
+  Fehler gelesen wurde.
+  """
+
   def __init__(self):
-    super().__init__()
     self.links = []
-    self.current_link = None
-    self.collect_data = False
-    self.current_data = []
+    self._parser = ElementTree.XMLPullParser(events=("end",))
+    self._broken = False
 
-  def handle_starttag(self, tag, attrs):
-    if tag == "a":
-      attr_dict = dict(attrs)
-      if "class" in attr_dict and "jcs-JobTitle" in attr_dict["class"]:
-        self.collect_data = True
-        self.current_link = attr_dict.get("href", "")
+  def feed(self, data: str) -> None:
+    if self._broken:
+      return
+    try:
+      self._parser.feed(data)
+      self._collect()
+    except ElementTree.ParseError:
+      self._broken = True
 
-  def handle_data(self, data):
-    if self.collect_data:
-      self.current_data.append(data)
+  def close(self) -> None:
+    if self._broken:
+      return
+    try:
+      self._parser.close()
+      self._collect()
+    except ElementTree.ParseError:
+      self._broken = True
 
-  def handle_endtag(self, tag):
-    if tag == "a" and self.collect_data:
-      text = "".join(self.current_data).strip()
-      # Ergänze die indeed-URL als Prefix
-      self.links.append({"title": text, "url": "https://indeed.com" + self.current_link})
-      self.collect_data = False
-      self.current_data = []
-      self.current_link = None
+  def _collect(self) -> None:
+    for _, elem in self._parser.read_events():
+      if elem.tag != "item":
+        continue
+      url = (elem.findtext("link") or "").strip()
+      self.links.append({
+        "title": (elem.findtext("title") or "").strip(),
+        "description": elem.findtext("description") or "",
+        "url": url,
+        "platform": urlsplit(url).netloc.replace("www.", "", 1),
+        "source": "rss"
+      })
+      # Reason: fertige <item>-Elemente freigeben -> konstanter Speicher
+      elem.clear()
+
+  def drain(self) -> List[Dict]:
+    links, self.links = self.links, []
+    return links
+
+PARSERS = {
+  "reddit": RedditLinkParser,
+  "indeed": IndeedLinkParser,
+  "rss": RssJobParser
+}
+
+def register_parser(name: str, parser_cls) -> None:
+  """Registriere einen Parser (feed/drain/close) für neue Job-Boards"""
+  PARSERS[name] = parser_cls
 
 def parse_jobs(html, parser_type):
-  if parser_type == "reddit":
-    parser = RedditLinkParser()
-    parser.feed(html)
-    return parser.links
-  elif parser_type == "indeed":
-    parser = IndeedLinkParser()
-    parser.feed(html)
-    return parser.links
-  return []
-
-def scrape_all_free_sources():
-  jobs = []
-  for source in SOURCES:
+  parser_cls = PARSERS.get(parser_type)
+  if parser_cls is None:
+    return []
+  parser = parser_cls()
+  parser.feed(html)
+  parser.close()
+  return parser.drain()
+
+async def stream_jobs(engine: AsyncFetchEngine, source: Dict,
+                      cache: Optional[HttpCache] = None,
+                      chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[Dict]:
+  """
+  Streaming-Modus: dekodiert die Chunks inkrementell direkt vom Socket in den
+  Parser und liefert Jobs, während die Seite noch geladen wird.
+  """
+  parser_cls = PARSERS.get(source["parser"])
+  if parser_cls is None:
+    return
+  url = source["url"]
+  headers = cache.conditional_headers(url) if cache else None
+  async with engine.stream(url, headers) as response:
+    if response.status != 200:
+      if cache:
+        cache.check(url, response.status, response.headers)
+      return
     try:
-      with urllib.request.urlopen(source["url"]) as response:
-        if response.getcode() == 200:
-          html = response.read().decode('utf-8')
-          jobs.extend(parse_jobs(html, source["parser"]))
+      decoder = codecs.getincrementaldecoder(charset_from_headers(response.headers))(errors="replace")
+    except LookupError:
+      decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    parser = parser_cls()
+    digest = hashlib.sha256()
+    async for chunk in response.iter_chunks(chunk_size):
+      digest.update(chunk)
+      parser.feed(decoder.decode(chunk))
+      for job in parser.drain():
+        yield job
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    for job in parser.drain():
+      yield job
+  if cache:
+    # Streaming kann unveränderte Seiten nicht vor dem Parsen erkennen,
+    # aktualisiert aber die Validatoren für den nächsten Conditional GET
+    cache.check(url, response.status, response.headers, digest.hexdigest())
+
+async def stream_all_free_sources(sources: Optional[List[Dict]] = None,
+                                  config: Optional[FetchConfig] = None,
+                                  cache: Optional[HttpCache] = None) -> AsyncIterator[Dict]:
+  """Streamt alle Quellen parallel; Jobs kommen in Ankunftsreihenfolge"""
+  sources = SOURCES if sources is None else sources
+  queue: asyncio.Queue = asyncio.Queue(maxsize=256)
+  done = object()
+
+  async def produce(engine, source):
+    try:
+      async for job in stream_jobs(engine, source, cache):
+        await queue.put(job)
     except Exception as e:
       print(f"Fehler bei {source['url']}: {e}")
+    finally:
+      await queue.put(done)
+
+  async with AsyncFetchEngine(config) as engine:
+    tasks = [asyncio.create_task(produce(engine, source)) for source in sources]
+    try:
+      remaining = len(tasks)
+      while remaining:
+        item = await queue.get()
+        if item is done:
+          remaining -= 1
+        else:
+          yield item
+    finally:
+      for task in tasks:
+        task.cancel()
+      await asyncio.gather(*tasks, return_exceptions=True)
+  if cache:
+    cache.save()
+
+async def scrape_all_free_sources_async(sources: Optional[List[Dict]] = None,
+                                       config: Optional[FetchConfig] = None,
+                                       cache: Optional[HttpCache] = None) -> List[Dict]:
+  """
+  Lade alle Quellen parallel über die AsyncFetchEngine und parse die Treffer.
+  Mit cache werden Conditional GETs gesendet und unveränderte Seiten übersprungen.
+  """
+  sources = SOURCES if sources is None else sources
+  async with AsyncFetchEngine(config) as engine:
+    results = await asyncio.gather(*(
+      engine.fetch(source["url"], cache.conditional_headers(source["url"]) if cache else None)
+      for source in sources
+    ))
+
+  jobs = []
+  for source, result in zip(sources, results):
+    if result.error:
+      print(f"Fehler bei {source['url']}: {result.error}")
+    elif cache and cache.is_unchanged(result):
+      continue
+    elif result.status == 200:
+      jobs.extend(parse_jobs(result.text(), source["parser"]))
+  if cache:
+    cache.save()
   return jobs
+
+def scrape_all_free_sources(sources: Optional[List[Dict]] = None,
+                            config: Optional[FetchConfig] = None,
+                            cache: Optional[HttpCache] = None) -> List[Dict]:
+  # Synchroner Wrapper für automonet.main_cycle
+  return asyncio.run(scrape_all_free_sources_async(sources, config, cache))
@@ -0,0 +1,115 @@
+"""
+On-Disk HTTP Cache für Listing-Seiten mit:
+- Conditional GET (ETag / Last-Modified)
+- Content-Hash zur Erkennung unveränderter Seiten
+- Größenbegrenzter LRU-Eviction
+"""
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from .fetch_engine import FetchResult
+
+DEFAULT_CACHE_PATH = os.path.join("data", "cache", "http_cache.json")
+
+class HttpCache:
+  """
+  Speichert pro URL nur Validatoren und Body-Hash, nicht den Body selbst:
+  unveränderte Seiten werden gar nicht erst geparst.
+  """
+
+  def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = 2048):
+    self.path = path
+    self.max_entries = max_entries
+    self.entries: "OrderedDict[str, Dict]" = OrderedDict()
+    self.hits = 0
+    self.misses = 0
+    self._dirty = False
+    self._load()
+
+  def _load(self) -> None:
+    try:
+      with open(self.path, "r") as f:
+        data = json.load(f)
+    except (OSError, ValueError):
+      return
+    # Datei ist nach last_used sortiert geschrieben -> LRU-Reihenfolge bleibt erhalten
+    for url, entry in sorted(data.items(), key=lambda item: item[1].get("last_used", 0)):
+      self.entries[url] = entry
+    self._evict()
+
+  def save(self) -> None:
+    if not self._dirty:
+      return
+    directory = os.path.dirname(self.path)
+    if directory:
+      os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{self.path}.tmp"
+    with open(tmp_path, "w") as f:
+      json.dump(self.entries, f)
+    os.replace(tmp_path, self.path)
+    self._dirty = False
+
+  def conditional_headers(self, url: str) -> Dict[str, str]:
+    """Header für einen Conditional GET auf die URL"""
+    entry = self.entries.get(url)
+    if not entry:
+      return {}
+    headers = {}
+    if entry.get("etag"):
+      headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+      headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+  def is_unchanged(self, result: FetchResult) -> bool:
+    """
+    True bei 304 oder identischem Body-Hash. Aktualisiert dabei den Eintrag,
+    d.h. jede Antwort wird genau einmal geprüft.
+    """
+    if result.error:
+      return False
+    body_hash = hashlib.sha256(result.body).hexdigest() if result.status == 200 else None
+    return self.check(result.url, result.status, result.headers, body_hash)
+
+  def check(self, url: str, status: int, headers: Dict[str, str],
+            body_hash: Optional[str] = None) -> bool:
+    """Wie is_unchanged, aber mit bereits berechnetem Body-Hash (Streaming)"""
+    entry = self.entries.get(url)
+    if status == 304 and entry:
+      self._touch(url, entry)
+      self.hits += 1
+      return True
+    if status != 200 or body_hash is None:
+      return False
+
+    unchanged = entry is not None and entry.get("body_hash") == body_hash
+    self._store(url, {
+      "etag": headers.get("etag"),
+      "last_modified": headers.get("last-modified"),
+      "body_hash": body_hash
+    })
+    if unchanged:
+      self.hits += 1
+    else:
+      self.misses += 1
+    return unchanged
+
+  def _touch(self, url: str, entry: Dict) -> None:
+    entry["last_used"] = time.time()
+    self.entries.move_to_end(url)
+    self._dirty = True
+
+  def _store(self, url: str, entry: Dict) -> None:
+    entry["last_used"] = time.time()
+    self.entries[url] = entry
+    self.entries.move_to_end(url)
+    self._dirty = True
+    self._evict()
+
+  def _evict(self) -> None:
+    while len(self.entries) > self.max_entries:
+      self.entries.popitem(last=False)
+      self._dirty = True
@@ -0,0 +1,197 @@
+"""
+Plugin-Registry für Job-Quellen mit:
+- Deklarativen Quellen (Fetcher, Parser, Intervall, Rate Limit, Pagination)
+- Unabhängigem Scheduling pro Quelle
+- Parser-Workern außerhalb des Event Loops
+- Gemeinsamer Ergebnis-Queue
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from .fetch_engine import AsyncFetchEngine, FetchConfig, FetchResult
+from .free_scraper import parse_jobs
+from .http_cache import HttpCache
+from src.utils.rate_limiter import RateLimiter
+
+Fetcher = Callable[[AsyncFetchEngine, str, Optional[Dict[str, str]]], Awaitable[FetchResult]]
+Paginator = Callable[[str, int], str]
+
+def query_paginator(param: str, step: int = 1, start: int = 0) -> Paginator:
+  """Pagination über einen Query-Parameter, z.B. Indeed ?start=0,10,20"""
+  def page_url(url: str, page: int) -> str:
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != param]
+    query.append((param, str(start + page * step)))
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), parts.fragment))
+  return page_url
+
+async def default_fetcher(engine: AsyncFetchEngine, url: str,
+                          headers: Optional[Dict[str, str]] = None) -> FetchResult:
+  return await engine.fetch(url, headers)
+
+@dataclass
+class SourceSpec:
+  name: str
+  url: str
+  parser: str                          # Schlüssel in free_scraper.PARSERS
+  fetcher: Fetcher = default_fetcher
+  interval: float = 600.0              # Sekunden zwischen zwei Crawls
+  rate_limit: float = 1.0              # Requests pro Sekunde
+  pages: int = 1
+  paginate: Optional[Paginator] = None
+
+  def page_urls(self) -> List[str]:
+    if self.paginate is None or self.pages <= 1:
+      return [self.url]
+    return [self.paginate(self.url, page) for page in range(self.pages)]
+
+SOURCE_REGISTRY: Dict[str, SourceSpec] = {}
+
+def register_source(spec: SourceSpec) -> SourceSpec:
+  """Registriere eine Quelle; gleicher Name ersetzt die alte Definition"""
+  SOURCE_REGISTRY[spec.name] = spec
+  return spec
+
+def get_sources(names: Optional[Iterable[str]] = None) -> List[SourceSpec]:
+  if names is None:
+    return list(SOURCE_REGISTRY.values())
+  return [SOURCE_REGISTRY[name] for name in names]
+
+register_source(SourceSpec(
+  name="reddit_forhire",
+  url="https://www.reddit.com/r/forhire/new/",
+  parser="reddit",
+  interval=300,
+  rate_limit=0.5
+))
+register_source(SourceSpec(
+  name="indeed_remote",
+  url="https://www.indeed.com/jobs?q=remote&fromage=1",
+  parser="indeed",
+  interval=900,
+  rate_limit=0.5,
+  pages=3,
+  paginate=query_paginator("start", step=10)
+))
+register_source(SourceSpec(
+  name="weworkremotely",
+  url="https://weworkremotely.com/remote-jobs.rss",
+  parser="rss",
+  interval=600,
+  rate_limit=1.0
+))
+
+class SourceScheduler:
+  """
+  Jede Quelle läuft als eigener Worker mit eigenem Intervall und Rate Limit.
+  Geparst wird im parse_executor (Default: Prozess-Pool), Ergebnisse landen
+  in einer gemeinsamen asyncio.Queue -- eine langsame Quelle blockiert keine andere.
+  """
+
+  def __init__(self, sources: Optional[Iterable[SourceSpec]] = None,
+               queue: Optional[asyncio.Queue] = None,
+               config: Optional[FetchConfig] = None,
+               cache: Optional[HttpCache] = None,
+               parse_executor: Optional[Executor] = None):
+    self.sources = list(sources) if sources is not None else get_sources()
+    self.queue = queue
+    self.config = config
+    self.cache = cache
+    self.parse_executor = parse_executor
+    self._limiters = {spec.name: RateLimiter(spec.rate_limit) for spec in self.sources}
+    self.stats: Dict[str, Dict] = {spec.name: {"crawls": 0, "jobs": 0, "errors": 0} for spec in self.sources}
+
+  async def crawl(self, spec: SourceSpec, engine: AsyncFetchEngine) -> int:
+    """Alle Seiten einer Quelle laden, parsen und in die Queue schieben"""
+    loop = asyncio.get_running_loop()
+    stats = self.stats[spec.name]
+
+    async def crawl_page(url: str) -> int:
+      await self._limiters[spec.name].acquire()
+      headers = self.cache.conditional_headers(url) if self.cache else None
+      result = await spec.fetcher(engine, url, headers)
+      if result.error:
+        stats["errors"] += 1
+        print(f"Fehler bei {url}: {result.error}")
+        return 0
+      if (self.cache and self.cache.is_unchanged(result)) or result.status != 200:
+        return 0
+      jobs = await loop.run_in_executor(self.parse_executor, parse_jobs, result.text(), spec.parser)
+      for job in jobs:
+        # "source" ist das Parser-Format (z. B. "rss"), die registrierte Quelle kommt extra
+        job["source_name"] = spec.name
+        await self.queue.put(job)
+      return len(jobs)
+
+    counts = await asyncio.gather(*(crawl_page(url) for url in spec.page_urls()))
+    stats["crawls"] += 1
+    stats["jobs"] += sum(counts)
+    return sum(counts)
+
+  async def crawl_safely(self, spec: SourceSpec, engine: AsyncFetchEngine) -> int:
+    """crawl() ohne Ausnahmen: eine kaputte Quelle kostet nur ihre eigenen Jobs"""
+    try:
+      return await self.crawl(spec, engine)
+    except Exception as e:
+      self.stats[spec.name]["errors"] += 1
+      print(f"Fehler bei {spec.name}: {e}")
+      return 0
+
+  async def run_once(self) -> int:
+    """Jede Quelle genau einmal crawlen"""
+    async with self._running() as engine:
+      counts = await asyncio.gather(*(self.crawl_safely(spec, engine) for spec in self.sources))
+    return sum(counts)
+
+  async def run_forever(self, stop: asyncio.Event) -> None:
+    """Jede Quelle in ihrem eigenen Intervall crawlen, bis stop gesetzt ist"""
+    async def source_loop(spec: SourceSpec, engine: AsyncFetchEngine) -> None:
+      while not stop.is_set():
+        started = time.monotonic()
+        await self.crawl_safely(spec, engine)
+        if self.cache:
+          self.cache.save()
+        remaining = spec.interval - (time.monotonic() - started)
+        try:
+          await asyncio.wait_for(stop.wait(), timeout=max(0.0, remaining))
+        except asyncio.TimeoutError:
+          pass
+
+    async with self._running() as engine:
+      await asyncio.gather(*(source_loop(spec, engine) for spec in self.sources))
+
+  @asynccontextmanager
+  async def _running(self) -> AsyncIterator[AsyncFetchEngine]:
+    if self.queue is None:
+      self.queue = asyncio.Queue()
+    own_executor = self.parse_executor is None
+    if own_executor:
+      self.parse_executor = ProcessPoolExecutor(max_workers=max(1, min(len(self.sources), 4)))
+    engine = AsyncFetchEngine(self.config)
+    try:
+      yield engine
+    finally:
+      engine.close()
+      if self.cache:
+        self.cache.save()
+      if own_executor:
+        self.parse_executor.shutdown(wait=False)
+        self.parse_executor = None
+
+def scrape_registered_sources(sources: Optional[Iterable[SourceSpec]] = None,
+                              config: Optional[FetchConfig] = None,
+                              cache: Optional[HttpCache] = None,
+                              parse_executor: Optional[Executor] = None) -> List[Dict]:
+  """Synchroner Einmal-Crawl aller registrierten Quellen (für main_cycle)"""
+  async def collect() -> List[Dict]:
+    scheduler = SourceScheduler(sources, asyncio.Queue(), config, cache, parse_executor)
+    await scheduler.run_once()
+    jobs = []
+    while not scheduler.queue.empty():
+      jobs.append(scheduler.queue.get_nowait())
+    return jobs
+  return asyncio.run(collect())
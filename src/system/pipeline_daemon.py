@@ -0,0 +1,315 @@
+"""
+Langlaufender Pipeline-Daemon mit:
+- Gestuften asyncio-Queues: Scraping -> Scoring -> Generierung -> Submit
+- Eigener Worker-Anzahl und begrenzter Queue (Backpressure) pro Stufe
+- Graceful Shutdown (SIGINT/SIGTERM): Scraper stoppen, Queues leeren, Rest sichern
+- Checkpoint der In-Flight Jobs, Wiederaufnahme beim nächsten Start
+- Budget-/Provider-Fehler: Job bleibt in-flight und wird später erneut versucht
+- Generierte Proposals sofort in der dauerhaften Work-Queue (Retries, Dead-Letter, Idempotenz)
+"""
+import asyncio
+import json
+import logging
+import os
+import signal
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Set
+
+from src.ai_service.llm_dispatcher import ProviderError
+from src.scrapers.dedup_index import JobDedupIndex, job_keys
+from src.scrapers.http_cache import HttpCache
+from src.scrapers.source_registry import SourceScheduler
+from src.utils.budget_ledger import BudgetExceeded
+from src.utils.proposal_submitter import PROPOSAL_QUEUE, queue_proposal, record_submission_outcome, submit_proposal
+from src.utils.work_queue import DEFAULT_QUEUE_PATH, WorkItem, WorkQueue
+
+DEFAULT_CHECKPOINT_PATH = os.path.join("data", "pipeline", "checkpoint.json")
+STAGES = ("score", "generate")
+# Vorübergehende Fehler (Budget leer, Provider weg): Job nicht verwerfen, sondern zurückstellen
+RETRYABLE_ERRORS = (BudgetExceeded, ProviderError, OSError)
+
+@dataclass
+class PipelineConfig:
+    scoring_workers: int = 4
+    generation_workers: int = 2
+    submit_workers: int = 1
+    queue_size: int = 100                 # pro Stufe; volle Queue bremst die vorige Stufe
+    min_roi: float = 7.0
+    checkpoint_path: str = DEFAULT_CHECKPOINT_PATH
+    checkpoint_interval: float = 5.0
+    drain_timeout: float = 30.0           # so lange dürfen Queues beim Shutdown leerlaufen
+    outbox_path: str = DEFAULT_QUEUE_PATH
+    submit_batch: int = 10                # Einträge pro Claim eines Submit-Workers
+    submit_poll_interval: float = 1.0     # fällige Retries werden spätestens so oft abgeholt
+    submit_max_attempts: int = 5
+    submit_backoff: float = 30.0          # Basis des exponentiellen Backoffs in Sekunden
+    retry_delay: float = 60.0             # Wartezeit nach RETRYABLE_ERRORS, bevor die Stufe erneut läuft
+
+def item_id(job: Dict) -> Optional[str]:
+    url_key, title_key = job_keys(job)
+    key = url_key or title_key
+    return key.hex() if key is not None else None
+
+class PipelineDaemon:
+    """
+    Ein Prozess, dauerhaft warm: Router, Modelle und Verbindungen werden
+    einmal initialisiert. Jeder Job wandert einzeln durch die Stufen, sobald
+    er gescraped ist, statt auf den nächsten Batch-Zyklus zu warten.
+    Die blockierenden Router-/Submit-Aufrufe laufen im Executor.
+    Nach der Generierung übernimmt die Work-Queue (outbox): Submit-Worker
+    claimen daraus in Batches, Fehler gehen mit Backoff zurück.
+    """
+
+    def __init__(self, router, profile: Dict, config: Optional[PipelineConfig] = None,
+                 scheduler=None, dedup: Optional[JobDedupIndex] = None,
+                 submit: Callable[[Dict, str], None] = submit_proposal,
+                 executor: Optional[Executor] = None, outbox: Optional[WorkQueue] = None):
+        self.router = router
+        self.profile = profile
+        self.config = config or PipelineConfig()
+        self.scheduler = scheduler
+        self.dedup = dedup
+        self.submit = submit
+        self.executor = executor
+        self.outbox = outbox
+        self.logger = logging.getLogger('pipeline-daemon')
+        self.inflight: Dict[str, Dict] = {}
+        self.stats = {"scraped": 0, "duplicates": 0, "scored": 0, "filtered": 0,
+                      "generated": 0, "submitted": 0, "retried": 0, "dead_lettered": 0, "errors": 0,
+                      "deferred": 0}
+        self.latencies: List[float] = []   # Sekunden von Scrape bis Submit
+        self.queues: Dict[str, asyncio.Queue] = {}
+        self._claimed = 0
+        self._submit_wakeup: Optional[asyncio.Event] = None
+        self._deferred: Set[asyncio.Future] = set()
+
+    def load_checkpoint(self) -> List[Dict]:
+        try:
+            with open(self.config.checkpoint_path, "r", encoding="utf-8") as f:
+                items = json.load(f)
+        except (OSError, ValueError):
+            return []
+        return [item for item in items if item.get("stage") in STAGES and item_id(item["job"])]
+
+    def save_checkpoint(self) -> None:
+        path = self.config.checkpoint_path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(list(self.inflight.values()), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    async def _advance(self, item: Dict, stage: str) -> None:
+        item["stage"] = stage
+        await self.queues[stage].put(item)
+
+    def _finish(self, item: Dict) -> None:
+        self.inflight.pop(item_id(item["job"]), None)
+
+    def _defer(self, item: Dict) -> None:
+        """Item bleibt in-flight (also im Checkpoint) und kommt nach retry_delay in seine Stufe zurück"""
+        async def retry_later():
+            await asyncio.sleep(self.config.retry_delay)
+            await self._advance(item, item["stage"])
+        task = asyncio.ensure_future(retry_later())
+        self._deferred.add(task)
+        task.add_done_callback(self._deferred.discard)
+
+    async def _intake(self, scraped: asyncio.Queue) -> None:
+        """Dedupliziert frisch gescrapte Jobs und schiebt sie ins Scoring"""
+        while True:
+            job = await scraped.get()
+            try:
+                self.stats["scraped"] += 1
+                key = item_id(job)
+                if key is None or key in self.inflight or self.dedup.is_seen(job):
+                    self.stats["duplicates"] += 1
+                    continue
+                item = {"job": job, "stage": "score", "scraped_at": time.time()}
+                self.inflight[key] = item
+                await self._advance(item, "score")
+            finally:
+                scraped.task_done()
+
+    async def _worker(self, stage: str, handle) -> None:
+        loop = asyncio.get_running_loop()
+        queue = self.queues[stage]
+        while True:
+            item = await queue.get()
+            try:
+                await handle(loop, item)
+            except RETRYABLE_ERRORS as e:
+                self.stats["errors"] += 1
+                self.stats["deferred"] += 1
+                self.logger.warning(f"{stage} deferred for {item['job'].get('title', 'N/A')}: {e}")
+                self._defer(item)
+            except Exception as e:
+                self.stats["errors"] += 1
+                self.logger.error(f"{stage} failed for {item['job'].get('title', 'N/A')}: {e}")
+                self._finish(item)
+            finally:
+                queue.task_done()
+
+    async def _score(self, loop, item: Dict) -> None:
+        analysis = await loop.run_in_executor(self.executor, self.router.analyze_job, item["job"])
+        self.stats["scored"] += 1
+        if analysis.get("roi", 0) > self.config.min_roi:
+            await self._advance(item, "generate")
+        else:
+            # Reason: erst endgültig entschiedene Jobs als gesehen markieren -- bis dahin sichert der Checkpoint
+            self.dedup.mark_seen([item["job"]])
+            self.stats["filtered"] += 1
+            self._finish(item)
+
+    async def _generate(self, loop, item: Dict) -> None:
+        item["proposal"], item["model"] = await loop.run_in_executor(
+            self.executor, self.router.generate_proposal_with_model, item["job"], self.profile)
+        self.stats["generated"] += 1
+        await self._queue_submission(loop, item)
+
+    async def _queue_submission(self, loop, item: Dict) -> None:
+        # Ab hier sichert die Work-Queue das bezahlte Proposal, nicht mehr der Checkpoint
+        queued = await loop.run_in_executor(self.executor, lambda: queue_proposal(
+            item["job"], item["proposal"], self.outbox, scraped_at=item.get("scraped_at"), model=item.get("model")))
+        if not queued:
+            self.stats["duplicates"] += 1
+        self.dedup.mark_seen([item["job"]])
+        self._finish(item)
+        self._submit_wakeup.set()
+
+    async def _submit_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            items = await loop.run_in_executor(self.executor, self.outbox.claim, PROPOSAL_QUEUE,
+                                               self.config.submit_batch)
+            if not items:
+                try:
+                    await asyncio.wait_for(self._submit_wakeup.wait(), timeout=self.config.submit_poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._submit_wakeup.clear()
+                continue
+            self._claimed += len(items)
+            pending = list(items)
+            try:
+                while pending:
+                    await self._submit(loop, pending.pop(0))
+            finally:
+                self._claimed -= len(items)
+                # Beim Abbruch nicht bearbeitete Einträge sofort freigeben statt Visibility-Timeout abzuwarten
+                for item in pending:
+                    self.outbox.release(item)
+
+    async def _submit(self, loop, item: WorkItem) -> None:
+        job, proposal = item.payload["job"], item.payload["proposal"]
+        try:
+            result = await loop.run_in_executor(self.executor, self.submit, job, proposal)
+        except Exception as e:
+            status = await loop.run_in_executor(self.executor, self.outbox.fail, item, str(e))
+            self.stats["errors"] += 1
+            self.stats["dead_lettered" if status == "dead" else "retried"] += 1
+            self.logger.error(f"submit failed for {job.get('title', 'N/A')} (attempt {item.attempts}): {e}")
+            return
+        await loop.run_in_executor(self.executor, self.outbox.ack, item,
+                                   result if isinstance(result, dict) else None)
+        await loop.run_in_executor(self.executor, record_submission_outcome, item.payload, result)
+        self.stats["submitted"] += 1
+        if item.payload.get("scraped_at"):
+            self.latencies.append(time.time() - item.payload["scraped_at"])
+
+    async def _checkpoint_loop(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=self.config.checkpoint_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.save_checkpoint()
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        """Läuft bis stop gesetzt ist (bzw. SIGINT/SIGTERM, wenn kein stop übergeben wird)"""
+        if stop is None:
+            stop = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, stop.set)
+        own_executor = self.executor is None
+        if own_executor:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.config.scoring_workers + self.config.generation_workers + self.config.submit_workers)
+        own_dedup = self.dedup is None
+        if own_dedup:
+            self.dedup = JobDedupIndex()
+        own_outbox = self.outbox is None
+        if own_outbox:
+            self.outbox = WorkQueue(self.config.outbox_path, max_attempts=self.config.submit_max_attempts,
+                                    backoff_base=self.config.submit_backoff)
+        self._submit_wakeup = asyncio.Event()
+
+        # Wiederaufnahme: gesicherte Jobs direkt in ihre Stufe; Queue notfalls größer als queue_size
+        resumed = self.load_checkpoint()
+        size = self.config.queue_size
+        scraped: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self.queues = {
+            stage: asyncio.Queue(maxsize=max(size, sum(1 for item in resumed if item["stage"] == stage)))
+            for stage in STAGES
+        }
+        for item in resumed:
+            self.inflight[item_id(item["job"])] = item
+            self.queues[item["stage"]].put_nowait(item)
+        if self.scheduler is None:
+            self.scheduler = SourceScheduler(cache=HttpCache())
+        self.scheduler.queue = scraped
+
+        handlers = {"score": self._score, "generate": self._generate}
+        counts = {"score": self.config.scoring_workers, "generate": self.config.generation_workers}
+        workers = [asyncio.ensure_future(self._intake(scraped))]
+        for stage in STAGES:
+            workers += [asyncio.ensure_future(self._worker(stage, handlers[stage])) for _ in range(counts[stage])]
+        workers += [asyncio.ensure_future(self._submit_worker()) for _ in range(self.config.submit_workers)]
+        checkpointer = asyncio.ensure_future(self._checkpoint_loop(stop))
+        producer = asyncio.ensure_future(self.scheduler.run_forever(stop))
+
+        try:
+            await stop.wait()
+            await producer
+            await self._drain(scraped)
+        finally:
+            deferred = list(self._deferred)
+            for task in workers + deferred + [checkpointer, producer]:
+                task.cancel()
+            await asyncio.gather(*workers, *deferred, checkpointer, producer, return_exceptions=True)
+            self.save_checkpoint()
+            if own_dedup:
+                self.dedup.close()
+                self.dedup = None
+            if own_outbox:
+                self.outbox.close()
+                self.outbox = None
+            if own_executor:
+                self.executor.shutdown(wait=False)
+                self.executor = None
+            self.logger.info(f"Pipeline stopped: {self.stats}, {len(self.inflight)} jobs checkpointed")
+
+    async def _drain(self, scraped: asyncio.Queue) -> None:
+        """
+        Queues in Stufenreihenfolge leerlaufen lassen, höchstens drain_timeout lang.
+        Proposals im Backoff warten in der Work-Queue auf den nächsten Start.
+        """
+        async def drain_all():
+            await scraped.join()
+            for stage in STAGES:
+                await self.queues[stage].join()
+            while self._claimed or self.outbox.counts(PROPOSAL_QUEUE)["ready"]:
+                self._submit_wakeup.set()
+                await asyncio.sleep(0.01)
+        try:
+            await asyncio.wait_for(drain_all(), timeout=self.config.drain_timeout)
+        except asyncio.TimeoutError:
+            self.logger.warning(f"Drain timeout, checkpointing {len(self.inflight)} in-flight jobs")
+
+def run_daemon(router, profile: Dict, config: Optional[PipelineConfig] = None) -> None:
+    asyncio.run(PipelineDaemon(router, profile, config).run())
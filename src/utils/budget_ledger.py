@@ -0,0 +1,239 @@
+"""
+Prozessübergreifendes Budget-Ledger (SQLite WAL) mit:
+- Täglichem und monatlichem Budget-Bucket (Reset bei Periodenwechsel)
+- Reservierung vor dem LLM-Call, Abgleich mit echten Kosten danach
+- Atomaren Updates für automonet.py, Monitor und API-Server
+- Getrennter Erfassung gecachter und ungecachter Input-Tokens (Prompt Caching)
+"""
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, Optional
+
+DEFAULT_LEDGER_PATH = os.getenv("AUTOMONET_LEDGER_PATH", os.path.join("data", "budget", "ledger.sqlite3"))
+DEFAULT_DAILY_LIMIT = float(os.getenv("DAILY_BUDGET_LIMIT", "20"))
+DEFAULT_MONTHLY_LIMIT = float(os.getenv("BUDGET_LIMIT", "300"))
+RESERVATION_TTL = 300.0
+_EPSILON = 1e-9
+
+class BudgetExceeded(Exception):
+  pass
+
+def period_keys(now: Optional[float] = None) -> Dict[str, str]:
+  moment = datetime.fromtimestamp(now if now is not None else time.time(), tz=timezone.utc)
+  return {"daily": moment.strftime("%Y-%m-%d"), "monthly": moment.strftime("%Y-%m")}
+
+class BudgetLedger:
+  """
+  Ein Ledger pro Host, geteilt über die SQLite-Datei. Schreibende
+  Operationen laufen in BEGIN IMMEDIATE Transaktionen, d.h. zwei Prozesse
+  können dasselbe Restbudget nie gleichzeitig reservieren.
+  """
+
+  def __init__(self, path: str = DEFAULT_LEDGER_PATH,
+               daily_limit: float = DEFAULT_DAILY_LIMIT,
+               monthly_limit: float = DEFAULT_MONTHLY_LIMIT):
+    self.path = path
+    self.limits = {"daily": daily_limit, "monthly": monthly_limit}
+    directory = os.path.dirname(path)
+    if directory:
+      os.makedirs(directory, exist_ok=True)
+    # Eine Verbindung pro Instanz; der Lock serialisiert Threads (z.B. FastAPI Threadpool)
+    self._lock = threading.RLock()
+    self.conn = sqlite3.connect(path, timeout=10.0, isolation_level=None, check_same_thread=False)
+    self.conn.execute("PRAGMA journal_mode=WAL")
+    self.conn.execute("PRAGMA synchronous=NORMAL")
+    self.conn.executescript("""
+      CREATE TABLE IF NOT EXISTS buckets (
+        period TEXT PRIMARY KEY,
+        period_key TEXT NOT NULL,
+        spent REAL NOT NULL DEFAULT 0
+      );
+      CREATE TABLE IF NOT EXISTS reservations (
+        id TEXT PRIMARY KEY,
+        amount REAL NOT NULL,
+        daily_key TEXT NOT NULL,
+        monthly_key TEXT NOT NULL,
+        expires_at REAL NOT NULL
+      );
+      CREATE TABLE IF NOT EXISTS transactions (
+        id TEXT PRIMARY KEY,
+        model TEXT,
+        input_tokens INTEGER NOT NULL DEFAULT 0,
+        cached_input_tokens INTEGER NOT NULL DEFAULT 0,
+        output_tokens INTEGER NOT NULL DEFAULT 0,
+        reserved REAL NOT NULL DEFAULT 0,
+        cost REAL NOT NULL,
+        created_at REAL NOT NULL
+      );
+    """)
+    columns = {row[1] for row in self.conn.execute("PRAGMA table_info(transactions)")}
+    if "cached_input_tokens" not in columns:
+      # Ledger-Dateien von vor dem Prompt-Caching nachrüsten
+      self.conn.execute("ALTER TABLE transactions ADD COLUMN cached_input_tokens INTEGER NOT NULL DEFAULT 0")
+
+  def close(self) -> None:
+    self.conn.close()
+
+  @contextmanager
+  def _write(self) -> Iterator[sqlite3.Connection]:
+    with self._lock:
+      self.conn.execute("BEGIN IMMEDIATE")
+      try:
+        yield self.conn
+        self.conn.execute("COMMIT")
+      except BaseException:
+        self.conn.execute("ROLLBACK")
+        raise
+
+  def _snapshot(self, conn: sqlite3.Connection, now: float) -> Dict[str, Dict[str, float]]:
+    keys = period_keys(now)
+    spent = {period: 0.0 for period in keys}
+    for period, period_key, value in conn.execute("SELECT period, period_key, spent FROM buckets"):
+      # Reason: Bucket einer abgelaufenen Periode zählt als leer (Reset ohne Cronjob)
+      if period in keys and period_key == keys[period]:
+        spent[period] = value
+    reserved = {period: 0.0 for period in keys}
+    for amount, daily_key, monthly_key in conn.execute(
+        "SELECT amount, daily_key, monthly_key FROM reservations WHERE expires_at > ?", (now,)):
+      if daily_key == keys["daily"]:
+        reserved["daily"] += amount
+      if monthly_key == keys["monthly"]:
+        reserved["monthly"] += amount
+    return {
+      period: {
+        "limit": self.limits[period],
+        "used": spent[period],
+        "reserved": reserved[period],
+        "remaining": self.limits[period] - spent[period] - reserved[period]
+      }
+      for period in keys
+    }
+
+  def status(self, now: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+    """Format wie LLMRouter.getBudgetStatus: daily/monthly mit limit/used/remaining"""
+    with self._lock:
+      return self._snapshot(self.conn, now if now is not None else time.time())
+
+  def usage(self, period: str = "daily", now: Optional[float] = None) -> Dict[str, float]:
+    """Token- und Kostensummen der laufenden Periode, Input getrennt nach gecacht/ungecacht"""
+    moment = datetime.fromtimestamp(now if now is not None else time.time(), tz=timezone.utc)
+    start = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == "monthly":
+      start = start.replace(day=1)
+    with self._lock:
+      row = self.conn.execute(
+        "SELECT COALESCE(SUM(input_tokens), 0), COALESCE(SUM(cached_input_tokens), 0), "
+        "COALESCE(SUM(output_tokens), 0), COALESCE(SUM(cost), 0) FROM transactions WHERE created_at >= ?",
+        (start.timestamp(),)
+      ).fetchone()
+    input_tokens, cached, output_tokens, cost = row
+    return {
+      "input_tokens": input_tokens,
+      "cached_input_tokens": cached,
+      "uncached_input_tokens": input_tokens - cached,
+      "output_tokens": output_tokens,
+      "cache_hit_rate": cached / input_tokens if input_tokens else 0.0,
+      "cost": cost
+    }
+
+  def reserve(self, amount: float, ttl: float = RESERVATION_TTL, now: Optional[float] = None) -> str:
+    """Budget vor dem Call blockieren; wirft BudgetExceeded, wenn es nicht reicht"""
+    now = now if now is not None else time.time()
+    keys = period_keys(now)
+    with self._write() as conn:
+      conn.execute("DELETE FROM reservations WHERE expires_at <= ?", (now,))
+      snapshot = self._snapshot(conn, now)
+      for period, bucket in snapshot.items():
+        # Reason: Rundungsfehler aufsummierter Float-Kosten sollen kein Restbudget blockieren
+        if amount > bucket["remaining"] + _EPSILON:
+          raise BudgetExceeded(f"{period} budget exhausted: need {amount:.4f}, remaining {bucket['remaining']:.4f}")
+      reservation_id = uuid.uuid4().hex
+      conn.execute(
+        "INSERT INTO reservations (id, amount, daily_key, monthly_key, expires_at) VALUES (?, ?, ?, ?, ?)",
+        (reservation_id, amount, keys["daily"], keys["monthly"], now + ttl)
+      )
+    return reservation_id
+
+  def commit(self, reservation_id: Optional[str], cost: float, model: Optional[str] = None,
+             input_tokens: int = 0, output_tokens: int = 0, cached_input_tokens: int = 0,
+             now: Optional[float] = None) -> None:
+    """
+    Reservierung durch die tatsächlichen Kosten ersetzen (Reconciliation).
+    input_tokens zählt alle Input-Tokens, cached_input_tokens den Anteil aus dem Provider-Cache.
+    """
+    now = now if now is not None else time.time()
+    keys = period_keys(now)
+    with self._write() as conn:
+      reserved = 0.0
+      if reservation_id is not None:
+        row = conn.execute("SELECT amount FROM reservations WHERE id = ?", (reservation_id,)).fetchone()
+        reserved = row[0] if row else 0.0
+        conn.execute("DELETE FROM reservations WHERE id = ?", (reservation_id,))
+      for period, period_key in keys.items():
+        conn.execute(
+          "INSERT INTO buckets (period, period_key, spent) VALUES (?, ?, ?) "
+          "ON CONFLICT(period) DO UPDATE SET "
+          "spent = CASE WHEN period_key = excluded.period_key THEN spent + excluded.spent ELSE excluded.spent END, "
+          "period_key = excluded.period_key",
+          (period, period_key, cost)
+        )
+      conn.execute(
+        "INSERT INTO transactions (id, model, input_tokens, cached_input_tokens, output_tokens, reserved, cost, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (reservation_id or uuid.uuid4().hex, model, input_tokens, cached_input_tokens, output_tokens,
+         reserved, cost, now)
+      )
+
+  def release(self, reservation_id: str) -> None:
+    """Reservierung ohne Kosten freigeben (Call abgebrochen/fehlgeschlagen)"""
+    with self._write() as conn:
+      conn.execute("DELETE FROM reservations WHERE id = ?", (reservation_id,))
+
+  @contextmanager
+  def reservation(self, amount: float, ttl: float = RESERVATION_TTL) -> Iterator["Reservation"]:
+    """
+    with ledger.reservation(est) as r:
+        response = call_llm(...)
+        r.commit(actual_cost, model=..., input_tokens=..., output_tokens=...)
+    Ohne commit wird die Reservierung beim Verlassen freigegeben, außer nach
+    keep(): dann settled ein späteres commit()/release() sie (spätestens die TTL).
+    """
+    handle = Reservation(self, self.reserve(amount, ttl), amount)
+    try:
+      yield handle
+    finally:
+      if not handle.settled:
+        self.release(handle.id)
+
+class Reservation:
+  def __init__(self, ledger: BudgetLedger, reservation_id: str, amount: float):
+    self.ledger = ledger
+    self.id = reservation_id
+    self.amount = amount
+    self.settled = False
+
+  def commit(self, cost: float, **usage) -> None:
+    self.ledger.commit(self.id, cost, **usage)
+    self.settled = True
+
+  def release(self) -> None:
+    self.ledger.release(self.id)
+    self.settled = True
+
+  def keep(self) -> None:
+    """Call läuft nach dem with weiter (z.B. Timeout des Aufrufers): Budget bleibt reserviert"""
+    self.settled = True
+
+_ledger: Optional[BudgetLedger] = None
+
+def get_ledger() -> BudgetLedger:
+  """Prozessweite Ledger-Instanz (Verbindung wird wiederverwendet)"""
+  global _ledger
+  if _ledger is None:
+    _ledger = BudgetLedger()
+  return _ledger
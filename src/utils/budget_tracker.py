@@ -1,3 +1,26 @@
+from .budget_ledger import get_ledger
+
+class BudgetTracker:
+  # Monatsbudget-Sicht auf das gemeinsame Ledger (für EnterpriseMonitor)
+  def __init__(self, limit=None, ledger=None):
+    self.ledger = ledger or get_ledger()
+    self.limit = limit
+
+  def get_metrics(self):
+    monthly = self.ledger.status()["monthly"]
+    limit = float(self.limit) if self.limit is not None else monthly["limit"]
+    return {
+      "limit": limit,
+      "spent": monthly["used"],
+      "reserved": monthly["reserved"],
+      "remaining": limit - monthly["used"] - monthly["reserved"]
+    }
+
 def update_budget_tracker():
-  # Dummy-Implementierung zur Überwachung des Tokenverbrauchs und Budgets.
-  print("Budget tracker updated: [Dummy] Tokens spent: 0, Remaining Budget: 500 USD")
+  # Aktuellen Stand aus dem prozessübergreifenden Ledger protokollieren.
+  status = get_ledger().status()
+  print(
+    f"Budget tracker updated: daily {status['daily']['used']:.2f}/{status['daily']['limit']:.2f} USD, "
+    f"monthly {status['monthly']['used']:.2f}/{status['monthly']['limit']:.2f} USD, "
+    f"remaining {min(status['daily']['remaining'], status['monthly']['remaining']):.2f} USD"
+  )
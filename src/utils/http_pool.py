@@ -0,0 +1,60 @@
+"""
+Keep-Alive Connection Pool für blockierende http.client-Aufrufe mit:
+- Einem Pool pro Host (Scraper, Job-Ingest, LLM-Provider)
+- Erkennung serverseitig geschlossener Keep-Alive-Verbindungen
+"""
+import http.client
+import threading
+from typing import List, Tuple
+
+# Fehler, die bei einer wiederverwendeten Keep-Alive-Verbindung auf einen
+# serverseitig geschlossenen Socket hindeuten
+STALE_CONNECTION_ERRORS = (
+  http.client.RemoteDisconnected,
+  http.client.BadStatusLine,
+  ConnectionResetError,
+  BrokenPipeError
+)
+
+def open_connection(scheme: str, netloc: str, timeout: float) -> http.client.HTTPConnection:
+  if scheme == "https":
+    return http.client.HTTPSConnection(netloc, timeout=timeout)
+  return http.client.HTTPConnection(netloc, timeout=timeout)
+
+class HostConnectionPool:
+  """Keep-Alive Pool von http.client-Verbindungen für genau einen Host"""
+
+  def __init__(self, scheme: str, netloc: str, size: int, timeout: float):
+    self.scheme = scheme
+    self.netloc = netloc
+    self.size = size
+    self.timeout = timeout
+    self._idle: List[http.client.HTTPConnection] = []
+    self._lock = threading.Lock()
+    self.created = 0
+
+  def acquire(self) -> Tuple[http.client.HTTPConnection, bool]:
+    """Liefert (Verbindung, wiederverwendet?)"""
+    with self._lock:
+      if self._idle:
+        return self._idle.pop(), True
+      self.created += 1
+    return open_connection(self.scheme, self.netloc, self.timeout), False
+
+  def reconnect(self, conn: http.client.HTTPConnection) -> http.client.HTTPConnection:
+    """Veraltete Keep-Alive-Verbindung schließen und durch eine frische ersetzen"""
+    conn.close()
+    return open_connection(self.scheme, self.netloc, self.timeout)
+
+  def release(self, conn: http.client.HTTPConnection, reusable: bool) -> None:
+    with self._lock:
+      if reusable and len(self._idle) < self.size:
+        self._idle.append(conn)
+        return
+    conn.close()
+
+  def close(self) -> None:
+    with self._lock:
+      idle, self._idle = self._idle, []
+    for conn in idle:
+      conn.close()
@@ -1,5 +1,92 @@
+from typing import Callable, Dict, Optional
+
+from src.ai_service.model_stats import ModelStatsStore, get_model_stats
+from src.scrapers.dedup_index import job_keys
+from src.utils.work_queue import WorkQueue, get_work_queue
+
+PROPOSAL_QUEUE = "proposals"
+# Aufgabentyp, unter dem der Bandit im LLMRouter die Akzeptanz liest
+PROPOSAL_TASK = "PROPOSAL_GENERATION"
+OUTCOMES = {"accepted": True, "rejected": False}
+
 def submit_proposal(job, proposal):
   # Dummy-Implementierung zum Absenden eines Proposals für einen Job.
   print(f"Submitting proposal for job '{job.get('title', 'N/A')}'")
   print("Proposal content:")
   print(proposal)
+
+def submission_key(job: Dict) -> Optional[str]:
+  """Idempotenz-Key: Plattform-job_id, sonst Hash aus normalisierter URL bzw. Titel"""
+  if job.get('id'):
+    return f"{job.get('source', 'job')}:{job['id']}"
+  url_key, title_key = job_keys(job)
+  key = url_key or title_key
+  return key.hex() if key is not None else None
+
+def queue_proposal(job: Dict, proposal: str, queue: Optional[WorkQueue] = None, **extra) -> bool:
+  """
+  Bezahltes LLM-Ergebnis sofort dauerhaft sichern. False, wenn für diesen
+  Job schon ein Proposal eingereiht (oder abgeschickt) wurde.
+  """
+  key = submission_key(job)
+  if key is None:
+    raise ValueError("Job ohne id, url und title kann nicht eingereiht werden")
+  queue = queue or get_work_queue()
+  return queue.enqueue(PROPOSAL_QUEUE, key, {"job": job, "proposal": proposal, **extra})
+
+def record_submission_outcome(payload: Dict, result: object,
+                              stats: Optional[ModelStatsStore] = None) -> Optional[bool]:
+  """
+  Meldet das Submit-Ergebnis status accepted/rejected als Akzeptanz-Signal für
+  das Modell aus payload["model"]. None, wenn es (noch) kein Ergebnis gibt.
+  """
+  accepted = OUTCOMES.get(result.get("status")) if isinstance(result, dict) else None
+  model = payload.get("model")
+  if accepted is None or not model:
+    return None
+  stats = stats or get_model_stats()
+  stats.record_outcome(PROPOSAL_TASK, model, accepted)
+  stats.save_if_due()
+  return accepted
+
+def record_proposal_outcome(job: Dict, accepted: bool, queue: Optional[WorkQueue] = None,
+                            stats: Optional[ModelStatsStore] = None) -> bool:
+  """
+  Späteres Signal (Kunde nimmt an/lehnt ab) dem Modell zuordnen, das das
+  eingereihte Proposal erzeugt hat. False, wenn Job oder Modell unbekannt sind.
+  """
+  key = submission_key(job)
+  entry = (queue or get_work_queue()).get(PROPOSAL_QUEUE, key) if key is not None else None
+  if entry is None:
+    return False
+  status = "accepted" if accepted else "rejected"
+  return record_submission_outcome(entry["payload"], {"status": status}, stats) is not None
+
+def drain_submissions(submit: Callable[[Dict, str], object] = submit_proposal,
+                      queue: Optional[WorkQueue] = None, batch_size: int = 10,
+                      max_batches: Optional[int] = None,
+                      model_stats: Optional[ModelStatsStore] = None) -> Dict[str, int]:
+  """
+  Fällige Proposals in Batches claimen und abschicken. Fehler gehen mit
+  Backoff zurück in die Queue bzw. nach max_attempts in den Dead-Letter.
+  Liefert submit() schon accepted/rejected, landet das in den Modell-Stats.
+  """
+  queue = queue or get_work_queue()
+  stats = {"submitted": 0, "retried": 0, "dead": 0}
+  batches = 0
+  while max_batches is None or batches < max_batches:
+    items = queue.claim(PROPOSAL_QUEUE, batch_size)
+    if not items:
+      break
+    batches += 1
+    for item in items:
+      try:
+        result = submit(item.payload["job"], item.payload["proposal"])
+      except Exception as e:
+        status = queue.fail(item, str(e))
+        stats["dead" if status == "dead" else "retried"] += 1
+        continue
+      queue.ack(item, result if isinstance(result, dict) else None)
+      record_submission_outcome(item.payload, result, model_stats)
+      stats["submitted"] += 1
+  return stats
@@ -0,0 +1,23 @@
+import asyncio
+import time
+
+class RateLimiter:
+  """Async Token Bucket; burst=1 heißt gleichmäßige Abstände"""
+
+  def __init__(self, rate: float, burst: int = 1):
+    self.rate = rate
+    self.capacity = float(burst)
+    self.tokens = float(burst)
+    self.updated = time.monotonic()
+    self._lock = asyncio.Lock()
+
+  async def acquire(self) -> None:
+    async with self._lock:
+      while True:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+          self.tokens -= 1
+          return
+        await asyncio.sleep((1 - self.tokens) / self.rate)
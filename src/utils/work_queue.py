@@ -0,0 +1,247 @@
+"""
+Dauerhafte lokale Work-Queue (SQLite WAL) mit:
+- Idempotenz-Key pro Eintrag (z.B. job_id): derselbe Job wird nie doppelt eingereiht
+- Batch-Claims mit Visibility-Timeout: abgestürzte Worker geben Einträge automatisch frei
+- Exponentiellem Backoff mit Jitter bei Fehlern und Dead-Letter nach max_attempts
+- Erledigte Einträge bleiben stehen, damit ein erneutes Einreihen ein No-Op ist
+"""
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+DEFAULT_QUEUE_PATH = os.getenv("AUTOMONET_QUEUE_PATH", os.path.join("data", "queue", "work_queue.sqlite3"))
+STATUSES = ("pending", "inflight", "done", "dead")
+
+@dataclass
+class WorkItem:
+  queue: str
+  key: str
+  payload: Dict
+  attempts: int
+  lease: str
+
+class WorkQueue:
+  """
+  Eine Queue-Datei pro Host, geteilt zwischen Prozessen. claim() vergibt
+  pro Eintrag eine Lease; ack()/fail() greifen nur mit gültiger Lease,
+  d.h. ein Worker, dessen Timeout abgelaufen ist, kann das Ergebnis eines
+  anderen Workers nicht überschreiben.
+  """
+
+  def __init__(self, path: str = DEFAULT_QUEUE_PATH, visibility_timeout: float = 300.0,
+               max_attempts: int = 5, backoff_base: float = 30.0, backoff_max: float = 3600.0,
+               jitter: float = 0.1, rng: Optional[random.Random] = None):
+    self.path = path
+    self.visibility_timeout = visibility_timeout
+    self.max_attempts = max_attempts
+    self.backoff_base = backoff_base
+    self.backoff_max = backoff_max
+    self.jitter = jitter
+    self.rng = rng or random.Random()
+    directory = os.path.dirname(path)
+    if directory:
+      os.makedirs(directory, exist_ok=True)
+    self._lock = threading.RLock()
+    self.conn = sqlite3.connect(path, timeout=10.0, isolation_level=None, check_same_thread=False)
+    self.conn.execute("PRAGMA journal_mode=WAL")
+    self.conn.execute("PRAGMA synchronous=NORMAL")
+    self.conn.executescript("""
+      CREATE TABLE IF NOT EXISTS items (
+        queue TEXT NOT NULL,
+        key TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        available_at REAL NOT NULL,
+        lease TEXT,
+        last_error TEXT,
+        result TEXT,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (queue, key)
+      );
+      CREATE INDEX IF NOT EXISTS items_ready ON items (queue, status, available_at);
+    """)
+
+  def close(self) -> None:
+    self.conn.close()
+
+  @contextmanager
+  def _write(self) -> Iterator[sqlite3.Connection]:
+    with self._lock:
+      self.conn.execute("BEGIN IMMEDIATE")
+      try:
+        yield self.conn
+        self.conn.execute("COMMIT")
+      except BaseException:
+        self.conn.execute("ROLLBACK")
+        raise
+
+  def backoff(self, attempts: int) -> float:
+    """Wartezeit nach dem attempts-ten Fehlversuch: base * 2^(n-1), gedeckelt, mit Jitter"""
+    delay = min(self.backoff_max, self.backoff_base * 2 ** max(attempts - 1, 0))
+    return delay * (1 + self.jitter * self.rng.uniform(-1, 1))
+
+  def enqueue(self, queue: str, key: str, payload: Dict, delay: float = 0.0,
+              now: Optional[float] = None) -> bool:
+    """False, wenn der Key in dieser Queue schon existiert (egal in welchem Status)"""
+    now = now if now is not None else time.time()
+    with self._write() as conn:
+      cursor = conn.execute(
+        "INSERT OR IGNORE INTO items (queue, key, payload, available_at, created_at, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (queue, key, json.dumps(payload, ensure_ascii=False), now + delay, now, now)
+      )
+    return cursor.rowcount == 1
+
+  def claim(self, queue: str, limit: int = 10, visibility_timeout: Optional[float] = None,
+            now: Optional[float] = None) -> List[WorkItem]:
+    """
+    Bis zu limit fällige Einträge übernehmen. Einträge, deren Lease abgelaufen
+    ist, gelten wieder als fällig; haben sie max_attempts erreicht, landen sie
+    stattdessen im Dead-Letter.
+    """
+    now = now if now is not None else time.time()
+    timeout = visibility_timeout if visibility_timeout is not None else self.visibility_timeout
+    claimed = []
+    with self._write() as conn:
+      conn.execute(
+        "UPDATE items SET status = 'dead', lease = NULL, last_error = 'visibility timeout', updated_at = ? "
+        "WHERE queue = ? AND status = 'inflight' AND available_at <= ? AND attempts >= ?",
+        (now, queue, now, self.max_attempts)
+      )
+      rows = conn.execute(
+        "SELECT key, payload, attempts FROM items WHERE queue = ? AND status IN ('pending', 'inflight') "
+        "AND available_at <= ? ORDER BY available_at LIMIT ?",
+        (queue, now, limit)
+      ).fetchall()
+      for key, payload, attempts in rows:
+        lease = uuid.uuid4().hex
+        conn.execute(
+          "UPDATE items SET status = 'inflight', attempts = ?, lease = ?, available_at = ?, updated_at = ? "
+          "WHERE queue = ? AND key = ?",
+          (attempts + 1, lease, now + timeout, now, queue, key)
+        )
+        claimed.append(WorkItem(queue, key, json.loads(payload), attempts + 1, lease))
+    return claimed
+
+  def ack(self, item: WorkItem, result: Optional[Dict] = None, now: Optional[float] = None) -> bool:
+    """Eintrag als erledigt markieren; False, wenn die Lease inzwischen verfallen ist"""
+    now = now if now is not None else time.time()
+    with self._write() as conn:
+      cursor = conn.execute(
+        "UPDATE items SET status = 'done', lease = NULL, result = ?, updated_at = ? "
+        "WHERE queue = ? AND key = ? AND lease = ? AND status = 'inflight'",
+        (json.dumps(result) if result is not None else None, now, item.queue, item.key, item.lease)
+      )
+    return cursor.rowcount == 1
+
+  def fail(self, item: WorkItem, error: str, now: Optional[float] = None) -> Optional[str]:
+    """Fehlversuch verbuchen; liefert den neuen Status ('pending' oder 'dead') bzw. None ohne Lease"""
+    now = now if now is not None else time.time()
+    status = "dead" if item.attempts >= self.max_attempts else "pending"
+    available_at = now if status == "dead" else now + self.backoff(item.attempts)
+    with self._write() as conn:
+      cursor = conn.execute(
+        "UPDATE items SET status = ?, lease = NULL, available_at = ?, last_error = ?, updated_at = ? "
+        "WHERE queue = ? AND key = ? AND lease = ? AND status = 'inflight'",
+        (status, available_at, error[:1000], now, item.queue, item.key, item.lease)
+      )
+    return status if cursor.rowcount == 1 else None
+
+  def release(self, item: WorkItem, now: Optional[float] = None) -> bool:
+    """Unbearbeiteten Eintrag sofort zurückgeben (z.B. beim Shutdown), ohne den Versuch zu zählen"""
+    now = now if now is not None else time.time()
+    with self._write() as conn:
+      cursor = conn.execute(
+        "UPDATE items SET status = 'pending', attempts = attempts - 1, lease = NULL, available_at = ?, "
+        "updated_at = ? WHERE queue = ? AND key = ? AND lease = ? AND status = 'inflight'",
+        (now, now, item.queue, item.key, item.lease)
+      )
+    return cursor.rowcount == 1
+
+  def extend(self, item: WorkItem, seconds: float, now: Optional[float] = None) -> bool:
+    """Lease verlängern (Heartbeat für lange Aufgaben)"""
+    now = now if now is not None else time.time()
+    with self._write() as conn:
+      cursor = conn.execute(
+        "UPDATE items SET available_at = ?, updated_at = ? "
+        "WHERE queue = ? AND key = ? AND lease = ? AND status = 'inflight'",
+        (now + seconds, now, item.queue, item.key, item.lease)
+      )
+    return cursor.rowcount == 1
+
+  def get(self, queue: str, key: str) -> Optional[Dict]:
+    with self._lock:
+      row = self.conn.execute(
+        "SELECT payload, status, attempts, available_at, last_error, result FROM items WHERE queue = ? AND key = ?",
+        (queue, key)
+      ).fetchone()
+    if row is None:
+      return None
+    payload, status, attempts, available_at, last_error, result = row
+    return {
+      "key": key,
+      "payload": json.loads(payload),
+      "status": status,
+      "attempts": attempts,
+      "available_at": available_at,
+      "last_error": last_error,
+      "result": json.loads(result) if result else None
+    }
+
+  def counts(self, queue: str, now: Optional[float] = None) -> Dict[str, int]:
+    """Einträge pro Status plus 'ready' (jetzt claimbar, inkl. abgelaufener Leases)"""
+    now = now if now is not None else time.time()
+    counts = {status: 0 for status in STATUSES}
+    with self._lock:
+      for status, count in self.conn.execute(
+          "SELECT status, COUNT(*) FROM items WHERE queue = ? GROUP BY status", (queue,)):
+        counts[status] = count
+      counts["ready"] = self.conn.execute(
+        "SELECT COUNT(*) FROM items WHERE queue = ? AND status IN ('pending', 'inflight') AND available_at <= ?",
+        (queue, now)
+      ).fetchone()[0]
+    return counts
+
+  def dead_letters(self, queue: str, limit: int = 100) -> List[Dict]:
+    with self._lock:
+      rows = self.conn.execute(
+        "SELECT key, payload, attempts, last_error, updated_at FROM items "
+        "WHERE queue = ? AND status = 'dead' ORDER BY updated_at LIMIT ?",
+        (queue, limit)
+      ).fetchall()
+    return [
+      {"key": key, "payload": json.loads(payload), "attempts": attempts,
+       "last_error": last_error, "updated_at": updated_at}
+      for key, payload, attempts, last_error, updated_at in rows
+    ]
+
+  def retry_dead(self, queue: str, key: Optional[str] = None, now: Optional[float] = None) -> int:
+    """Dead-Letter-Einträge (alle oder einen) mit frischem Versuchszähler zurück in die Queue"""
+    now = now if now is not None else time.time()
+    query = ("UPDATE items SET status = 'pending', attempts = 0, available_at = ?, updated_at = ? "
+             "WHERE queue = ? AND status = 'dead'")
+    params = [now, now, queue]
+    if key is not None:
+      query += " AND key = ?"
+      params.append(key)
+    with self._write() as conn:
+      cursor = conn.execute(query, params)
+    return cursor.rowcount
+
+_queue: Optional[WorkQueue] = None
+
+def get_work_queue() -> WorkQueue:
+  """Prozessweite Queue-Instanz (Verbindung wird wiederverwendet)"""
+  global _queue
+  if _queue is None:
+    _queue = WorkQueue()
+  return _queue
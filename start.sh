@@ -12,7 +12,7 @@ echo "🚀 Starte Services..."
 python3 src/system/monitor_service.py > monitor.log 2>&1 &
 echo $! > system_monitor.pid
 
-python3 automonet.py > automonet.log 2>&1 &
+python3 automonet.py --action daemon > automonet.log 2>&1 &
 echo $! > automonet.pid
 
 # 3. Dashboard
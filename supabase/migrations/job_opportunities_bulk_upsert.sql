@@ -0,0 +1,42 @@
+/*
+# Job Opportunities: Bulk-Upsert
+
+Conflict target for POST /jobs/bulk (PostgREST on_conflict=user_id,id).
+
+1. Table Structure (if not yet present)
+  - `id`: stable job id (platform id or hash of the normalized URL/title)
+  - `user_id`: UUID reference to auth.users
+  - `title`, `description`, `budget`, `skills`, `source`, `status`
+
+2. Indexes
+  - Unique (user_id, id) as the upsert target; also serves keyset pagination by id per user
+
+3. Security
+  - Enable RLS with policies for owner access only
+  - POST /jobs/bulk upserts with SUPABASE_SERVICE_ROLE_KEY if configured (user_id is set
+    server-side from the verified JWT), otherwise with the caller's own JWT so that
+    auth.uid() = user_id holds
+*/
+
+CREATE TABLE IF NOT EXISTS job_opportunities (
+  id TEXT NOT NULL,
+  user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+  title TEXT NOT NULL,
+  description TEXT NOT NULL DEFAULT '',
+  budget NUMERIC NOT NULL DEFAULT 0,
+  skills TEXT[] NOT NULL DEFAULT '{}',
+  source TEXT NOT NULL,
+  status TEXT NOT NULL DEFAULT 'new',
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS job_opportunities_user_id_id
+  ON job_opportunities (user_id, id);
+
+ALTER TABLE job_opportunities ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "User can manage own jobs" ON job_opportunities;
+CREATE POLICY "User can manage own jobs"
+  ON job_opportunities
+  FOR ALL
+  USING (auth.uid() = user_id);